@@ -0,0 +1,72 @@
+"""
+Benchmark the colour analysis of captures against reading the pixels one by
+one with QImage.pixel.
+Usage: python benchmarks/bench_analysis.py [repeats]
+"""
+import sys
+import timeit
+from PySide2 import QtCore, QtGui
+from qtgrab.analysis import ImageAnalysis
+
+
+SIZES = [(256, 256), (1024, 1024), (1920, 1080)]
+
+
+def pixel_histograms(image):
+    """
+    Build the channel histograms by reading every pixel with QImage.pixel.
+    :param QtGui.QImage image:
+    :return: list of lists
+    """
+    histograms = [[0] * 256 for _ in range(3)]
+    for y in range(image.height()):
+        for x in range(image.width()):
+            rgb = image.pixel(x, y)
+            histograms[0][QtGui.qRed(rgb)] += 1
+            histograms[1][QtGui.qGreen(rgb)] += 1
+            histograms[2][QtGui.qBlue(rgb)] += 1
+    return histograms
+
+
+def bench_size(width, height, repeats):
+    """
+    Time building the histograms of an area with and without the analysis.
+    :param int width: area width
+    :param int height: area height
+    :param int repeats: number of runs, the fastest one is reported
+    :return: tuple of floats, seconds per pixel loop, analysis and cache hit
+    """
+    image = QtGui.QImage(width + 64, height + 64, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(90, 120, 150))
+    rect = QtCore.QRect(32, 32, width, height)
+    area = image.copy(rect)
+
+    pixel_seconds = min(timeit.repeat(
+        lambda: pixel_histograms(area), number=1, repeat=repeats))
+    analysis_seconds = min(timeit.repeat(
+        lambda: ImageAnalysis(image).histograms(rect),
+        number=1, repeat=repeats))
+
+    analysis = ImageAnalysis(image)
+    analysis.histograms(rect)
+    cached_seconds = min(timeit.repeat(
+        lambda: analysis.histograms(rect), number=1, repeat=repeats))
+    return pixel_seconds, analysis_seconds, cached_seconds
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    app = QtGui.QGuiApplication(sys.argv)  # noqa: F841
+
+    print('{0:>12} {1:>12} {2:>12} {3:>12}'.format(
+        'size', 'pixel (s)', 'analysis (s)', 'cached (s)'))
+    for width, height in SIZES:
+        pixel_seconds, analysis_seconds, cached_seconds = bench_size(
+            width, height, repeats)
+        print('{0:>12} {1:>12.3f} {2:>12.3f} {3:>12.6f}'.format(
+            '{0}x{1}'.format(width, height), pixel_seconds, analysis_seconds,
+            cached_seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark the import time of the qtgrab modules with python -X importtime and
+the time to the first headless capture. Every measurement runs in a fresh
+interpreter, the fastest of the runs is reported. Results can be appended to
+a JSON lines file to track them over time.
+Usage: python benchmarks/bench_import.py [repeats] [--output results.jsonl]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+
+IMPORTS = [
+    'import qtgrab',
+    'import qtgrab.capture',
+    'import qtgrab.pipeline',
+    'import qtgrab.cli',
+    'import qtgrab.shot_widget',
+    'import qtgrab.sample',
+]
+
+WIDGETS_MODULE = 'PySide2.QtWidgets'
+
+
+def import_time(statement):
+    """
+    Measure the import time of the given statement in a fresh interpreter.
+    :param str statement: import statement
+    :return: tuple of float seconds and bool if the widgets got imported
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    total = 0
+    widgets = False
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        widgets = widgets or name.strip() == WIDGETS_MODULE
+        # only the top level imports, the others are part of their time
+        if len(name) - len(name.lstrip()) == 1:
+            total += int(cumulative)
+    return total / 1e6, widgets
+
+
+def first_capture_time(directory):
+    """
+    Measure the time from starting an interpreter until a headless capture
+    has been saved with the command line interface.
+    :param str directory: directory to save the capture in
+    :return: float seconds
+    """
+    output = os.path.join(directory, 'capture.png')
+    start = timeit.default_timer()
+    # note: the exit code isn't checked, platforms without a screen to grab
+    # from fail to save but are measured the same
+    subprocess.call(
+        [sys.executable, '-m', 'qtgrab', 'grab', '0', '0', '640', '480',
+         '-o', output],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return timeit.default_timer() - start
+
+
+def git_revision():
+    """
+    Get the revision of the working tree, if it's a git checkout.
+    :return: str or None
+    """
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('repeats', type=int, nargs='?', default=5)
+    parser.add_argument(
+        '--output', help='JSON lines file to append the results to')
+    options = parser.parse_args()
+
+    results = {}
+    print('{0:<28} {1:>10} {2:>8}'.format('statement', 'ms', 'widgets'))
+    for statement in IMPORTS:
+        runs = [import_time(statement) for _ in range(options.repeats)]
+        seconds = min(run[0] for run in runs)
+        widgets = runs[0][1]
+        results[statement] = seconds
+        print('{0:<28} {1:>10.1f} {2:>8}'.format(
+            statement, seconds * 1000, 'yes' if widgets else 'no'))
+
+    directory = tempfile.mkdtemp()
+    seconds = min(
+        first_capture_time(directory) for _ in range(options.repeats))
+    results['first capture'] = seconds
+    print('{0:<28} {1:>10.1f}'.format('first capture', seconds * 1000))
+
+    if options.output:
+        record = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'seconds': results,
+        }
+        with open(options.output, 'a') as file_handle:
+            file_handle.write(json.dumps(record, sort_keys=True) + '\n')
+
+
+if __name__ == '__main__':
+    main()
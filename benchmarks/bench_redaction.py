@@ -0,0 +1,48 @@
+"""
+Benchmark the throughput of the redaction modes in megapixels per second.
+Usage: python benchmarks/bench_redaction.py [repeats]
+"""
+import sys
+import timeit
+from PySide2 import QtCore, QtGui
+from qtgrab.redaction import Redactor, PIXELATE, FILL, BLUR
+
+
+SIZES = [(1920, 1080), (3840, 2160), (7680, 2160)]
+
+
+def bench_mode(mode, width, height, repeats):
+    """
+    Time redacting a full image with the given mode.
+    :param str mode: redaction mode
+    :param int width: image width
+    :param int height: image height
+    :param int repeats: number of runs, the fastest one is reported
+    :return: float megapixels per second
+    """
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(90, 120, 150))
+
+    redactor = Redactor(mode)
+    redactor.add_area(QtCore.QRect(0, 0, width, height))
+
+    seconds = min(timeit.repeat(
+        lambda: redactor.apply(image, in_place=True),
+        number=1, repeat=repeats))
+    return width * height / 1e6 / seconds
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    app = QtGui.QGuiApplication(sys.argv)  # noqa: F841
+
+    print('{0:<10} {1:>12} {2:>10}'.format('mode', 'size', 'MP/s'))
+    for mode in (FILL, PIXELATE, BLUR):
+        for width, height in SIZES:
+            throughput = bench_mode(mode, width, height, repeats)
+            print('{0:<10} {1:>12} {2:>10.1f}'.format(
+                mode, '{0}x{1}'.format(width, height), throughput))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark the peak memory of capturing, previewing and saving large areas,
+held in memory versus tiled into a memory map. The desktop is faked so the
+benchmark also runs headless. Every run happens in a fresh process since the
+peak resident set size can't be reset. Unix only.
+Usage: python benchmarks/bench_tiled.py
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import timeit
+from PySide2 import QtCore, QtGui
+from qtgrab import capture, tiled
+from qtgrab.capture import Capture
+from qtgrab.tiled import TiledCapture
+
+
+SIZES = [(3840, 2160), (7680, 4320), (15360, 4320)]
+
+
+def fake_grab(rect):
+    """
+    Grab the given area of a fake desktop.
+    :param QtCore.QRect rect:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(rect.size(), QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(rect.x() % 256, rect.y() % 256, 128))
+    return image
+
+
+def peak_rss_mb():
+    """
+    The peak resident set size of this process in megabytes.
+    :return: float
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak / 1024.0 if sys.platform != 'darwin' else peak / 1024.0 ** 2
+
+
+def run(mode, width, height):
+    """
+    Capture, preview and save an area in the given mode.
+    :param str mode: memory or tiled
+    :param int width:
+    :param int height:
+    :return: None
+    """
+    app = QtGui.QGuiApplication(sys.argv)  # noqa: F841
+    capture.grab_area = fake_grab
+    tiled.grab_area = fake_grab
+
+    baseline = peak_rss_mb()
+    start = timeit.default_timer()
+    directory = tempfile.mkdtemp()
+    area = QtCore.QRect(0, 0, width, height)
+    if mode == 'tiled':
+        result = TiledCapture.grab(area, directory=directory)
+    else:
+        result = Capture.grab(area)
+    result.preview(QtCore.QSize(800, 600))
+    result.save(os.path.join(directory, 'capture.png'))
+    result.close()
+
+    print('{0:<8} {1:>12} {2:>10.1f} {3:>10.2f}'.format(
+        mode, '{0}x{1}'.format(width, height), peak_rss_mb() - baseline,
+        timeit.default_timer() - start))
+
+
+def main():
+    if len(sys.argv) == 4:
+        run(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+        return
+
+    print('{0:<8} {1:>12} {2:>10} {3:>10}'.format(
+        'mode', 'size', 'peak MB', 'seconds'))
+    for width, height in SIZES:
+        for mode in ('memory', 'tiled'):
+            sys.stdout.flush()
+            subprocess.call([
+                sys.executable, __file__, mode, str(width), str(height)])
+
+
+if __name__ == '__main__':
+    main()
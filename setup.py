@@ -12,5 +12,5 @@ setup(
     author_email='alexanderberx@hotmail.com',
     description='Screen grab widget for PySide2',
     install_requires=['PySide2'],
-    entry_points={'console_scripts': ['qtgrab=qtgrab.sample:main']}
+    entry_points={'console_scripts': ['qtgrab=qtgrab.cli:main']}
 )
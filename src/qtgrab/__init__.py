@@ -0,0 +1,48 @@
+"""
+QtGrab, screen grabbing for PySide2. The public classes are importable from
+the package itself, their modules are only imported on first use so the
+headless capture and export APIs don't pull in the widgets.
+"""
+import importlib
+
+
+# public names with the module they're defined in
+_LAZY_ATTRIBUTES = {
+    'Capture': 'qtgrab.capture',
+    'CaptureView': 'qtgrab.capture',
+    'TiledCapture': 'qtgrab.tiled',
+    'CaptureFuture': 'qtgrab.future',
+    'CaptureCancelled': 'qtgrab.future',
+    'ImageAnalysis': 'qtgrab.analysis',
+    'Redactor': 'qtgrab.redaction',
+    'AnnotationLayer': 'qtgrab.annotations',
+    'Pipeline': 'qtgrab.pipeline',
+    'Frame': 'qtgrab.pipeline',
+    'CaptureScheduler': 'qtgrab.scheduler',
+    'FramePublisher': 'qtgrab.shared_frames',
+    'FrameSubscriber': 'qtgrab.shared_frames',
+    'ShotWidget': 'qtgrab.shot_widget',
+    'CoordinateWidget': 'qtgrab.coordinates_widget',
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    """
+    Import the module of a public name on first access.
+    :param str name:
+    :raise AttributeError: When the name isn't public
+    :return: the public class
+    """
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(
+            "module 'qtgrab' has no attribute '{0}'".format(name))
+
+    value = getattr(importlib.import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
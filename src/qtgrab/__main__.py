@@ -0,0 +1,5 @@
+from qtgrab.cli import main
+
+
+if __name__ == '__main__':
+    main()  # pragma: no cover
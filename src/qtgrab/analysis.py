@@ -0,0 +1,220 @@
+import collections
+import sys
+from PySide2 import QtCore, QtGui
+
+
+# byte offset of every channel within a 32 bit pixel in memory
+if sys.byteorder == 'little':
+    CHANNEL_OFFSETS = collections.OrderedDict([
+        ('red', 2), ('green', 1), ('blue', 0), ('alpha', 3)])
+else:
+    CHANNEL_OFFSETS = collections.OrderedDict([
+        ('red', 1), ('green', 2), ('blue', 3), ('alpha', 0)])
+
+# formats which can be read directly, any other format is converted first
+DIRECT_FORMATS = (QtGui.QImage.Format_RGB32, QtGui.QImage.Format_ARGB32)
+# size of the chunks of rows converted at once from other formats
+CHUNK_BYTES = 1 << 22
+
+
+class ChannelStats(object):
+    """
+    ChannelStats, minimum, maximum and mean value of a single channel.
+    """
+
+    def __init__(self, minimum, maximum, mean):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.mean = mean
+
+    @classmethod
+    def from_histogram(cls, histogram):
+        """
+        Get the stats of a channel from its histogram.
+        :param list histogram: number of pixels per value
+        :raise ValueError: When the histogram is empty
+        :return: ChannelStats
+        """
+        values = [value for value, count in enumerate(histogram) if count]
+        if not values:
+            raise ValueError('Can not get the stats of an empty area')
+
+        total = sum(value * count for value, count in enumerate(histogram))
+        return cls(values[0], values[-1], float(total) / sum(histogram))
+
+    def __repr__(self):
+        return '<ChannelStats min={0} max={1} mean={2:.2f}>'.format(
+            self.minimum, self.maximum, self.mean)
+
+
+class ImageAnalysis(object):
+    """
+    ImageAnalysis, colour statistics over areas of an image. The statistics
+    are computed from the raw pixel buffer, the rows of an area are read
+    through memory views so no pixels are copied. Images in other formats,
+    e.g. premultiplied ones, are converted a chunk of rows of the analysed
+    area at a time, never as a whole. Histograms and colour counts are cached
+    per area.
+    """
+
+    def __init__(self, image):
+        self._image = image
+        self._histograms = {}
+        self._unique_colors = {}
+
+    @property
+    def image(self):
+        """
+        The image which is analysed.
+        :return: QtGui.QImage
+        """
+        return self._image
+
+    def channels(self):
+        """
+        Get the names of the channels of the image.
+        :return: list of str
+        """
+        channels = list(CHANNEL_OFFSETS.keys())
+        if not self._image.hasAlphaChannel():
+            channels.remove('alpha')
+        return channels
+
+    def _area(self, rect):
+        """
+        Get the area to analyse clipped to the image.
+        :param QtCore.QRect rect: None for the whole image
+        :return: QtCore.QRect
+        """
+        if rect is None:
+            return self._image.rect()
+        return rect.intersected(self._image.rect())
+
+    def _chunks(self, area):
+        """
+        Iterate over the given area in chunks of rows, in a format which can
+        be read directly. Images in other formats are converted to ARGB32 a
+        chunk at a time.
+        :param QtCore.QRect area:
+        :return: generator of (QtGui.QImage, QtCore.QRect) tuples, the image
+        of a chunk with the part of the area within it
+        """
+        if self._image.format() in DIRECT_FORMATS:
+            yield self._image, area
+            return
+
+        rows = max(1, CHUNK_BYTES // (area.width() * 4))
+        bottom = area.y() + area.height()
+        for y in range(area.y(), bottom, rows):
+            rect = QtCore.QRect(
+                area.x(), y, area.width(), min(rows, bottom - y))
+            chunk = self._image.copy(rect).convertToFormat(
+                QtGui.QImage.Format_ARGB32)
+            yield chunk, chunk.rect()
+
+    def _rows(self, area):
+        """
+        Iterate over the rows of the given area as memory views on the pixel
+        buffer. An area spanning full rows is returned as a single view.
+        :param QtCore.QRect area:
+        :return: generator of memoryview objects
+        """
+        if area.isEmpty():
+            return
+
+        for image, rect in self._chunks(area):
+            bits = image.constBits()
+            bytes_per_line = image.bytesPerLine()
+            row_nbytes = rect.width() * 4
+            start = rect.y() * bytes_per_line + rect.x() * 4
+            if row_nbytes == bytes_per_line:
+                yield bits[start:start + row_nbytes * rect.height()]
+                continue
+
+            for _ in range(rect.height()):
+                yield bits[start:start + row_nbytes]
+                start += bytes_per_line
+
+    @staticmethod
+    def _key(area):
+        """
+        Get the cache key of the given area.
+        :param QtCore.QRect area:
+        :return: tuple
+        """
+        return area.x(), area.y(), area.width(), area.height()
+
+    def histograms(self, rect=None):
+        """
+        Get the histogram of every channel over the given area.
+        :param QtCore.QRect rect: area of the image, None for the whole image
+        :return: collections.OrderedDict of channel names with lists holding
+        the number of pixels per value
+        """
+        area = self._area(rect)
+        key = self._key(area)
+        if key not in self._histograms:
+            channels = self.channels()
+            counters = [collections.Counter() for _ in channels]
+            # note: all the channels are counted in a single pass, so the
+            # rows are only read once
+            for row in self._rows(area):
+                for channel, counter in zip(channels, counters):
+                    counter.update(row[CHANNEL_OFFSETS[channel]::4])
+            self._histograms[key] = collections.OrderedDict(
+                (channel, [counter[value] for value in range(256)])
+                for channel, counter in zip(channels, counters))
+
+        return collections.OrderedDict(
+            (channel, list(histogram))
+            for channel, histogram in self._histograms[key].items())
+
+    def channel_stats(self, rect=None):
+        """
+        Get the minimum, maximum and mean of every channel over the given
+        area.
+        :param QtCore.QRect rect: area of the image, None for the whole image
+        :raise ValueError: When the area is empty
+        :return: collections.OrderedDict of channel names with ChannelStats
+        """
+        return collections.OrderedDict(
+            (channel, ChannelStats.from_histogram(histogram))
+            for channel, histogram in self.histograms(rect).items())
+
+    def unique_colors(self, rect=None):
+        """
+        Get the number of distinct colours in the given area.
+        :param QtCore.QRect rect: area of the image, None for the whole image
+        :return: int
+        """
+        area = self._area(rect)
+        key = self._key(area)
+        if key not in self._unique_colors:
+            colors = set()
+            for row in self._rows(area):
+                colors.update(row.cast('I'))
+            self._unique_colors[key] = len(colors)
+        return self._unique_colors[key]
+
+    def pixel_at(self, point):
+        """
+        Get the colour of the pixel at the given point.
+        :param QtCore.QPoint point: point relative to the image
+        :raise ValueError: When the point is outside of the image
+        :return: QtGui.QColor
+        """
+        if not self._image.rect().contains(point):
+            raise ValueError('Point ({0}, {1}) is outside of the image'.format(
+                point.x(), point.y()))
+        # note: read through a chunk since pixel returns premultiplied
+        # pixels as they are
+        image, rect = next(self._chunks(QtCore.QRect(point, point)))
+        return QtGui.QColor.fromRgba(image.pixel(rect.topLeft()))
+
+    def clear(self):
+        """
+        Drop the cached statistics, e.g. after painting on the image.
+        :return: None
+        """
+        self._histograms = {}
+        self._unique_colors = {}
@@ -0,0 +1,361 @@
+import math
+from PySide2 import QtCore, QtGui
+from qtgrab.capture import pixmap_nbytes
+from qtgrab.redaction import _PAINTABLE_FORMATS
+
+
+DEFAULT_COLOR = QtGui.QColor(255, 0, 0)
+
+
+class Annotation(object):
+    """
+    Annotation, base class for the vector objects drawn over a capture. The
+    geometry of an annotation is in pixels of the capture.
+    """
+
+    def __init__(self, color=None, width=3):
+        self.color = QtGui.QColor(DEFAULT_COLOR if color is None else color)
+        self.width = width
+
+    def pen(self):
+        """
+        Get the pen the annotation is drawn with.
+        :return: QtGui.QPen
+        """
+        pen = QtGui.QPen(self.color, self.width)
+        pen.setCapStyle(QtCore.Qt.RoundCap)
+        pen.setJoinStyle(QtCore.Qt.RoundJoin)
+        return pen
+
+    def bounding_rect(self):
+        """
+        Get the area the annotation paints on, including its pen.
+        :return: QtCore.QRectF
+        """
+        raise NotImplementedError
+
+    def paint(self, painter):
+        """
+        Paint the annotation.
+        :param QtGui.QPainter painter:
+        :return: None
+        """
+        raise NotImplementedError
+
+
+class Arrow(Annotation):
+    """
+    Arrow, line from a start point with an arrow head at its end point.
+    """
+
+    def __init__(self, start, end, color=None, width=3, head_size=None):
+        super(Arrow, self).__init__(color, width)
+        self.start = QtCore.QPointF(start)
+        self.end = QtCore.QPointF(end)
+        self.head_size = width * 5 if head_size is None else head_size
+
+    def _head(self):
+        """
+        Get the two points the lines of the arrow head end in.
+        :return: tuple of QtCore.QPointF
+        """
+        angle = math.atan2(
+            self.end.y() - self.start.y(), self.end.x() - self.start.x())
+        points = []
+        for offset in (math.pi / 6, -math.pi / 6):
+            points.append(self.end - QtCore.QPointF(
+                math.cos(angle + offset) * self.head_size,
+                math.sin(angle + offset) * self.head_size))
+        return tuple(points)
+
+    def bounding_rect(self):
+        """
+        Get the area the arrow paints on, including its head and pen.
+        :return: QtCore.QRectF
+        """
+        margin = self.width / 2.0 + 1
+        polygon = QtGui.QPolygonF([self.start, self.end] + list(self._head()))
+        return polygon.boundingRect().adjusted(
+            -margin, -margin, margin, margin)
+
+    def paint(self, painter):
+        """
+        Paint the arrow.
+        :param QtGui.QPainter painter:
+        :return: None
+        """
+        painter.setPen(self.pen())
+        painter.drawLine(self.start, self.end)
+        for point in self._head():
+            painter.drawLine(self.end, point)
+
+
+class Box(Annotation):
+    """
+    Box, outline of a rectangle.
+    """
+
+    def __init__(self, rect, color=None, width=3):
+        super(Box, self).__init__(color, width)
+        self.rect = QtCore.QRectF(rect)
+
+    def bounding_rect(self):
+        """
+        Get the area the box paints on, including its pen.
+        :return: QtCore.QRectF
+        """
+        margin = self.width / 2.0 + 1
+        return self.rect.normalized().adjusted(
+            -margin, -margin, margin, margin)
+
+    def paint(self, painter):
+        """
+        Paint the box.
+        :param QtGui.QPainter painter:
+        :return: None
+        """
+        painter.setPen(self.pen())
+        painter.setBrush(QtCore.Qt.NoBrush)
+        painter.drawRect(self.rect)
+
+
+class Text(Annotation):
+    """
+    Text, a label with its top left corner at the given position.
+    """
+
+    def __init__(self, position, text, color=None, pixel_size=24):
+        super(Text, self).__init__(color, 1)
+        self.position = QtCore.QPointF(position)
+        self.text = text
+        self.font = QtGui.QFont()
+        self.font.setPixelSize(pixel_size)
+
+    def _text_rect(self):
+        """
+        Get the area the text is laid out in.
+        :return: QtCore.QRectF
+        """
+        metrics = QtGui.QFontMetricsF(self.font)
+        return metrics.boundingRect(
+            QtCore.QRectF(self.position, QtCore.QSizeF(1e6, 1e6)),
+            QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop, self.text)
+
+    def bounding_rect(self):
+        """
+        Get the area the text paints on.
+        :return: QtCore.QRectF
+        """
+        return self._text_rect().adjusted(-2, -2, 2, 2)
+
+    def paint(self, painter):
+        """
+        Paint the text.
+        :param QtGui.QPainter painter:
+        :return: None
+        """
+        painter.setPen(self.color)
+        painter.setFont(self.font)
+        painter.drawText(
+            self._text_rect(), QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop,
+            self.text)
+
+
+class AnnotationLayer(QtCore.QObject):
+    """
+    AnnotationLayer, keeps annotations as vector objects over a capture. The
+    annotations are rasterized at preview resolution into a cached layer, an
+    edit only re-composites the bounding rects of the annotations it touched.
+    The annotations are painted at full resolution once, when exporting.
+    """
+    changed = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        super(AnnotationLayer, self).__init__(parent)
+        self._annotations = []
+        self._bounds = {}
+        self._dirty = []
+
+        self._overlay = None
+        self._composite = None
+        self._base_key = None
+        self._last_repaint = QtGui.QRegion()
+
+    @property
+    def annotations(self):
+        """
+        The annotations of the layer from bottom to top.
+        :return: list of Annotation
+        """
+        return list(self._annotations)
+
+    @property
+    def last_repaint(self):
+        """
+        The area of the preview which was re-composited the last time.
+        :return: QtGui.QRegion
+        """
+        return QtGui.QRegion(self._last_repaint)
+
+    @property
+    def nbytes(self):
+        """
+        The number of bytes the cached overlay and composite take up.
+        :return: int
+        """
+        nbytes = 0
+        if self._overlay is not None:
+            nbytes += self._overlay.bytesPerLine() * self._overlay.height()
+        if self._composite is not None:
+            nbytes += pixmap_nbytes(self._composite)
+        return nbytes
+
+    def __len__(self):
+        return len(self._annotations)
+
+    def add(self, annotation):
+        """
+        Add an annotation on top of the others.
+        :param Annotation annotation:
+        :return: Annotation
+        """
+        self._annotations.append(annotation)
+        self._bounds[id(annotation)] = annotation.bounding_rect()
+        self._dirty.append(self._bounds[id(annotation)])
+        self.changed.emit()
+        return annotation
+
+    def remove(self, annotation):
+        """
+        Remove an annotation.
+        :param Annotation annotation:
+        :return: None
+        """
+        self._annotations.remove(annotation)
+        self._dirty.append(self._bounds.pop(id(annotation)))
+        self.changed.emit()
+
+    def update(self, annotation):
+        """
+        Mark an annotation as edited, this has to be called after changing
+        its geometry or style.
+        :param Annotation annotation:
+        :return: None
+        """
+        self._dirty.append(self._bounds[id(annotation)])
+        self._bounds[id(annotation)] = annotation.bounding_rect()
+        self._dirty.append(self._bounds[id(annotation)])
+        self.changed.emit()
+
+    def clear(self):
+        """
+        Remove all of the annotations.
+        :return: None
+        """
+        self._dirty.extend(self._bounds.values())
+        self._annotations = []
+        self._bounds = {}
+        self.changed.emit()
+
+    def _paint(self, painter, area=None):
+        """
+        Paint the annotations intersecting the given area.
+        :param QtGui.QPainter painter:
+        :param QtCore.QRectF area: area in capture pixels, None for all
+        :return: None
+        """
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setRenderHint(QtGui.QPainter.TextAntialiasing)
+        for annotation in self._annotations:
+            if area is None or \
+                    self._bounds[id(annotation)].intersects(area):
+                annotation.paint(painter)
+
+    def preview(self, base, source_size):
+        """
+        Get the preview of the capture with the annotations composited over
+        it. Only the areas which changed since the last call are repainted,
+        unless the base preview itself changed.
+        :param QtGui.QPixmap base: preview of the capture
+        :param QtCore.QSize source_size: size of the capture in pixels
+        :return: QtGui.QPixmap
+        """
+        if not self._annotations or source_size.isEmpty():
+            # nothing to composite, the base preview is shown as it is
+            self._overlay = None
+            self._composite = None
+            self._dirty = []
+            self._last_repaint = QtGui.QRegion()
+            return base
+
+        scale_x = base.width() / float(source_size.width())
+        scale_y = base.height() / float(source_size.height())
+        bounds = QtCore.QRect(QtCore.QPoint(0, 0), base.size())
+
+        if self._composite is None or self._base_key != base.cacheKey():
+            self._overlay = QtGui.QImage(
+                base.size(), QtGui.QImage.Format_ARGB32_Premultiplied)
+            self._composite = QtGui.QPixmap(base.size())
+            self._base_key = base.cacheKey()
+            region = QtGui.QRegion(bounds)
+        else:
+            region = QtGui.QRegion()
+            for rect in self._dirty:
+                scaled = QtCore.QRectF(
+                    rect.x() * scale_x, rect.y() * scale_y,
+                    rect.width() * scale_x, rect.height() * scale_y)
+                region += scaled.toAlignedRect().adjusted(-1, -1, 1, 1)
+            region &= bounds
+        self._dirty = []
+        self._last_repaint = region
+        if region.isEmpty():
+            return self._composite
+
+        transparent = QtGui.QColor(0, 0, 0, 0)
+        painter = QtGui.QPainter(self._overlay)
+        painter.setClipRegion(region)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+        for rect in region.rects():
+            painter.fillRect(rect, transparent)
+        painter.setCompositionMode(QtGui.QPainter.CompositionMode_SourceOver)
+        painter.scale(scale_x, scale_y)
+        area = QtCore.QRectF(region.boundingRect())
+        self._paint(painter, QtCore.QRectF(
+            area.x() / scale_x, area.y() / scale_y,
+            area.width() / scale_x, area.height() / scale_y))
+        painter.end()
+
+        painter = QtGui.QPainter(self._composite)
+        painter.setClipRegion(region)
+        painter.drawPixmap(0, 0, base)
+        painter.drawImage(0, 0, self._overlay)
+        painter.end()
+        return self._composite
+
+    def render(self, image, offset=None):
+        """
+        Paint the annotations over the given image at full resolution. The
+        given image is left untouched.
+        :param QtGui.QImage image: pixels of the capture
+        :param QtCore.QPoint offset: position of the image in the capture,
+        when it only holds a part of it
+        :return: QtGui.QImage
+        """
+        if not self._annotations:
+            return image
+
+        if image.format() not in _PAINTABLE_FORMATS:
+            image = image.convertToFormat(
+                QtGui.QImage.Format_ARGB32_Premultiplied)
+        else:
+            image = image.copy()
+
+        painter = QtGui.QPainter(image)
+        if offset is None:
+            self._paint(painter)
+        else:
+            painter.translate(-offset)
+            self._paint(painter, QtCore.QRectF(
+                image.rect().translated(offset)))
+        painter.end()
+        return image
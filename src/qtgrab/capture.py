@@ -0,0 +1,298 @@
+from PySide2 import QtCore, QtGui
+from qtgrab.analysis import ImageAnalysis
+
+
+DEFAULT_FORMAT = QtGui.QImage.Format_RGB32
+
+
+def image_nbytes(image):
+    """
+    Get the number of bytes the pixels of the given image take up.
+    :param QtGui.QImage image:
+    :return: int
+    """
+    return image.bytesPerLine() * image.height()
+
+
+def pixmap_nbytes(pixmap):
+    """
+    Get the number of bytes the pixels of the given pixmap take up.
+    :param QtGui.QPixmap pixmap:
+    :return: int
+    """
+    return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+def grab_area(rect):
+    """
+    Grab the given area of the desktop.
+    :param QtCore.QRect rect: area in desktop coordinates
+    :return: QtGui.QImage
+    """
+    screen = QtGui.QGuiApplication.primaryScreen()
+    return screen.grabWindow(
+        0, rect.x(), rect.y(), rect.width(), rect.height()).toImage()
+
+
+class CaptureView(object):
+    """
+    CaptureView, view on an area of a capture. The view's image points into
+    the pixels of the capture, so no pixels are copied. The image is only
+    valid for as long as the view is alive. Painting on the image paints on
+    the capture and on every other view of the same area, copy the view
+    before painting on it.
+    """
+
+    def __init__(self, capture, rect):
+        self._capture = capture
+        self._rect = rect.intersected(capture.rect())
+        self._source = None
+        self._buffer = None
+        self._image = None
+
+    @property
+    def capture(self):
+        """
+        The capture this is a view on.
+        :return: Capture
+        """
+        return self._capture
+
+    @property
+    def rect(self):
+        """
+        The area of the capture this is a view on.
+        :return: QtCore.QRect
+        """
+        return QtCore.QRect(self._rect)
+
+    @property
+    def image(self):
+        """
+        The pixels of the view as an image sharing the capture's memory.
+        The image doesn't detach when it's painted on, so it has to be
+        treated as read only.
+        :return: QtGui.QImage
+        """
+        if self._image is None:
+            source = self._capture.image
+            if self._rect.isEmpty():
+                self._image = QtGui.QImage()
+                return self._image
+
+            bytes_per_line = source.bytesPerLine()
+            offset = (self._rect.y() * bytes_per_line +
+                      self._rect.x() * source.depth() // 8)
+            # keep a reference to the image and the buffer the view's image
+            # is pointing into, the capture may drop its image
+            self._source = source
+            self._buffer = source.constBits()[offset:]
+            self._image = QtGui.QImage(
+                self._buffer, self._rect.width(), self._rect.height(),
+                bytes_per_line, source.format())
+        return self._image
+
+    def copy(self):
+        """
+        Copy the pixels of the view into a new capture.
+        :return: Capture
+        """
+        origin = self._capture.origin + self._rect.topLeft()
+        return Capture(self.image.copy(), origin)
+
+
+class Capture(object):
+    """
+    Capture, holds the pixels of a screen grab once, in a single image format.
+    Views and previews are derived from it without duplicating the pixels,
+    conversions only happen when the capture is displayed or encoded.
+    """
+
+    def __init__(self, image, origin=None, image_format=DEFAULT_FORMAT):
+        if image.format() != image_format and not image.isNull():
+            image = image.convertToFormat(image_format)
+
+        self._image = image
+        self._origin = QtCore.QPoint(0, 0) if origin is None else origin
+        self._preview = None
+        self._analysis = None
+
+    @classmethod
+    def grab(cls, rect, image_format=DEFAULT_FORMAT):
+        """
+        Grab the given area of the desktop.
+        :param QtCore.QRect rect: area in desktop coordinates
+        :param QtGui.QImage.Format image_format: format to hold the pixels in
+        :return: Capture
+        """
+        return cls(grab_area(rect), rect.topLeft(), image_format)
+
+    @property
+    def image(self):
+        """
+        The pixels of the capture. The image is implicitly shared, painting on
+        it detaches a copy.
+        :return: QtGui.QImage
+        """
+        return self._image
+
+    @property
+    def origin(self):
+        """
+        The top left corner of the capture in desktop coordinates.
+        :return: QtCore.QPoint
+        """
+        return QtCore.QPoint(self._origin)
+
+    @property
+    def format(self):
+        """
+        The image format the pixels are held in.
+        :return: QtGui.QImage.Format
+        """
+        return self._image.format()
+
+    @property
+    def nbytes(self):
+        """
+        The number of bytes held by the capture, including its cached preview.
+        :return: int
+        """
+        return self.pixel_nbytes + self.preview_nbytes
+
+    @property
+    def pixel_nbytes(self):
+        """
+        The number of bytes the pixels of the capture take up.
+        :return: int
+        """
+        return image_nbytes(self._image)
+
+    @property
+    def preview_nbytes(self):
+        """
+        The number of bytes the cached preview takes up.
+        :return: int
+        """
+        return 0 if self._preview is None else pixmap_nbytes(self._preview)
+
+    @property
+    def mapped_nbytes(self):
+        """
+        The number of bytes of memory mapped files, captures are held in
+        memory so this is always zero.
+        :return: int
+        """
+        return 0
+
+    @property
+    def is_tiled(self):
+        """
+        Whether the pixels are held in tiles of a memory mapped file,
+        captures are held in memory so this is always False.
+        :return: bool
+        """
+        return False
+
+    def is_null(self):
+        """
+        Check if the capture holds any pixels.
+        :return: bool
+        """
+        return self._image.isNull()
+
+    def width(self):
+        """
+        The width of the capture in pixels.
+        :return: int
+        """
+        return self._image.width()
+
+    def height(self):
+        """
+        The height of the capture in pixels.
+        :return: int
+        """
+        return self._image.height()
+
+    def size(self):
+        """
+        The size of the capture in pixels.
+        :return: QtCore.QSize
+        """
+        return self._image.size()
+
+    def rect(self):
+        """
+        The area of the capture relative to itself.
+        :return: QtCore.QRect
+        """
+        return self._image.rect()
+
+    def view(self, rect):
+        """
+        Get a view on the given area of the capture.
+        :param QtCore.QRect rect: area relative to the capture
+        :return: CaptureView
+        """
+        return CaptureView(self, rect)
+
+    def analysis(self):
+        """
+        Get the colour analysis of the capture, the statistics it computes
+        are cached until the analysis is cleared.
+        :return: ImageAnalysis
+        """
+        if self._analysis is None:
+            self._analysis = ImageAnalysis(self.image)
+        return self._analysis
+
+    def clear_analysis(self):
+        """
+        Drop the cached colour analysis, e.g. after painting on the capture.
+        :return: None
+        """
+        self._analysis = None
+
+    def preview(self, size):
+        """
+        Get a pixmap of the capture fitting the given size. The pixels are
+        scaled before they're converted for display, the last preview is
+        cached.
+        :param QtCore.QSize size:
+        :return: QtGui.QPixmap
+        """
+        target = self._image.size().scaled(size, QtCore.Qt.KeepAspectRatio)
+        if self._preview is None or self._preview.size() != target:
+            # drop the previous preview before creating a new one
+            self._preview = None
+            self._preview = QtGui.QPixmap.fromImage(self._image.scaled(
+                target, QtCore.Qt.IgnoreAspectRatio,
+                QtCore.Qt.SmoothTransformation))
+        return self._preview
+
+    def clear_preview(self):
+        """
+        Drop the cached preview.
+        :return: None
+        """
+        self._preview = None
+
+    def save(self, file_path, image_format=None, quality=-1):
+        """
+        Save the capture to the given file path.
+        :param str file_path:
+        :param str image_format: defaults to the format of the file extension
+        :param int quality:
+        :return: bool
+        """
+        return self._image.save(file_path, image_format, quality)
+
+    def close(self):
+        """
+        Release the cached preview and analysis, the pixels are released once
+        the capture isn't referenced anymore.
+        :return: None
+        """
+        self._preview = None
+        self._analysis = None
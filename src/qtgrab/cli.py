@@ -0,0 +1,85 @@
+"""
+Command line interface of qtgrab. Without a command the sample UI is shown,
+the grab command captures an area headless, without loading the widgets.
+"""
+import argparse
+import sys
+from PySide2 import QtCore, QtGui
+from qtgrab.capture import Capture
+from qtgrab.tiled import TiledCapture
+
+
+def _create_parser():
+    """
+    Create the parser of the command line arguments.
+    :return: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(
+        prog='qtgrab', description='Screen grabbing for PySide2.')
+    commands = parser.add_subparsers(dest='command')
+
+    commands.add_parser('ui', help='show the sample UI, the default command')
+
+    grab = commands.add_parser(
+        'grab', help='grab an area of the desktop and save it')
+    grab.add_argument('x', type=int, help='left of the area')
+    grab.add_argument('y', type=int, help='top of the area')
+    grab.add_argument('width', type=int, help='width of the area')
+    grab.add_argument('height', type=int, help='height of the area')
+    grab.add_argument(
+        '-o', '--output', required=True,
+        help='file to save the capture to, the extension picks the format')
+    grab.add_argument(
+        '--quality', type=int, default=-1,
+        help='quality of lossy formats, 0 to 100')
+    grab.add_argument(
+        '--tiled', action='store_true',
+        help='stream the capture through a memory mapped file in tiles')
+    return parser
+
+
+def grab(x, y, width, height, output, quality=-1, tiled=False):
+    """
+    Grab an area of the desktop and save it, only the GUI module of Qt is
+    loaded.
+    :param int x:
+    :param int y:
+    :param int width:
+    :param int height:
+    :param str output: file path to save the capture to
+    :param int quality:
+    :param bool tiled: grab in tiles streamed into a memory mapped file
+    :return: bool
+    """
+    # grabbing needs an application, the widgets aren't needed for it
+    app = QtGui.QGuiApplication.instance()
+    if app is None:
+        app = QtGui.QGuiApplication([])
+
+    area = QtCore.QRect(x, y, width, height)
+    if tiled:
+        capture = TiledCapture.grab(area)
+    else:
+        capture = Capture.grab(area)
+
+    try:
+        return capture.save(output, quality=quality)
+    finally:
+        capture.close()
+
+
+def main(args=None):
+    """
+    Run the command line interface.
+    :param list args: arguments, defaults to the arguments of the process
+    :return: None
+    """
+    options = _create_parser().parse_args(args)
+    if options.command == 'grab':
+        saved = grab(options.x, options.y, options.width, options.height,
+                     options.output, options.quality, options.tiled)
+        sys.exit(0 if saved else 1)
+
+    # note: imported here since the widgets are only needed for the UI
+    from qtgrab import sample
+    sample.main()
@@ -0,0 +1,150 @@
+import collections
+import timeit
+from PySide2 import QtCore, QtGui
+
+
+IMAGE_MIME_TYPE = 'application/x-qt-image'
+
+# encoded mime types with the image format they're encoded in
+ENCODED_MIME_TYPES = collections.OrderedDict([
+    ('image/png', 'PNG'),
+    ('image/bmp', 'BMP'),
+    ('image/jpeg', 'JPG'),
+])
+
+DEFAULT_MIME_TYPES = (IMAGE_MIME_TYPE, 'image/png', 'image/bmp')
+
+
+class ClipboardMetrics(object):
+    """
+    ClipboardMetrics, keeps track of which clipboard formats consumers ask for
+    and how much time is spent encoding them.
+    """
+
+    def __init__(self):
+        self.requested = collections.Counter()
+        self.encoded = collections.Counter()
+        self.encode_seconds = collections.Counter()
+        self.exports = 0
+
+    def reset(self):
+        """
+        Reset all of the metrics.
+        :return: None
+        """
+        self.requested.clear()
+        self.encoded.clear()
+        self.encode_seconds.clear()
+        self.exports = 0
+
+
+class LazyImageMimeData(QtCore.QMimeData):
+    """
+    LazyImageMimeData, mime data advertising an image in several formats
+    without encoding it. A format is only encoded once a consumer asks for
+    it, after which the encoded data is cached for repeated pastes.
+    """
+
+    def __init__(self, image, mime_types=DEFAULT_MIME_TYPES, metrics=None):
+        super(LazyImageMimeData, self).__init__()
+        for mime_type in mime_types:
+            if mime_type != IMAGE_MIME_TYPE and \
+                    mime_type not in ENCODED_MIME_TYPES:
+                raise ValueError(
+                    'Unsupported mime type: {0}'.format(mime_type))
+
+        self._image = image
+        self._mime_types = list(mime_types)
+        self._metrics = ClipboardMetrics() if metrics is None else metrics
+        self._cache = {}
+
+        self._metrics.exports += 1
+
+    @property
+    def metrics(self):
+        """
+        The metrics the format requests are recorded in.
+        :return: ClipboardMetrics
+        """
+        return self._metrics
+
+    def formats(self):
+        """
+        Overwritten method from QMimeData to advertise the image formats.
+        :return: list of str
+        """
+        return list(self._mime_types)
+
+    def hasFormat(self, mime_type):
+        """
+        Overwritten method from QMimeData to check the advertised formats.
+        :param str mime_type:
+        :return: bool
+        """
+        return mime_type in self._mime_types
+
+    def hasImage(self):
+        """
+        Overwritten method from QMimeData, there is always an image.
+        :return: bool
+        """
+        return True
+
+    def set_encoded(self, mime_type, data):
+        """
+        Seed the cache with already encoded data, e.g. from a pipeline.
+        :param str mime_type:
+        :param bytes data: encoded image
+        :return: None
+        """
+        self._cache[mime_type] = QtCore.QByteArray(data)
+
+    def _encode(self, mime_type):
+        """
+        Encode the image into the given mime type.
+        :param str mime_type:
+        :return: QtCore.QByteArray
+        """
+        start = timeit.default_timer()
+        data = QtCore.QByteArray()
+        buffer = QtCore.QBuffer(data)
+        buffer.open(QtCore.QIODevice.WriteOnly)
+        self._image.save(buffer, ENCODED_MIME_TYPES[mime_type])
+        buffer.close()
+
+        self._metrics.encoded[mime_type] += 1
+        self._metrics.encode_seconds[mime_type] += \
+            timeit.default_timer() - start
+        return data
+
+    def retrieveData(self, mime_type, preferred_type):
+        """
+        Overwritten method from QMimeData to encode the requested format on
+        demand.
+        :param str mime_type:
+        :param preferred_type:
+        :return: QtCore.QByteArray or QtGui.QImage
+        """
+        if mime_type not in self._mime_types:
+            return None
+
+        self._metrics.requested[mime_type] += 1
+        if mime_type == IMAGE_MIME_TYPE:
+            return self._image
+
+        if mime_type not in self._cache:
+            self._cache[mime_type] = self._encode(mime_type)
+        return self._cache[mime_type]
+
+
+def copy_image(image, mime_types=DEFAULT_MIME_TYPES, metrics=None):
+    """
+    Put the given image on the clipboard without encoding it up front.
+    :param QtGui.QImage image:
+    :param tuple mime_types: mime types to advertise
+    :param ClipboardMetrics metrics: metrics to record the requests in
+    :return: LazyImageMimeData
+    """
+    mime_data = LazyImageMimeData(image, mime_types, metrics)
+    QtGui.QGuiApplication.clipboard().setMimeData(mime_data)
+    return mime_data
@@ -1,13 +1,19 @@
-import copy
 from PySide2 import QtWidgets, QtCore, QtGui
+from qtgrab.window_index import WindowIndex
+from qtgrab.future import CaptureFuture
 
 
 class CoordinateWidget(QtWidgets.QDialog):
     """
     CoordinateWidget, widget for marking an area. First left click for marking
     the top left corner you want to grab. Second left click for marking the
-    bottom right corner.
+    bottom right corner. In window pick mode the window under the cursor is
+    highlighted and a single left click marks its geometry. The widget
+    doesn't block, the marked corners are delivered through a CaptureFuture.
     """
+    # widgets waiting for their future to resolve, without a strong reference
+    # they would only be kept alive by a reference cycle with their future
+    _pending = set()
 
     def __init__(self):
         super(CoordinateWidget, self).__init__()
@@ -29,6 +35,10 @@ class CoordinateWidget(QtWidgets.QDialog):
         self._anchor_point = None
         self._top_corner = None
         self._bottom_corner = None
+        self._window_provider = None
+        self._window_index = None
+        self._hovered_window = None
+        self._future = None
 
     @property
     def top_corner(self):
@@ -68,6 +78,101 @@ class CoordinateWidget(QtWidgets.QDialog):
         """
         self._constrain_image_ratio = False
 
+    def set_future(self, future):
+        """
+        Set the future to resolve with the marked corners, closing the widget
+        cancels the future and cancelling the future closes the widget.
+        :param CaptureFuture future:
+        :return: None
+        """
+        self._future = future
+        future.keep_alive(self)
+        future.aborted.connect(self.close)
+
+        CoordinateWidget._pending.add(self)
+        future.add_done_callback(
+            lambda done: CoordinateWidget._pending.discard(self))
+
+    def _resolve_future(self):
+        """
+        Resolve the future with the marked corners, or cancel it when no area
+        has been marked.
+        :return: None
+        """
+        if self._future is None or self._future.done():
+            return
+
+        if self._top_corner is None or self._bottom_corner is None:
+            self._future.cancel()
+        else:
+            self._future.set_result((self._top_corner, self._bottom_corner))
+
+    def hideEvent(self, event):
+        """
+        Overwritten method from QWidget to resolve the future when the widget
+        gets closed, e.g. by pressing escape.
+        :param QtGui.QHideEvent event:
+        :return: None
+        """
+        self._resolve_future()
+        # the windows may have moved by the time the widget is shown again
+        self._window_index = None
+        super(CoordinateWidget, self).hideEvent(event)
+
+    def enable_window_pick(self, provider, window_index=None):
+        """
+        Enables the window pick mode, the window geometries are taken from the
+        given provider once the widget is shown.
+        :param WindowGeometryProvider provider: provider of window geometries
+        :param WindowIndex window_index: index already built from the
+        provider, used instead of querying the provider again on show
+        :return: None
+        """
+        self._window_provider = provider
+        self._window_index = window_index
+
+    def disable_window_pick(self):
+        """
+        Disables the window pick mode.
+        :return: None
+        """
+        self._window_provider = None
+        self._window_index = None
+        self._hovered_window = None
+
+    def _build_window_index(self):
+        """
+        Build the window index from the window provider, if any.
+        :return: None
+        """
+        if self._window_provider is not None:
+            self._window_index = WindowIndex.from_provider(
+                self._window_provider)
+
+    def showEvent(self, event):
+        """
+        Overwritten method from QWidget to collect the window geometries once
+        when the widget opens, unless they have been collected already.
+        :param QtGui.QShowEvent event:
+        :return: None
+        """
+        if self._window_index is None:
+            self._build_window_index()
+        super(CoordinateWidget, self).showEvent(event)
+
+    def _window_at(self, point):
+        """
+        Get the geometry of the window under the given point.
+        :param QtCore.QPoint point:
+        :return: QtCore.QRect or None
+        """
+        if self._window_provider is None:
+            return None
+
+        if self._window_index is None:
+            self._build_window_index()
+        return self._window_index.window_at(point)
+
     def _calculate_marked_area(self, anchor_point, offset_point):
         """
         Calculate the marked area between the given anchor point and offset
@@ -84,7 +189,7 @@ class CoordinateWidget(QtWidgets.QDialog):
                 int(marked_area.height() * self._image_ratio))
 
             # move towards the cursor
-            new_pos = copy.copy(anchor_point)
+            new_pos = QtCore.QPoint(anchor_point)
 
             if offset_point.x() > anchor_point.x():
                 new_pos.setX(new_pos.x() - marked_area.width())
@@ -108,7 +213,9 @@ class CoordinateWidget(QtWidgets.QDialog):
         self._mouse_pos.setY(event.y())
 
         # calculate the marked area
-        if self._anchor_point is not None:
+        if self._window_provider is not None:
+            self._hovered_window = self._window_at(event.pos())
+        elif self._anchor_point is not None:
             result = self._calculate_marked_area(
                 self._anchor_point, event.pos())
             self._marked_area = result
@@ -123,18 +230,36 @@ class CoordinateWidget(QtWidgets.QDialog):
         React to left mouse button clicks. On the first click the top left
         corner is stored. On the second click the bottom right corner will be
         stored and the widget will close itself. On right clicks the top corner
-        will be reset.
+        will be reset. In window pick mode a left click marks the window under
+        the cursor and closes the widget, a click outside of any window
+        cancels.
         :param QtGui.QMouseEvent event: mouse event
         :return: None
         """
-        if QtCore.Qt.LeftButton == event.button():
+        if self._window_provider is not None:
+            if QtCore.Qt.LeftButton == event.button():
+                window = self._window_at(event.pos())
+                if window is None:
+                    # nothing can be picked here, clicking it cancels
+                    self.close()
+                else:
+                    self._top_corner = window.topLeft()
+                    self._bottom_corner = QtCore.QPoint(
+                        window.x() + window.width(),
+                        window.y() + window.height())
+                    # close first so the widget isn't part of the grab
+                    self.close()
+                    self._resolve_future()
+        elif QtCore.Qt.LeftButton == event.button():
             if self._anchor_point is None:
                 self._anchor_point = event.pos()
             else:
                 self._marked_area = self._calculate_marked_area(
                     self._anchor_point, event.pos())
                 self._calc_corners()
+                # close first so the widget isn't part of the grab
                 self.close()
+                self._resolve_future()
         elif QtCore.Qt.RightButton == event.button():
             self._anchor_point = None
             self.repaint()
@@ -196,6 +321,27 @@ class CoordinateWidget(QtWidgets.QDialog):
         else:
             self._paint_lines_marked_area(painter)
 
+    def _paint_window_highlight(self, painter):  # pragma: no cover
+        """
+        Paint the highlight of the window under the cursor.
+        :param QtGui.QPainter painter: painter object to paint on
+        :return: None
+        """
+        if self._hovered_window is None:
+            painter.fillRect(
+                0, 0, self.width(), self.height(), self._unmarked_color)
+            return
+
+        window_region = QtGui.QRegion(self._hovered_window)
+        unmarked_region = QtGui.QRegion(self.rect()).subtracted(window_region)
+        for rect in unmarked_region.rects():
+            painter.fillRect(rect, self._unmarked_color)
+        painter.fillRect(self._hovered_window, self._marked_color)
+
+        pen = QtGui.QPen(self._line_color, 2, QtCore.Qt.SolidLine)
+        painter.setPen(pen)
+        painter.drawRect(self._hovered_window)
+
     def _paint_regions(self, painter):  # pragma: no cover
         """
         Paint the marked and unmarked regions.
@@ -261,20 +407,63 @@ class CoordinateWidget(QtWidgets.QDialog):
         painter.begin(self)
         painter.setRenderHint(QtGui.QPainter.Antialiasing, True)
 
-        self._paint_regions(painter)
-        self._paint_cursor_lines(painter)
+        if self._window_provider is not None:
+            self._paint_window_highlight(painter)
+        else:
+            self._paint_regions(painter)
+            self._paint_cursor_lines(painter)
 
         painter.end()
 
     @classmethod
-    def get_coordinates(
-            cls, enable_constraint=False, ratio=1):  # pragma: no cover
+    def select_area(cls, enable_constraint=False, ratio=1):  # pragma: no cover
+        """
+        Show a CoordinateWidget without blocking for marking an area.
+        :param bool enable_constraint: constrain the image ratio
+        :param float ratio: image ratio
+        :return: CaptureFuture resolving to the top and bottom corner
+        """
         inst = cls()
+        inst.setAttribute(QtCore.Qt.WA_DeleteOnClose)
 
         if enable_constraint:
             inst.enable_ratio_constraint()
             inst.set_image_ratio(ratio)
 
+        future = CaptureFuture()
+        inst.set_future(future)
+        inst.showFullScreen()
+        return future
+
+    @classmethod
+    def select_window(cls, provider):
+        """
+        Show a CoordinateWidget in window pick mode without blocking. When the
+        provider has no windows to pick, no widget is shown and the returned
+        future is cancelled.
+        :param WindowGeometryProvider provider: provider of window geometries
+        :return: CaptureFuture resolving to the top and bottom corner
+        """
+        future = CaptureFuture()
+        window_index = WindowIndex.from_provider(provider)
+        if not len(window_index):
+            future.cancel()
+            return future
+
+        inst = cls()
+        inst.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        inst.enable_window_pick(provider, window_index)
+        inst.set_future(future)
         inst.showFullScreen()
-        inst.exec_()
-        return inst.top_corner, inst.bottom_corner
+        return future
+
+    @classmethod
+    def get_coordinates(
+            cls, enable_constraint=False, ratio=1):  # pragma: no cover
+        result = cls.select_area(enable_constraint, ratio).wait()
+        return (None, None) if result is None else result
+
+    @classmethod
+    def get_window_coordinates(cls, provider):  # pragma: no cover
+        result = cls.select_window(provider).wait()
+        return (None, None) if result is None else result
@@ -0,0 +1,157 @@
+from PySide2 import QtCore
+
+
+class CaptureCancelled(Exception):
+    """
+    Raised when the result of a cancelled capture is requested.
+    """
+
+
+class CaptureFuture(QtCore.QObject):
+    """
+    CaptureFuture, result of a capture which is still in progress. The result
+    can be received through the finished signal, done callbacks, by awaiting
+    it from an asyncio loop running alongside the Qt event loop, or by
+    waiting for it in a local event loop.
+    """
+    finished = QtCore.Signal(object)
+    aborted = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        super(CaptureFuture, self).__init__(parent)
+        self._done = False
+        self._cancelled = False
+        self._result = None
+        self._callbacks = []
+        self._keep_alive = None
+
+    @classmethod
+    def from_result(cls, result):
+        """
+        Create a future which is already done.
+        :param result: result of the future
+        :return: CaptureFuture
+        """
+        future = cls()
+        future.set_result(result)
+        return future
+
+    def keep_alive(self, obj):
+        """
+        Keep a reference to the given object until the future is done, e.g.
+        to the widget which will resolve it.
+        :param obj:
+        :return: None
+        """
+        self._keep_alive = obj
+
+    def done(self):
+        """
+        Check if the future is done, either finished or cancelled.
+        :return: bool
+        """
+        return self._done
+
+    def is_cancelled(self):
+        """
+        Check if the future has been cancelled.
+        :return: bool
+        """
+        return self._cancelled
+
+    def result(self):
+        """
+        Get the result of the future.
+        :raise CaptureCancelled: When the future has been cancelled
+        :raise RuntimeError: When the future isn't done yet
+        :return: result of the future
+        """
+        if self._cancelled:
+            raise CaptureCancelled('The capture has been cancelled')
+        if not self._done:
+            raise RuntimeError('The capture is still in progress')
+        return self._result
+
+    def add_done_callback(self, callback):
+        """
+        Add a callback which is called with the future once it's done. When
+        the future is already done the callback is called right away.
+        :param callable callback:
+        :return: None
+        """
+        if self._done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def _finish(self):
+        """
+        Mark the future as done and run the done callbacks.
+        :return: None
+        """
+        self._done = True
+        self._keep_alive = None
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def set_result(self, result):
+        """
+        Finish the future with the given result.
+        :param result:
+        :raise RuntimeError: When the future is already done
+        :return: None
+        """
+        if self._done:
+            raise RuntimeError('The capture is already done')
+        self._result = result
+        self._finish()
+        self.finished.emit(result)
+
+    @QtCore.Slot()
+    def cancel(self):
+        """
+        Cancel the future, cancelling a future which is done has no effect.
+        :return: bool, True if the future got cancelled
+        """
+        if self._done:
+            return False
+        self._cancelled = True
+        self._finish()
+        self.aborted.emit()
+        return True
+
+    def wait(self):
+        """
+        Block in a local event loop until the future is done.
+        :return: result of the future, None if cancelled
+        """
+        if not self._done:
+            loop = QtCore.QEventLoop()
+            self.add_done_callback(lambda future: loop.quit())
+            loop.exec_()
+        return None if self._cancelled else self._result
+
+    def __await__(self):
+        # note: imported here since asyncio isn't available on Python 2
+        import asyncio
+
+        loop = asyncio.get_event_loop()
+        asyncio_future = loop.create_future()
+
+        def transfer(future):
+            if asyncio_future.done():
+                return
+            if future.is_cancelled():
+                asyncio_future.cancel()
+            else:
+                asyncio_future.set_result(future.result())
+
+        def on_done(future):
+            loop.call_soon_threadsafe(transfer, future)
+
+        # cancelling the awaiting task also cancels the capture
+        asyncio_future.add_done_callback(
+            lambda fut: fut.cancelled() and self.cancel())
+        self.add_done_callback(on_done)
+        return asyncio_future.__await__()
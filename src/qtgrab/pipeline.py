@@ -0,0 +1,651 @@
+import collections
+import threading
+import time
+import timeit
+from PySide2 import QtCore, QtGui
+from qtgrab.capture import grab_area
+from qtgrab.clipboard import ENCODED_MIME_TYPES, DEFAULT_MIME_TYPES, copy_image
+
+
+class Frame(object):
+    """
+    Frame, a single captured image travelling through a pipeline. Stages
+    replace the image when they change it, frames they leave untouched are
+    passed on as they are.
+    """
+
+    def __init__(self, image, origin=None, index=0, timestamp=None):
+        self.image = image
+        self.origin = QtCore.QPoint(0, 0) if origin is None else origin
+        self.index = index
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.data = None
+        self.encoding = None
+        self.metadata = {}
+
+
+class StageStats(object):
+    """
+    StageStats, timing statistics of a single pipeline stage.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.seconds = 0.0
+
+    @property
+    def mean(self):
+        """
+        The mean processing time of a frame in seconds.
+        :return: float
+        """
+        return self.seconds / self.count if self.count else 0.0
+
+    def __repr__(self):
+        return '<StageStats {0}: {1} frames, {2:.6f}s>'.format(
+            self.name, self.count, self.seconds)
+
+
+class Stage(object):
+    """
+    Stage, base class for the stages of a pipeline. Stages flagged as
+    parallel don't depend on other frames or on the GUI thread, so they may
+    be run on the pipeline's worker pool.
+    """
+    parallel = False
+
+    @property
+    def name(self):
+        """
+        The name the stage is reported under in the pipeline stats.
+        :return: str
+        """
+        return type(self).__name__
+
+    def process(self, frame):
+        """
+        Process the given frame.
+        :param Frame frame:
+        :return: Frame
+        """
+        raise NotImplementedError
+
+
+class CropStage(Stage):
+    """
+    CropStage, crops the frames to the given rect, relative to the frame.
+    """
+    parallel = True
+
+    def __init__(self, rect):
+        self._rect = QtCore.QRect(rect)
+
+    def process(self, frame):
+        """
+        Crop the frame, frames already matching the rect are left untouched.
+        When the rect lies outside of the frame the image becomes empty.
+        :param Frame frame:
+        :return: Frame
+        """
+        rect = self._rect.intersected(frame.image.rect())
+        if rect.isEmpty():
+            # note: copying an empty rect would copy the whole image
+            frame.image = QtGui.QImage()
+            frame.origin = frame.origin + self._rect.topLeft()
+        elif rect != frame.image.rect():
+            frame.image = frame.image.copy(rect)
+            frame.origin = frame.origin + rect.topLeft()
+        return frame
+
+
+class ScaleStage(Stage):
+    """
+    ScaleStage, scales the frames to fit the given size.
+    """
+    parallel = True
+
+    def __init__(self, size, aspect_mode=QtCore.Qt.KeepAspectRatio,
+                 transform_mode=QtCore.Qt.SmoothTransformation):
+        self._size = QtCore.QSize(size)
+        self._aspect_mode = aspect_mode
+        self._transform_mode = transform_mode
+
+    def process(self, frame):
+        """
+        Scale the frame, frames already at the right size are left untouched.
+        :param Frame frame:
+        :return: Frame
+        """
+        size = frame.image.size().scaled(self._size, self._aspect_mode)
+        if size != frame.image.size():
+            frame.image = frame.image.scaled(
+                size, QtCore.Qt.IgnoreAspectRatio, self._transform_mode)
+        return frame
+
+
+class RedactStage(Stage):
+    """
+    RedactStage, redacts the frames with the given redactor.
+    """
+    parallel = True
+
+    def __init__(self, redactor, in_place=False):
+        self._redactor = redactor
+        self._in_place = in_place
+
+    def process(self, frame):
+        """
+        Redact the frame. Unless in place, the redacted image replaces the
+        frame's image so the source of the frame stays untouched.
+        :param Frame frame:
+        :return: Frame
+        """
+        frame.image = self._redactor.apply(frame.image, self._in_place)
+        return frame
+
+
+class AnnotateStage(Stage):
+    """
+    AnnotateStage, paints the annotations of a layer over the frames at full
+    resolution.
+    """
+
+    def __init__(self, layer):
+        self._layer = layer
+
+    def process(self, frame):
+        """
+        Annotate the frame, the annotated image replaces the frame's image.
+        :param Frame frame:
+        :return: Frame
+        """
+        frame.image = self._layer.render(frame.image)
+        return frame
+
+
+class EncodeStage(Stage):
+    """
+    EncodeStage, encodes the frames into the given image format.
+    """
+    parallel = True
+
+    def __init__(self, image_format='PNG', quality=-1):
+        self._image_format = image_format
+        self._quality = quality
+
+    def process(self, frame):
+        """
+        Encode the frame's image and store the result as the frame's data.
+        :param Frame frame:
+        :raise IOError: When the image can't be encoded
+        :return: Frame
+        """
+        buffer = QtCore.QBuffer()
+        buffer.open(QtCore.QIODevice.WriteOnly)
+        if not frame.image.save(buffer, self._image_format, self._quality):
+            raise IOError(
+                'Failed to encode frame as {0}'.format(self._image_format))
+        frame.data = bytes(buffer.data())
+        frame.encoding = self._image_format
+        return frame
+
+
+class FileSink(Stage):
+    """
+    FileSink, writes the frames to disk. The file path may contain a {index}
+    field for writing streams of frames.
+    """
+
+    def __init__(self, file_path):
+        self._file_path = file_path
+
+    def process(self, frame):
+        """
+        Write the frame, encoded data is written as is, otherwise the image is
+        saved in the format matching the file extension.
+        :param Frame frame:
+        :return: Frame
+        """
+        file_path = self._file_path.format(index=frame.index)
+        if frame.data is not None:
+            with open(file_path, 'wb') as file_handle:
+                file_handle.write(frame.data)
+            saved = True
+        else:
+            saved = frame.image.save(file_path)
+
+        frame.metadata['file_path'] = file_path
+        frame.metadata['saved'] = saved
+        return frame
+
+
+class MemorySink(Stage):
+    """
+    MemorySink, keeps the frames in memory.
+    """
+
+    def __init__(self, max_frames=None):
+        self.frames = collections.deque(maxlen=max_frames)
+
+    def process(self, frame):
+        """
+        Store the frame.
+        :param Frame frame:
+        :return: Frame
+        """
+        self.frames.append(frame)
+        return frame
+
+
+class ClipboardSink(Stage):
+    """
+    ClipboardSink, puts the frames on the clipboard. Only the last frame of a
+    stream will remain on the clipboard. The formats are encoded when a
+    consumer asks for them, data encoded earlier in the pipeline is reused.
+    """
+
+    def __init__(self, mime_types=DEFAULT_MIME_TYPES, metrics=None):
+        self._mime_types = mime_types
+        self._metrics = metrics
+
+    def process(self, frame):
+        """
+        Put the frame's image on the clipboard.
+        :param Frame frame:
+        :return: Frame
+        """
+        mime_data = copy_image(frame.image, self._mime_types, self._metrics)
+        for mime_type, image_format in ENCODED_MIME_TYPES.items():
+            if frame.data is not None and frame.encoding == image_format \
+                    and mime_type in self._mime_types:
+                mime_data.set_encoded(mime_type, frame.data)
+        return frame
+
+
+class PublishSink(Stage):
+    """
+    PublishSink, publishes the raw pixels of the frames into shared memory
+    for other processes to read.
+    """
+
+    def __init__(self, publisher):
+        self._publisher = publisher
+
+    def process(self, frame):
+        """
+        Publish the frame's image.
+        :param Frame frame:
+        :return: Frame
+        """
+        frame.metadata['sequence'] = self._publisher.publish(
+            frame.image, frame.timestamp)
+        return frame
+
+
+def screen_frames(rect, count=None, interval=0.0):
+    """
+    Generate frames by continuously grabbing the given area of the desktop.
+    This is a blocking helper, grabs have to run on the GUI thread and the
+    event loop doesn't run while the generator is consumed or waits for the
+    interval. Use a ScreenStream to stream from a running application.
+    :param QtCore.QRect rect: area in desktop coordinates
+    :param int count: number of frames, None for an endless stream
+    :param float interval: minimal time between two grabs in seconds
+    :return: generator of Frame objects
+    """
+    index = 0
+    next_grab = timeit.default_timer()
+    while count is None or index < count:
+        delay = next_grab - timeit.default_timer()
+        if delay > 0:
+            time.sleep(delay)
+        next_grab = timeit.default_timer() + interval
+
+        yield Frame(grab_area(rect), rect.topLeft(), index)
+        index += 1
+
+
+class _StreamedFrame(object):
+    """
+    _StreamedFrame, a frame of a screen stream on its way through the
+    segments of the pipeline.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        # index of the next segment to run
+        self.position = 0
+        # false while a segment runs on the worker pool
+        self.ready = True
+
+
+class ScreenStream(QtCore.QObject):
+    """
+    ScreenStream, continuously grabs an area of the desktop from a timer and
+    runs the frames through a pipeline. Every grab is made in between the
+    events of the GUI thread, so the event loop keeps running while
+    streaming. The parallel stages of a pipeline with workers run on its
+    worker pool, the serial stages run on the GUI thread in frame order and
+    the processed frames are emitted in order.
+    """
+    frame_processed = QtCore.Signal(object)
+    finished = QtCore.Signal()
+    # note: emitted from the threads of the pool, the connection queues the
+    # results to the thread of the stream
+    _segment_finished = QtCore.Signal(object, object)
+    _segment_failed = QtCore.Signal(object)
+
+    def __init__(self, rect, pipeline, count=None, interval=0.0,
+                 parent=None):
+        super(ScreenStream, self).__init__(parent)
+        self._rect = QtCore.QRect(rect)
+        self._pipeline = pipeline
+        self._segments = pipeline._segments()
+        self._count = count
+        self._index = 0
+        self._pending = collections.deque()
+        self._pool = None
+        self._running = False
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(int(interval * 1000))
+        self._timer.timeout.connect(self._grab)
+        self._segment_finished.connect(
+            self._on_segment_finished, QtCore.Qt.QueuedConnection)
+        self._segment_failed.connect(
+            self._on_segment_failed, QtCore.Qt.QueuedConnection)
+
+    @property
+    def pipeline(self):
+        """
+        The pipeline the frames are run through.
+        :return: Pipeline
+        """
+        return self._pipeline
+
+    @property
+    def index(self):
+        """
+        The number of frames grabbed so far.
+        :return: int
+        """
+        return self._index
+
+    @property
+    def pending(self):
+        """
+        The number of grabbed frames which haven't been processed yet.
+        :return: int
+        """
+        return len(self._pending)
+
+    def is_active(self):
+        """
+        Check if the stream is grabbing frames.
+        :return: bool
+        """
+        return self._timer.isActive()
+
+    def start(self):
+        """
+        Start grabbing frames once control returns to the event loop.
+        :return: None
+        """
+        if self._count is not None and self._index >= self._count:
+            self.finished.emit()
+            return
+
+        self._running = True
+        if self._pool is None and any(
+                parallel for parallel, _ in self._segments):
+            self._pool = self._pipeline._create_pool()
+        self._timer.start()
+
+    @QtCore.Slot()
+    def stop(self):
+        """
+        Stop grabbing frames. The frames grabbed before are still processed,
+        the stream finishes once they are.
+        :return: None
+        """
+        self._timer.stop()
+        self._finish()
+
+    def _finish(self):
+        """
+        Emit finished once the stream is stopped and every frame has been
+        processed.
+        :return: None
+        """
+        if not self._running or self._timer.isActive() or self._pending:
+            return
+
+        self._running = False
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+        self.finished.emit()
+
+    @QtCore.Slot()
+    def _grab(self):
+        """
+        Grab a single frame and run it through the pipeline. No frame is
+        grabbed while the workers are busy with two frames per worker.
+        :return: None
+        """
+        if len(self._pending) >= max(1, self._pipeline.workers * 2):
+            return
+
+        frame = Frame(grab_area(self._rect), self._rect.topLeft(), self._index)
+        self._index += 1
+        if self._count is not None and self._index >= self._count:
+            self._timer.stop()
+
+        self._pending.append(_StreamedFrame(frame))
+        self._advance()
+
+    def _advance(self):
+        """
+        Run the frames through the segments they're ready for. Parallel
+        segments are submitted to the pool, a serial segment only runs once
+        the frames before have passed it. Processed frames are emitted in
+        order.
+        :return: None
+        """
+        earlier = None
+        for streamed in self._pending:
+            while streamed.ready and \
+                    streamed.position < len(self._segments):
+                parallel, stages = self._segments[streamed.position]
+                if parallel:
+                    streamed.ready = False
+                    self._pool.apply_async(
+                        self._pipeline._run_stages, (stages, streamed.frame),
+                        callback=lambda frame, streamed=streamed:
+                        self._segment_finished.emit(streamed, frame),
+                        error_callback=self._segment_failed.emit)
+                    break
+                if earlier is not None and earlier <= streamed.position:
+                    break
+                streamed.frame = self._pipeline._run_stages(
+                    stages, streamed.frame)
+                streamed.position += 1
+
+            earlier = streamed.position if earlier is None else \
+                min(earlier, streamed.position)
+
+        while self._pending and \
+                self._pending[0].position == len(self._segments):
+            self.frame_processed.emit(self._pending.popleft().frame)
+        self._finish()
+
+    @QtCore.Slot(object, object)
+    def _on_segment_finished(self, streamed, frame):
+        """
+        Continue with a frame a parallel segment has been run over.
+        :param _StreamedFrame streamed:
+        :param Frame frame: the processed frame
+        :return: None
+        """
+        if streamed not in self._pending:
+            return
+
+        streamed.frame = frame
+        streamed.position += 1
+        streamed.ready = True
+        self._advance()
+
+    @QtCore.Slot(object)
+    def _on_segment_failed(self, error):
+        """
+        Stop the stream when a stage failed on the worker pool, the error is
+        raised on the thread of the stream.
+        :param Exception error:
+        :return: None
+        """
+        self._timer.stop()
+        self._pending.clear()
+        self._finish()
+        raise error
+
+
+class Pipeline(object):
+    """
+    Pipeline, chain of stages processing a stream of frames. Frames are
+    pulled through the chain lazily, so a stream is processed frame by frame.
+    Consecutive parallel stages are run on a worker pool, while the frame
+    order is kept.
+    """
+
+    def __init__(self, stages, workers=0):
+        self._stages = list(stages)
+        self._workers = int(workers)
+        self._stats = collections.OrderedDict(
+            (id(stage), StageStats(stage.name)) for stage in self._stages)
+        self._stats_lock = threading.Lock()
+
+    @property
+    def workers(self):
+        """
+        The number of workers the parallel stages are run on.
+        :return: int
+        """
+        return self._workers
+
+    @property
+    def stats(self):
+        """
+        The timing statistics per stage, in stage order.
+        :return: list of StageStats
+        """
+        return list(self._stats.values())
+
+    def _run_stages(self, stages, frame):
+        """
+        Run the given stages over a single frame and keep track of the timing.
+        :param list stages:
+        :param Frame frame:
+        :return: Frame
+        """
+        for stage in stages:
+            start = timeit.default_timer()
+            frame = stage.process(frame)
+            seconds = timeit.default_timer() - start
+
+            with self._stats_lock:
+                stats = self._stats[id(stage)]
+                stats.count += 1
+                stats.seconds += seconds
+        return frame
+
+    def _segments(self):
+        """
+        Split the stages into segments of consecutive parallel or serial
+        stages.
+        :return: list of (bool, list) tuples
+        """
+        segments = []
+        for stage in self._stages:
+            parallel = stage.parallel and self._workers > 0
+            if segments and segments[-1][0] == parallel:
+                segments[-1][1].append(stage)
+            else:
+                segments.append((parallel, [stage]))
+        return segments
+
+    def _create_pool(self):
+        """
+        Create the pool of workers the parallel stages are run on.
+        :return: multiprocessing.pool.ThreadPool
+        """
+        # note: imported here since the pool is slow to import and only
+        # needed for parallel pipelines
+        from multiprocessing.pool import ThreadPool
+        return ThreadPool(self._workers)
+
+    def _serial(self, stages, frames):
+        """
+        Run the stages over the frames in the calling thread.
+        :param list stages:
+        :param iterable frames:
+        :return: generator of Frame objects
+        """
+        for frame in frames:
+            yield self._run_stages(stages, frame)
+
+    def _parallel(self, pool, stages, frames):
+        """
+        Run the stages over the frames on the worker pool. The frames are
+        pulled from the upstream stages in the calling thread and at most two
+        frames per worker are in flight.
+        :param multiprocessing.pool.ThreadPool pool:
+        :param list stages:
+        :param iterable frames:
+        :return: generator of Frame objects
+        """
+        pending = collections.deque()
+        for frame in frames:
+            pending.append(
+                pool.apply_async(self._run_stages, (stages, frame)))
+            if len(pending) >= self._workers * 2:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
+    def stream(self, frames):
+        """
+        Lazily process the given frames.
+        :param iterable frames: frames to process
+        :return: generator of Frame objects
+        """
+        pool = self._create_pool() if self._workers > 0 else None
+        try:
+            for parallel, stages in self._segments():
+                if parallel:
+                    frames = self._parallel(pool, stages, frames)
+                else:
+                    frames = self._serial(stages, frames)
+
+            for frame in frames:
+                yield frame
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    def run(self, frames):
+        """
+        Process all of the given frames.
+        :param iterable frames: frames to process
+        :return: list of Frame objects
+        """
+        return list(self.stream(frames))
+
+    def process(self, frame):
+        """
+        Process a single frame.
+        :param Frame frame: frame to process
+        :return: Frame
+        """
+        return self._run_stages(self._stages, frame)
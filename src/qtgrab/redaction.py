@@ -0,0 +1,283 @@
+from PySide2 import QtCore, QtGui
+
+
+PIXELATE = 'pixelate'
+FILL = 'fill'
+BLUR = 'blur'
+
+# formats QPainter can paint on directly without a conversion
+_PAINTABLE_FORMATS = (
+    QtGui.QImage.Format_RGB32,
+    QtGui.QImage.Format_ARGB32,
+    QtGui.QImage.Format_ARGB32_Premultiplied,
+)
+
+
+def _paint_image(target, pos, source):
+    """
+    Replace the pixels of the target image at the given position with the
+    source image.
+    :param QtGui.QImage target: image to paint on
+    :param QtCore.QPoint pos: top left corner to paint the source at
+    :param QtGui.QImage source: image to paint
+    :return: None
+    """
+    painter = QtGui.QPainter(target)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+    painter.drawImage(pos, source)
+    painter.end()
+
+
+def fill(image, rect, color):
+    """
+    Fill the given area of the image with a solid color.
+    :param QtGui.QImage image: image to redact in place
+    :param QtCore.QRect rect: area to redact
+    :param QtGui.QColor color: fill color
+    :return: None
+    """
+    painter = QtGui.QPainter(image)
+    painter.setCompositionMode(QtGui.QPainter.CompositionMode_Source)
+    painter.fillRect(rect, color)
+    painter.end()
+
+
+def _block_grid(area, rect, block_size):
+    """
+    Get the blocks of a pixelated area covering the given rect. The block
+    grid is anchored at the top left corner of the area and cut off at its
+    end.
+    :param QtCore.QRect area: pixelated area
+    :param QtCore.QRect rect: part of the area
+    :param int block_size: size of the blocks in pixels
+    :return: QtCore.QRect
+    """
+    left = area.x() + (rect.x() - area.x()) // block_size * block_size
+    top = area.y() + (rect.y() - area.y()) // block_size * block_size
+    right = min(area.x() + area.width(), area.x() + -(
+        -(rect.x() + rect.width() - area.x()) // block_size) * block_size)
+    bottom = min(area.y() + area.height(), area.y() + -(
+        -(rect.y() + rect.height() - area.y()) // block_size) * block_size)
+    return QtCore.QRect(left, top, right - left, bottom - top)
+
+
+def pixelate(image, rect, block_size, area=None):
+    """
+    Pixelate the given area of the image. Every row of blocks is downscaled
+    so every block is averaged into a single pixel, then upscaled again
+    without interpolation. The block grid is anchored at the top left corner
+    of the area, so a part of an area is pixelated the same as the whole.
+    :param QtGui.QImage image: image to redact in place
+    :param QtCore.QRect rect: area to redact
+    :param int block_size: size of the blocks in pixels
+    :param QtCore.QRect area: whole area the rect is a part of, the block
+    grid is anchored at its top left corner, defaults to the rect
+    :return: None
+    """
+    if area is None:
+        area = rect.intersected(image.rect())
+    rect = rect.intersected(area).intersected(image.rect())
+    if rect.isEmpty():
+        return
+
+    grid = _block_grid(area, rect, block_size).intersected(image.rect())
+
+    columns = max(1, -(-grid.width() // block_size))
+    for y in range(grid.y(), grid.y() + grid.height(), block_size):
+        strip = QtCore.QRect(
+            grid.x(), y, grid.width(),
+            min(block_size, grid.y() + grid.height() - y))
+        target = strip.intersected(rect)
+        if target.isEmpty():
+            continue
+
+        blocks = image.copy(strip).scaled(
+            columns, 1, QtCore.Qt.IgnoreAspectRatio,
+            QtCore.Qt.SmoothTransformation)
+        blocks = blocks.scaled(
+            columns * block_size, strip.height(),
+            QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.FastTransformation)
+        _paint_image(image, target.topLeft(), blocks.copy(
+            target.x() - grid.x(), 0, target.width(), target.height()))
+
+
+def _box_blur_pass(image, radius, horizontal):
+    """
+    Run a single box blur pass over the image in place. Every shifted copy
+    of the image is blended in with an opacity of 1 / n, which keeps the
+    image the running average of the n copies blended in so far.
+    :param QtGui.QImage image: image to blur
+    :param int radius: blur radius in pixels
+    :param bool horizontal: blur horizontally or vertically
+    :return: None
+    """
+    source = image.copy()
+    painter = QtGui.QPainter(image)
+    count = 1
+    for offset in range(-radius, radius + 1):
+        if offset == 0:
+            continue
+        count += 1
+        painter.setOpacity(1.0 / count)
+        if horizontal:
+            painter.drawImage(offset, 0, source)
+        else:
+            painter.drawImage(0, offset, source)
+    painter.end()
+
+
+def box_blur(image, rect, radius):
+    """
+    Box blur the given area of the image. The blur is separable so it is done
+    in a horizontal and a vertical pass, each of them blending 2 * radius
+    shifted copies of the area, sampled from the area's surroundings.
+    :param QtGui.QImage image: image to redact in place
+    :param QtCore.QRect rect: area to redact
+    :param int radius: blur radius in pixels
+    :return: None
+    """
+    rect = rect.intersected(image.rect())
+    if rect.isEmpty() or radius < 1:
+        return
+
+    source_rect = rect.adjusted(
+        -radius, -radius, radius, radius).intersected(image.rect())
+    area = image.copy(source_rect)
+    _box_blur_pass(area, radius, True)
+    _box_blur_pass(area, radius, False)
+
+    offset = rect.topLeft() - source_rect.topLeft()
+    _paint_image(image, rect.topLeft(), area.copy(
+        offset.x(), offset.y(), rect.width(), rect.height()))
+
+
+class Redactor(object):
+    """
+    Redactor, redacts areas of a capture before it is saved. Every area is
+    redacted with Qt's raster operations, so the work is done over whole
+    scanlines instead of pixel by pixel.
+    """
+
+    def __init__(self, mode=PIXELATE, block_size=12, radius=8, color=None):
+        self._mode = mode
+        self._block_size = int(block_size)
+        self._radius = int(radius)
+        self._color = QtGui.QColor(0, 0, 0) if color is None else color
+        self._areas = []
+
+    @property
+    def areas(self):
+        """
+        The areas to redact with their redaction mode.
+        :return: list of (QtCore.QRect, str) tuples
+        """
+        return list(self._areas)
+
+    def add_area(self, rect, mode=None):
+        """
+        Add an area to redact.
+        :param QtCore.QRect rect: area to redact
+        :param str mode: redaction mode, defaults to the redactor's mode
+        :raise ValueError: When the mode is unknown
+        :return: None
+        """
+        mode = self._mode if mode is None else mode
+        if mode not in (PIXELATE, FILL, BLUR):
+            raise ValueError('Unknown redaction mode: {0}'.format(mode))
+        self._areas.append((QtCore.QRect(rect), mode))
+
+    def clear_areas(self):
+        """
+        Remove all the areas to redact.
+        :return: None
+        """
+        self._areas = []
+
+    @staticmethod
+    def _grid_area(rect):
+        """
+        Get the area the block grid of a pixelated area is anchored at, the
+        part of the area within the capture.
+        :param QtCore.QRect rect: area to pixelate in capture coordinates
+        :return: QtCore.QRect
+        """
+        return QtCore.QRect(
+            QtCore.QPoint(max(rect.x(), 0), max(rect.y(), 0)),
+            rect.bottomRight())
+
+    def _requirements(self, rect):
+        """
+        Get the parts of the areas to redact which have to be redacted for
+        the given area to come out right. Blurs and pixelation read the
+        pixels around the part they redact, as left by the areas redacted
+        before them, which widens the parts of those areas.
+        :param QtCore.QRect rect: area of the capture
+        :return: tuple of a list of QtCore.QRect per area to redact and the
+        QtCore.QRect of the capture all of them depend on
+        """
+        required = QtCore.QRect(rect)
+        requirements = []
+        for area, mode in reversed(self._areas):
+            requirements.append(QtCore.QRect(required))
+            part = area.intersected(required)
+            if part.isEmpty() or mode == FILL:
+                continue
+            if mode == BLUR:
+                required = required.united(part.adjusted(
+                    -self._radius, -self._radius, self._radius, self._radius))
+            else:
+                required = required.united(_block_grid(
+                    self._grid_area(area), part, self._block_size))
+        requirements.reverse()
+        return requirements, required
+
+    def source_rect(self, rect):
+        """
+        Get the area of the capture the redacted pixels of the given area
+        depend on. Blurs widen it by their radius and pixelated areas to the
+        blocks they cover, fills don't widen it.
+        :param QtCore.QRect rect: area of the capture
+        :return: QtCore.QRect
+        """
+        return self._requirements(rect)[1]
+
+    def apply(self, image, in_place=False, offset=None, clip=None):
+        """
+        Redact the areas of the given image.
+        :param QtGui.QImage image: image to redact
+        :param bool in_place: redact the given image instead of a copy, only
+        possible when the image has a format that can be painted on
+        :param QtCore.QPoint offset: position of the image in the capture,
+        when it only holds a part of it
+        :param QtCore.QRect clip: area of the capture to redact, the image
+        has to hold the source rect of it, defaults to the whole image
+        :return: QtGui.QImage
+        """
+        if not self._areas:
+            return image
+
+        if image.format() not in _PAINTABLE_FORMATS:
+            image = image.convertToFormat(
+                QtGui.QImage.Format_ARGB32_Premultiplied)
+        elif not in_place:
+            image = image.copy()
+
+        offset = QtCore.QPoint(0, 0) if offset is None else offset
+        if clip is None:
+            requirements = [None] * len(self._areas)
+        else:
+            requirements = self._requirements(clip)[0]
+
+        for (rect, mode), required in zip(self._areas, requirements):
+            part = rect if required is None else rect.intersected(required)
+            if part.isEmpty():
+                continue
+            part = part.translated(-offset)
+            if mode == FILL:
+                fill(image, part, self._color)
+            elif mode == PIXELATE:
+                pixelate(image, part, self._block_size,
+                         self._grid_area(rect).translated(-offset))
+            else:
+                box_blur(image, part, self._radius)
+        return image
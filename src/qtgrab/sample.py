@@ -50,11 +50,22 @@ class SampleUi(QtWidgets.QWidget):
         layout.addWidget(self.btn_capture)
         self.btn_capture.clicked.connect(self._shot_widget.capture_screen)
 
+        # capture window button
+        self.btn_capture_window = QtWidgets.QPushButton('Capture Window')
+        layout.addWidget(self.btn_capture_window)
+        self.btn_capture_window.clicked.connect(
+            self._shot_widget.capture_window)
+
         # save the capture button
         self.btn_save = QtWidgets.QPushButton('Save Capture')
         layout.addWidget(self.btn_save)
         self.btn_save.clicked.connect(self.save_capture)
 
+        # copy the capture button
+        self.btn_copy = QtWidgets.QPushButton('Copy Capture')
+        layout.addWidget(self.btn_copy)
+        self.btn_copy.clicked.connect(self.copy_capture)
+
     @QtCore.Slot(int)
     def toggle_ratio(self, state):
         """
@@ -93,6 +104,17 @@ class SampleUi(QtWidgets.QWidget):
 
         self._shot_widget.save_capture(file_path)
 
+    @QtCore.Slot()
+    def copy_capture(self):
+        """
+        Copy the screen grab to the clipboard, if any.
+        :return: None
+        """
+        try:
+            self._shot_widget.copy_capture()
+        except ValueError:
+            return
+
 
 def main():  # pragma: no cover
     app = QtWidgets.QApplication([])
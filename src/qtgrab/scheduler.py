@@ -0,0 +1,244 @@
+import collections
+import heapq
+import itertools
+import timeit
+from PySide2 import QtCore, QtGui
+from qtgrab.capture import Capture, DEFAULT_FORMAT, grab_area
+
+
+def _region_area(region):
+    """
+    Get the number of pixels covered by the given region.
+    :param QtGui.QRegion region:
+    :return: int
+    """
+    return sum(rect.width() * rect.height() for rect in region.rects())
+
+
+def _rect_area(rect):
+    """
+    Get the number of pixels of the given rect.
+    :param QtCore.QRect rect:
+    :return: int
+    """
+    return rect.width() * rect.height()
+
+
+def _merge_candidate(first, second):
+    """
+    Get the waste of merging two groups of rects with the merged group.
+    :param tuple first: bounding rect, region and indices of a group
+    :param tuple second: bounding rect, region and indices of a group
+    :return: tuple of float waste, bounding rect and region
+    """
+    bounds = first[0].united(second[0])
+    region = first[1].united(second[1])
+    waste = 1.0 - float(_region_area(region)) / _rect_area(bounds)
+    return waste, bounds, region
+
+
+def coalesce_rects(rects, waste_threshold=0.25):
+    """
+    Merge the given rects into as few bounding rects as possible. Two groups
+    of rects are merged when the part of their bounding rect which isn't
+    covered by any of the rects, the waste, doesn't exceed the threshold.
+    The groups with the least waste are merged first. The waste of every
+    pair of groups is computed once and kept in a heap, after a merge only
+    the pairs with the merged group are computed, so n rects take O(n^2)
+    region unions instead of O(n^3).
+    :param list rects: list of QtCore.QRect
+    :param float waste_threshold: maximal ratio of wasted pixels, 0 to 1
+    :return: list of (QtCore.QRect, list of int) tuples, the bounding rects
+    with the indices of the rects they contain
+    """
+    # note: a merged group takes over the key of its first group, so the
+    # keys keep the order of the groups and ties merge the same pairs as a
+    # pass over all the pairs in order would
+    groups = collections.OrderedDict(
+        (index, (QtCore.QRect(rect), QtGui.QRegion(rect), [index]))
+        for index, rect in enumerate(rects) if not rect.isEmpty())
+    # the version of a group changes with every merge, which invalidates
+    # the pairs in the heap computed from the group before
+    versions = dict.fromkeys(groups, 0)
+
+    heap = []
+    for first, second in itertools.combinations(groups, 2):
+        waste, bounds, region = _merge_candidate(
+            groups[first], groups[second])
+        if waste <= waste_threshold:
+            heap.append((waste, first, second, 0, 0, bounds, region))
+    heapq.heapify(heap)
+
+    while heap:
+        _, first, second, first_version, second_version, bounds, region = \
+            heapq.heappop(heap)
+        if versions.get(first) != first_version or \
+                versions.get(second) != second_version:
+            continue
+
+        indices = groups[first][2] + groups[second][2]
+        groups[first] = (bounds, region, sorted(indices))
+        del groups[second]
+        del versions[second]
+        versions[first] += 1
+
+        for other in groups:
+            if other == first:
+                continue
+            pair = (first, other) if first < other else (other, first)
+            waste, bounds, region = _merge_candidate(
+                groups[pair[0]], groups[pair[1]])
+            if waste <= waste_threshold:
+                heapq.heappush(heap, (
+                    waste, pair[0], pair[1], versions[pair[0]],
+                    versions[pair[1]], bounds, region))
+
+    return [(bounds, indices) for bounds, _, indices in groups.values()]
+
+
+class TickStats(object):
+    """
+    TickStats, statistics of a single scheduler tick.
+    """
+
+    def __init__(self, timestamp, grabs, regions, bytes_read):
+        self.timestamp = timestamp
+        self.grabs = grabs
+        self.regions = regions
+        self.bytes_read = bytes_read
+
+    def __repr__(self):
+        return '<TickStats {0} grabs, {1} regions, {2} bytes>'.format(
+            self.grabs, self.regions, self.bytes_read)
+
+
+class ScheduledRegion(object):
+    """
+    ScheduledRegion, area of the desktop captured on a fixed period.
+    """
+
+    def __init__(self, rect, period, callback, next_due):
+        self.rect = QtCore.QRect(rect)
+        self.period = float(period)
+        self.callback = callback
+        self.next_due = next_due
+
+
+class CaptureScheduler(QtCore.QObject):
+    """
+    CaptureScheduler, captures many areas of the desktop, each on its own
+    period. The regions which are due in the same tick are coalesced into as
+    few grabs as possible, every region is then cropped from the shared grab
+    as a view, without copying its pixels. The views of overlapping regions
+    share their pixels, so callbacks must treat the view as read only.
+    Callbacks which want to keep the pixels or paint on them, e.g. to add a
+    timestamp, have to copy the view first.
+    """
+    tick_finished = QtCore.Signal(object)
+
+    def __init__(self, waste_threshold=0.25, image_format=DEFAULT_FORMAT,
+                 history=100, parent=None):
+        super(CaptureScheduler, self).__init__(parent)
+        self._waste_threshold = float(waste_threshold)
+        self._image_format = image_format
+        self._regions = collections.OrderedDict()
+        self._region_ids = itertools.count()
+        self._history = collections.deque(maxlen=history)
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self.tick)
+
+    @property
+    def history(self):
+        """
+        The statistics of the latest ticks which captured any regions.
+        :return: list of TickStats
+        """
+        return list(self._history)
+
+    def set_waste_threshold(self, value):
+        """
+        Set the maximal ratio of wasted pixels when merging regions.
+        :param float value: ratio from 0 to 1
+        :return: None
+        """
+        self._waste_threshold = float(value)
+
+    def add_region(self, rect, period, callback, now=None):
+        """
+        Add a region to capture. The region is first captured on the next
+        tick.
+        :param QtCore.QRect rect: area in desktop coordinates
+        :param float period: time between two captures in seconds
+        :param callable callback: called with a CaptureView of the region,
+        which shares its pixels with the other regions of the same grab and
+        has to be copied before painting on it
+        :param float now: current time, defaults to the timer's clock
+        :return: int id of the region
+        """
+        now = timeit.default_timer() if now is None else now
+        region_id = next(self._region_ids)
+        self._regions[region_id] = ScheduledRegion(
+            rect, period, callback, now)
+        return region_id
+
+    def remove_region(self, region_id):
+        """
+        Remove a region by its id.
+        :param int region_id:
+        :return: None
+        """
+        self._regions.pop(region_id, None)
+
+    def start(self, resolution=0.1):
+        """
+        Start ticking at the given resolution.
+        :param float resolution: time between two ticks in seconds
+        :return: None
+        """
+        self._timer.start(int(resolution * 1000))
+
+    def stop(self):
+        """
+        Stop ticking.
+        :return: None
+        """
+        self._timer.stop()
+
+    @QtCore.Slot()
+    def tick(self, now=None):
+        """
+        Capture all of the regions which are due.
+        :param float now: current time, defaults to the timer's clock
+        :return: TickStats or None when no region was due
+        """
+        now = timeit.default_timer() if now is None else now
+        due = [region for region in self._regions.values()
+               if region.next_due <= now]
+        if not due:
+            return None
+
+        for region in due:
+            region.next_due += region.period
+            # skip the missed captures when falling behind
+            if region.next_due <= now:
+                region.next_due = now + region.period
+
+        groups = coalesce_rects(
+            [region.rect for region in due], self._waste_threshold)
+
+        bytes_read = 0
+        for bounds, indices in groups:
+            capture = Capture(
+                grab_area(bounds), bounds.topLeft(), self._image_format)
+            bytes_read += capture.pixel_nbytes
+            for index in indices:
+                region = due[index]
+                view = capture.view(
+                    region.rect.translated(-bounds.topLeft()))
+                region.callback(view)
+
+        stats = TickStats(now, len(groups), len(due), bytes_read)
+        self._history.append(stats)
+        self.tick_finished.emit(stats)
+        return stats
@@ -0,0 +1,294 @@
+import struct
+import time
+import weakref
+from multiprocessing import shared_memory
+from PySide2 import QtGui
+
+
+MAGIC = b'QTGRABR1'
+
+# magic, slot count, slot size, latest sequence
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+
+# sequence lock, width, height, bytes per line, format, timestamp, size
+SLOT_HEADER = struct.Struct('<QIIIIdQ')
+SLOT_HEADER_SIZE = 64
+
+LATEST_OFFSET = 16
+
+
+def _attach(name):
+    """
+    Attach to an existing shared memory segment without registering it with
+    the resource tracker, which would otherwise unlink the segment once this
+    process exits. The publisher owns the segment.
+    :param str name:
+    :return: shared_memory.SharedMemory
+    """
+    try:
+        from multiprocessing import resource_tracker
+    except ImportError:
+        return shared_memory.SharedMemory(name)
+
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedFrame(object):
+    """
+    SharedFrame, a frame read from shared memory. The image points into the
+    ring buffer, so no pixels are copied. The publisher overwrites the slot
+    once it has gone round the ring, check if the frame is still valid after
+    using its pixels or copy the image to keep them. The image is only valid
+    for as long as the frame is alive, closing the subscriber copies the
+    pixels of the frames still alive out of shared memory.
+
+    The image has to be treated as read-only, painting on it writes into the
+    ring buffer of the publisher and changes the frame for every subscriber.
+    Copy it before painting on it.
+    """
+
+    def __init__(self, subscriber, slot, sequence, image, timestamp,
+                 buffer=None):
+        self._subscriber = subscriber
+        self._slot = slot
+        # the slice of shared memory the image is pointing into
+        self._buffer = buffer
+        self._detached = False
+        self.sequence = sequence
+        self.image = image
+        self.timestamp = timestamp
+
+    def is_valid(self):
+        """
+        Check if the slot of the frame hasn't been overwritten yet. Frames
+        detached from their subscriber stay valid if their pixels have been
+        copied in time.
+        :return: bool
+        """
+        if self._subscriber is None:
+            return self._detached
+        return self._subscriber.slot_sequence(self._slot) == self.sequence * 2
+
+    def copy(self):
+        """
+        Copy the pixels of the frame out of shared memory.
+        :raise ValueError: When the slot has been overwritten
+        :return: QtGui.QImage
+        """
+        image = self.image.copy()
+        if not self.is_valid():
+            raise ValueError(
+                'Frame {0} has been overwritten'.format(self.sequence))
+        return image
+
+    def _detach(self):
+        """
+        Detach the frame from shared memory, the pixels are copied if the
+        slot hasn't been overwritten yet, otherwise the image is dropped.
+        :return: None
+        """
+        if self._subscriber is None:
+            return
+
+        image = self.image.copy()
+        self._detached = self.is_valid()
+        self.image = image if self._detached else QtGui.QImage()
+        self._subscriber = None
+        if self._buffer is not None:
+            self._buffer.release()
+            self._buffer = None
+
+
+class FramePublisher(object):
+    """
+    FramePublisher, writes raw frames into a ring buffer in shared memory for
+    other processes to read. Every slot is guarded by a sequence lock, the
+    lock is odd while the slot is being written and twice the frame's
+    sequence number once the frame is complete.
+    """
+
+    def __init__(self, name=None, slot_count=4, slot_size=3840 * 2160 * 4):
+        self._slot_count = slot_count
+        self._slot_size = slot_size
+        self._slot_stride = SLOT_HEADER_SIZE + slot_size
+        self._sequence = 0
+
+        self._shm = shared_memory.SharedMemory(
+            name, create=True,
+            size=HEADER_SIZE + slot_count * self._slot_stride)
+        HEADER.pack_into(self._shm.buf, 0, MAGIC, slot_count, slot_size, 0)
+
+    @property
+    def name(self):
+        """
+        The name of the shared memory segment, subscribers attach to it.
+        :return: str
+        """
+        return self._shm.name
+
+    @property
+    def sequence(self):
+        """
+        The sequence number of the last published frame, starting at 1.
+        :return: int
+        """
+        return self._sequence
+
+    def publish(self, image, timestamp=None):
+        """
+        Write the raw pixels of the given image into the next slot.
+        :param QtGui.QImage image:
+        :param float timestamp: defaults to the current time
+        :raise ValueError: When the image doesn't fit into a slot
+        :return: int sequence number of the frame
+        """
+        nbytes = image.bytesPerLine() * image.height()
+        if nbytes > self._slot_size:
+            raise ValueError('Image of {0} bytes exceeds the slot size of {1} '
+                             'bytes'.format(nbytes, self._slot_size))
+
+        sequence = self._sequence + 1
+        offset = HEADER_SIZE + \
+            ((sequence - 1) % self._slot_count) * self._slot_stride
+        timestamp = time.time() if timestamp is None else timestamp
+
+        buf = self._shm.buf
+        struct.pack_into('<Q', buf, offset, sequence * 2 - 1)
+        data_offset = offset + SLOT_HEADER_SIZE
+        buf[data_offset:data_offset + nbytes] = image.constBits()[:nbytes]
+        SLOT_HEADER.pack_into(
+            buf, offset, sequence * 2 - 1, image.width(), image.height(),
+            image.bytesPerLine(), int(image.format()), timestamp, nbytes)
+        struct.pack_into('<Q', buf, offset, sequence * 2)
+        struct.pack_into('<Q', buf, LATEST_OFFSET, sequence)
+
+        self._sequence = sequence
+        return sequence
+
+    def close(self):
+        """
+        Release and remove the shared memory segment.
+        :return: None
+        """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class FrameSubscriber(object):
+    """
+    FrameSubscriber, reads the frames of a publisher from shared memory.
+    Subscribers always read the latest frame, frames published in between
+    two reads are skipped.
+    """
+
+    def __init__(self, name, retries=3):
+        self._shm = _attach(name)
+
+        magic, slot_count, slot_size, _ = HEADER.unpack_from(self._shm.buf, 0)
+        if magic != MAGIC:
+            self._shm.close()
+            raise ValueError('Not a frame ring buffer: {0}'.format(name))
+
+        self._slot_count = slot_count
+        self._slot_stride = SLOT_HEADER_SIZE + slot_size
+        self._retries = retries
+        self._sequence = 0
+        self._frames = weakref.WeakSet()
+        self.skipped = 0
+
+    @property
+    def latest_sequence(self):
+        """
+        The sequence number of the last frame the publisher completed.
+        :return: int
+        """
+        return struct.unpack_from('<Q', self._shm.buf, LATEST_OFFSET)[0]
+
+    def _slot_offset(self, slot):
+        """
+        Get the offset of the given slot in the shared memory.
+        :param int slot:
+        :return: int
+        """
+        return HEADER_SIZE + slot * self._slot_stride
+
+    def slot_sequence(self, slot):
+        """
+        Get the sequence lock of the given slot.
+        :param int slot:
+        :return: int
+        """
+        return struct.unpack_from(
+            '<Q', self._shm.buf, self._slot_offset(slot))[0]
+
+    def read(self):
+        """
+        Read the latest frame if it hasn't been read yet. The image of the
+        frame points into shared memory and is read-only, copy the frame
+        before painting on it.
+        :return: SharedFrame or None when there is no new frame
+        """
+        for _ in range(self._retries):
+            sequence = self.latest_sequence
+            if sequence <= self._sequence:
+                return None
+
+            slot = (sequence - 1) % self._slot_count
+            offset = self._slot_offset(slot)
+            lock, width, height, bytes_per_line, image_format, timestamp, \
+                nbytes = SLOT_HEADER.unpack_from(self._shm.buf, offset)
+            if lock != sequence * 2:
+                # the publisher went round the ring while reading
+                continue
+
+            data_offset = offset + SLOT_HEADER_SIZE
+            view = self._shm.buf[data_offset:data_offset + nbytes]
+            image = QtGui.QImage(
+                view, width, height, bytes_per_line,
+                QtGui.QImage.Format(image_format))
+            if self.slot_sequence(slot) != lock:
+                view.release()
+                continue
+
+            self.skipped += sequence - self._sequence - 1
+            self._sequence = sequence
+            # note: the frame keeps the slice, the shared memory can't be
+            # unmapped while the image is pointing into it
+            frame = SharedFrame(self, slot, sequence, image, timestamp, view)
+            self._frames.add(frame)
+            return frame
+        return None
+
+    def close(self):
+        """
+        Detach from the shared memory segment. The frames read before which
+        are still alive get a copy of their pixels, or a null image if their
+        slot has been overwritten already.
+        :return: None
+        """
+        if self._shm is not None:
+            for frame in list(self._frames):
+                frame._detach()
+            self._frames.clear()
+            self._shm.close()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,5 +1,15 @@
 from PySide2 import QtWidgets, QtCore, QtGui
+from qtgrab.capture import Capture, DEFAULT_FORMAT, pixmap_nbytes
 from qtgrab.coordinates_widget import CoordinateWidget
+from qtgrab.future import CaptureFuture
+from qtgrab.pipeline import (
+    Frame, Pipeline, RedactStage, AnnotateStage, FileSink, ClipboardSink,
+    PublishSink, ScreenStream)
+from qtgrab.annotations import AnnotationLayer
+from qtgrab.clipboard import ClipboardMetrics
+from qtgrab.scheduler import CaptureScheduler
+from qtgrab.tiled import TiledCapture
+from qtgrab.window_index import default_window_provider
 
 
 class ShotWidget(QtWidgets.QLabel):
@@ -12,18 +22,29 @@ class ShotWidget(QtWidgets.QLabel):
     def __init__(self):
         super(ShotWidget, self).__init__()
 
-        self._pmp_screen_grab = None
+        self._capture = None
+        self._capture_format = DEFAULT_FORMAT
+        self._tiled_threshold = None
+        self._tile_size = 1024
+        self._tile_directory = None
+        self._pending_capture = None
+        self._pending_selection = None
         self._constrain_image_ratio = False
         self._image_ratio = 1
+        self._window_provider = None
+        self._redactor = None
+        self._clipboard_metrics = ClipboardMetrics()
+        self._annotations = AnnotationLayer(self)
+        self._annotations.changed.connect(self._update_pixmap_size)
 
         # note: a minimum size is needed since without one the widget wouldn't
         # be able to downscale
         self.setMinimumSize(1, 1)
 
         # set the background
-        default_pmp = QtGui.QPixmap(300, 200)
-        default_pmp.fill(QtGui.QColor(128, 128, 128))
-        self.setPixmap(default_pmp)
+        self._default_pmp = QtGui.QPixmap(300, 200)
+        self._default_pmp.fill(QtGui.QColor(128, 128, 128))
+        self.setPixmap(self._default_pmp)
 
     def enable_image_ratio_constraint(self):
         """
@@ -47,6 +68,68 @@ class ShotWidget(QtWidgets.QLabel):
         """
         self._image_ratio = float(value)
 
+    def set_capture_format(self, image_format):
+        """
+        Set the image format the pixels of new captures are held in.
+        :param QtGui.QImage.Format image_format: e.g. QImage.Format_RGB32
+        :return: None
+        """
+        self._capture_format = image_format
+
+    def enable_tiled_capture(
+            self, threshold=3840 * 2160, tile_size=1024, directory=None):
+        """
+        Enables tiled captures, areas of at least the threshold are grabbed in
+        tiles into a memory mapped file instead of being held in memory.
+        :param int threshold: minimal number of pixels for a tiled capture
+        :param int tile_size: width and height of a tile in pixels
+        :param str directory: directory for the memory mapped files
+        :return: None
+        """
+        self._tiled_threshold = int(threshold)
+        self._tile_size = int(tile_size)
+        self._tile_directory = directory
+
+    def disable_tiled_capture(self):
+        """
+        Disables tiled captures.
+        :return: None
+        """
+        self._tiled_threshold = None
+
+    @property
+    def capture(self):
+        """
+        The current screen capture.
+        :return: Capture or None
+        """
+        return self._capture
+
+    def memory_usage(self):
+        """
+        Get the number of bytes currently held by the widget's images. The
+        displayed pixmap is either the capture's cached preview or, with
+        annotations, the composite of the annotation layer, so it's counted
+        once as part of either of them. The annotations hold an overlay at
+        preview size as well. The memory map of a tiled capture is file
+        backed, it's reported as mapped but not included in the total.
+        :return: dict with the bytes per image and their total
+        """
+        usage = {
+            'capture': 0,
+            'preview': 0,
+            'annotations': self._annotations.nbytes,
+            'background': pixmap_nbytes(self._default_pmp),
+        }
+        if self._capture is not None:
+            usage['capture'] = self._capture.pixel_nbytes
+            usage['preview'] = self._capture.preview_nbytes
+        usage['total'] = sum(usage.values())
+        usage['mapped'] = 0
+        if self._capture is not None:
+            usage['mapped'] = self._capture.mapped_nbytes
+        return usage
+
     def get_coordinates(self):
         """
         Creates a CoordinateWidget dialog for grabbing the coordinates.
@@ -55,26 +138,180 @@ class ShotWidget(QtWidgets.QLabel):
         return CoordinateWidget.get_coordinates(
             self._constrain_image_ratio, self._image_ratio)
 
+    def select_area(self):
+        """
+        Creates a CoordinateWidget for marking the area to grab, without
+        blocking.
+        :return: CaptureFuture resolving to the top and bottom corner
+        """
+        return CoordinateWidget.select_area(
+            self._constrain_image_ratio, self._image_ratio)
+
+    def set_window_provider(self, provider):
+        """
+        Set the provider of the window geometries used for window captures.
+        :param WindowGeometryProvider provider: window geometry provider
+        :return: None
+        """
+        self._window_provider = provider
+
+    def _get_window_provider(self):
+        """
+        Get the window provider, by default the windows of all processes
+        where the platform allows listing them, except for the window of this
+        widget.
+        :return: WindowGeometryProvider
+        """
+        if self._window_provider is None:
+            return default_window_provider(exclude=[self.window()])
+        return self._window_provider
+
+    def get_window_coordinates(self):
+        """
+        Creates a CoordinateWidget dialog in window pick mode for grabbing the
+        coordinates of a single window.
+        :return: (QtCore.QPoint, QtCore.QPoint)
+        """
+        return CoordinateWidget.get_window_coordinates(
+            self._get_window_provider())
+
+    def select_window(self):
+        """
+        Creates a CoordinateWidget in window pick mode for marking a single
+        window to grab, without blocking.
+        :return: CaptureFuture resolving to the top and bottom corner
+        """
+        return CoordinateWidget.select_window(self._get_window_provider())
+
+    def set_redactor(self, redactor):
+        """
+        Set the redactor applied to the capture when it gets saved.
+        :param Redactor redactor: redactor or None to disable redaction
+        :return: None
+        """
+        self._redactor = redactor
+
+    def apply_redaction(self):
+        """
+        Permanently redact the current screen capture with the redactor.
+        :raise ValueError: When no screen grab has been made
+        :return: None
+        """
+        if self._capture is None:
+            raise ValueError('No Screen grab has yet been made')
+        if self._redactor is None:
+            return
+
+        # drop the preview so it gets rebuilt from the redacted pixels
+        self.setPixmap(self._default_pmp)
+        self._capture.clear_preview()
+        self._capture.clear_analysis()
+
+        image = self._capture.image
+        redacted = self._redactor.apply(image, in_place=True)
+        if redacted is not image:
+            # the format of the capture couldn't be painted on
+            self._capture = Capture(
+                redacted, self._capture.origin, self._capture_format)
+        self._update_pixmap_size()
+
+    def analyze_capture(self):
+        """
+        Get the colour analysis of the screen capture. Histograms, channel
+        stats and colour counts are cached per area of the capture.
+        :raise ValueError: When no screen grab has been made
+        :return: qtgrab.analysis.ImageAnalysis
+        """
+        if self._capture is None:
+            raise ValueError('No Screen grab has yet been made')
+        return self._capture.analysis()
+
+    @property
+    def annotations(self):
+        """
+        The annotation layer drawn over the screen capture. Annotations are
+        cleared when a new screen grab is made.
+        :return: AnnotationLayer
+        """
+        return self._annotations
+
     def _update_pixmap_size(self):
         """
-        Update the current pixmap size to the size of the widget.
+        Update the current pixmap size to the size of the widget. The preview
+        of a capture is scaled from its pixels and converted for display, the
+        annotations are composited over it.
         :return: None
         """
-        pmp = self.pixmap()
-        if self._pmp_screen_grab is not None:
-            pmp = self._pmp_screen_grab
+        if self._capture is not None:
+            self.setPixmap(self._annotations.preview(
+                self._capture.preview(self.size()), self._capture.size()))
+            return
 
-        self.setPixmap(pmp.scaled(
+        self.setPixmap(self._default_pmp.scaled(
             self.size(), QtCore.Qt.KeepAspectRatio,
             QtCore.Qt.SmoothTransformation))
 
     @QtCore.Slot()
     def capture_screen(self):
         """
-        Start a screen capture.
+        Start a screen capture without blocking.
+        :return: CaptureFuture resolving to the screen grab
+        """
+        return self._start_capture(self.select_area())
+
+    @QtCore.Slot()
+    def capture_window(self):
+        """
+        Start a capture of a single window, picked with one click, without
+        blocking.
+        :return: CaptureFuture resolving to the screen grab
+        """
+        return self._start_capture(self.select_window())
+
+    def _start_capture(self, selection):
+        """
+        Grab the area the given selection resolves to. A capture which is
+        still in progress gets cancelled.
+        :param CaptureFuture selection: future resolving to the corners
+        :return: CaptureFuture resolving to the screen grab
+        """
+        if self._pending_capture is not None:
+            self._pending_capture.cancel()
+
+        capture = CaptureFuture()
+        capture.aborted.connect(selection.cancel)
+        self._pending_capture = capture
+        # hold on to the selection until it resolves, the signal connection
+        # doesn't keep it alive
+        self._pending_selection = selection
+
+        def on_selected(future):
+            if self._pending_capture is capture:
+                self._pending_capture = None
+            if self._pending_selection is future:
+                self._pending_selection = None
+            if future.is_cancelled():
+                capture.cancel()
+                return
+
+            top_corner, bottom_corner = future.result()
+            if top_corner is None or bottom_corner is None:
+                capture.cancel()
+                return
+
+            self._grab_area(top_corner, bottom_corner)
+            capture.set_result(self._capture)
+
+        selection.add_done_callback(on_selected)
+        return capture
+
+    def _grab_area(self, top_corner, bottom_corner):
+        """
+        Grab the screen area between the given corners.
+        :param QtCore.QPoint top_corner:
+        :param QtCore.QPoint bottom_corner:
         :return: None
         """
-        top_corner, bottom_corner = self.get_coordinates()
         if top_corner is None or bottom_corner is None:
             return
 
@@ -82,26 +319,187 @@ class ShotWidget(QtWidgets.QLabel):
         height = bottom_corner.y() - top_corner.y()
 
         # clear out the previous image
-        self._pmp_screen_grab = None
-        screen = QtWidgets.QApplication.primaryScreen()
-        self._pmp_screen_grab = screen.grabWindow(
-            QtWidgets.QApplication.desktop().winId(),
-            top_corner.x(),
-            top_corner.y(),
-            width,
-            height)
+        self.setPixmap(self._default_pmp)
+        if self._capture is not None:
+            self._capture.close()
+            self._capture = None
+        self._annotations.clear()
+
+        area = QtCore.QRect(top_corner.x(), top_corner.y(), width, height)
+        if self._tiled_threshold is not None and \
+                width * height >= self._tiled_threshold:
+            self._capture = TiledCapture.grab(
+                area, tile_size=self._tile_size,
+                directory=self._tile_directory)
+        else:
+            self._capture = Capture.grab(area, self._capture_format)
         self._update_pixmap_size()
 
+    def _export_stages(self, sink):
+        """
+        Get the stages exporting the screen capture into the given sink, the
+        capture is redacted and annotated first.
+        :param Stage sink:
+        :return: list of Stage
+        """
+        stages = [sink]
+        if self._annotations:
+            stages.insert(0, AnnotateStage(self._annotations))
+        if self._redactor is not None:
+            stages.insert(0, RedactStage(self._redactor))
+        return stages
+
+    def _process_tiled(self, image, offset, band):
+        """
+        Redact and annotate a band of a tiled capture.
+        :param QtGui.QImage image: rows of the capture the band depends on
+        :param QtCore.QPoint offset: position of the rows in the capture
+        :param QtCore.QRect band: area of the band in the capture
+        :return: QtGui.QImage
+        """
+        if self._redactor is not None:
+            image = self._redactor.apply(image, offset=offset, clip=band)
+        return self._annotations.render(image, offset)
+
+    def _processed_tiled(self):
+        """
+        Get the tiled screen capture redacted and annotated band by band into
+        a temporary tiled capture, or the capture itself when there's nothing
+        to redact or annotate.
+        :return: TiledCapture
+        """
+        if self._redactor is None and not self._annotations:
+            return self._capture
+
+        source_rect = None if self._redactor is None else \
+            self._redactor.source_rect
+        return self._capture.processed(
+            self._process_tiled, source_rect, directory=self._tile_directory)
+
+    def _export(self, sink):
+        """
+        Export the screen capture into the given sink, the capture is
+        redacted and annotated first. Tiled captures are redacted and
+        annotated band by band into a temporary tiled capture, the sink gets
+        an image pointing into its memory map.
+        :param Stage sink:
+        :raise ValueError: When no screen grab has been made
+        :return: Frame
+        """
+        if self._capture is None or not self._capture.is_tiled:
+            return self.export_capture(self._export_stages(sink))
+
+        capture = self._processed_tiled()
+        try:
+            frame = Frame(capture.image, capture.origin)
+            return Pipeline([sink]).process(frame)
+        finally:
+            if capture is not self._capture:
+                capture.close()
+
     def save_capture(self, file_path):
         """
         Shorthand method for saving the screen capture to the given file path.
+        When a redactor is set the saved image is redacted and annotations are
+        painted over it at full resolution, the capture itself is left
+        untouched. Tiled captures are redacted and annotated band by band,
+        PNGs are streamed from the memory map.
         :param file_path:
         :raise ValueError: When no screen grab has been made
         :return: bool
         """
-        if self._pmp_screen_grab is not None:
-            return self._pmp_screen_grab.save(file_path)
-        raise ValueError('No Screen grab has yet been made')
+        if self._capture is None or not self._capture.is_tiled:
+            return self._export(FileSink(file_path)).metadata['saved']
+
+        capture = self._processed_tiled()
+        try:
+            return capture.save(file_path)
+        finally:
+            if capture is not self._capture:
+                capture.close()
+
+    @property
+    def clipboard_metrics(self):
+        """
+        The metrics of the clipboard formats requested from the captures
+        copied by this widget.
+        :return: ClipboardMetrics
+        """
+        return self._clipboard_metrics
+
+    @QtCore.Slot()
+    def copy_capture(self):
+        """
+        Put the screen capture on the clipboard. The clipboard formats are
+        only encoded when they get pasted.
+        :raise ValueError: When no screen grab has been made
+        :return: None
+        """
+        self._export(ClipboardSink(metrics=self._clipboard_metrics))
+
+    def publish_capture(self, publisher):
+        """
+        Publish the raw pixels of the screen capture into shared memory, the
+        capture is redacted and annotated first.
+        :param qtgrab.shared_frames.FramePublisher publisher:
+        :raise ValueError: When no screen grab has been made
+        :return: int sequence number of the published frame
+        """
+        frame = self._export(PublishSink(publisher))
+        return frame.metadata['sequence']
+
+    def export_capture(self, stages, workers=0):
+        """
+        Run the screen capture through a pipeline made of the given stages.
+        The frame shares the pixels of the capture, stages changing the image
+        replace it instead of painting on it. The frame of a tiled capture
+        points into its memory map, stages changing it hold a full copy in
+        memory, so redaction and annotation are better left to the save,
+        copy and publish methods which process tiled captures band by band.
+        :param list stages: pipeline stages, usually ending with a sink
+        :param int workers: number of workers for the parallel stages
+        :raise ValueError: When no screen grab has been made
+        :return: Frame
+        """
+        if self._capture is None:
+            raise ValueError('No Screen grab has yet been made')
+
+        frame = Frame(self._capture.image, self._capture.origin)
+        return Pipeline(stages, workers).process(frame)
+
+    def stream_capture(self, stages, count=None, interval=0.0, workers=0):
+        """
+        Continuously capture the area of the last screen capture and run the
+        frames through a pipeline made of the given stages. The frames are
+        grabbed from a timer, so the event loop keeps running while streaming.
+        The parallel stages are run on the workers.
+        :param list stages: pipeline stages, usually ending with a sink
+        :param int count: number of frames, None for an endless stream
+        :param float interval: minimal time between two grabs in seconds
+        :param int workers: number of workers for the parallel stages
+        :raise ValueError: When no screen grab has been made
+        :return: ScreenStream, already started
+        """
+        if self._capture is None:
+            raise ValueError('No Screen grab has yet been made')
+
+        area = QtCore.QRect(self._capture.origin, self._capture.size())
+        stream = ScreenStream(
+            area, Pipeline(stages, workers), count, interval, self)
+        stream.finished.connect(stream.deleteLater)
+        stream.start()
+        return stream
+
+    def create_scheduler(self, waste_threshold=0.25):
+        """
+        Create a scheduler capturing regions of the desktop on their own
+        periods, in the capture format of this widget. Regions due in the
+        same tick share their grabs.
+        :param float waste_threshold: maximal ratio of wasted pixels
+        :return: CaptureScheduler
+        """
+        return CaptureScheduler(
+            waste_threshold, self._capture_format, parent=self)
 
     def resizeEvent(self, event):
         """
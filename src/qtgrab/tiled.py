@@ -0,0 +1,567 @@
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from PySide2 import QtCore, QtGui
+from qtgrab.analysis import ImageAnalysis
+from qtgrab.capture import CaptureView, grab_area, pixmap_nbytes
+
+
+MAGIC = b'QTGRABT1'
+HEADER_SIZE = 64
+TILE_FORMAT = QtGui.QImage.Format_RGB32
+BYTES_PER_PIXEL = 4
+# size of the bands of rows streamed from the map
+BAND_BYTES = 1 << 22
+
+# magic, header size, width, height, bytes per line, image format, tile size
+_HEADER = struct.Struct('<8sIIIIII')
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_CHUNK_SIZE = 1 << 16
+
+
+def _write_png_chunk(file_handle, chunk_type, data):
+    """
+    Write a single PNG chunk.
+    :param file file_handle: file opened for binary writing
+    :param bytes chunk_type: four letter chunk type
+    :param bytes data: chunk data
+    :return: None
+    """
+    file_handle.write(struct.pack('>I', len(data)))
+    file_handle.write(chunk_type)
+    file_handle.write(data)
+    crc = zlib.crc32(data, zlib.crc32(chunk_type)) & 0xffffffff
+    file_handle.write(struct.pack('>I', crc))
+
+
+class _MappedImage(QtGui.QImage):
+    """
+    _MappedImage, image pointing into a memory map. The image keeps the slice
+    of the map it points into, so the map can't be unmapped while the image
+    is alive.
+    """
+
+    def __init__(self, buffer, width, height, bytes_per_line, image_format):
+        super(_MappedImage, self).__init__(
+            buffer, width, height, bytes_per_line, image_format)
+        self._buffer = buffer
+
+
+class TiledAnalysis(ImageAnalysis):
+    """
+    TiledAnalysis, colour analysis of a tiled capture. The rows of an area are
+    read band by band from the memory map, the pages of a band are released
+    once it has been analysed.
+    """
+
+    def __init__(self, capture):
+        super(TiledAnalysis, self).__init__(capture.image)
+        self._capture = capture
+
+    def _chunks(self, area):
+        """
+        Iterate over the given area in bands of rows of the capture.
+        :param QtCore.QRect area:
+        :return: generator of (QtGui.QImage, QtCore.QRect) tuples, the image
+        of a band with the part of the area within it
+        """
+        capture = self._capture
+        if capture._map is None:
+            # the capture is closed, the image still keeps the rows mapped
+            for chunk in super(TiledAnalysis, self)._chunks(area):
+                yield chunk
+            return
+
+        rows = max(1, BAND_BYTES // capture._bytes_per_line)
+        bottom = area.y() + area.height()
+        for y in range(area.y(), bottom, rows):
+            height = min(rows, bottom - y)
+            yield capture.band(y, height), QtCore.QRect(
+                area.x(), 0, area.width(), height)
+            capture._release_rows(y, height)
+
+
+class TiledCapture(object):
+    """
+    TiledCapture, capture of a large area which is grabbed in fixed size
+    tiles and streamed into a memory mapped raw file. The raw file has a small
+    header followed by the rows of pixels. Previews and encoding work band by
+    band, and the pages of a band are released from the map once it has been
+    processed, so only a few rows of tiles are ever resident. The file is
+    mapped shared, painting on the capture changes the raw file.
+    """
+
+    def __init__(self, file_path, origin=None, delete=False):
+        self._file_path = file_path
+        self._origin = QtCore.QPoint(0, 0) if origin is None else origin
+        self._delete = delete
+        self._preview = None
+        self._analysis = None
+
+        with open(file_path, 'r+b') as file_handle:
+            header = file_handle.read(_HEADER.size)
+            if len(header) < _HEADER.size or \
+                    not header.startswith(MAGIC):
+                raise ValueError(
+                    'Not a tiled capture file: {0}'.format(file_path))
+            (_, self._header_size, self._width, self._height,
+             self._bytes_per_line, self._format,
+             self._tile_size) = _HEADER.unpack(header)
+
+            self._map = mmap.mmap(file_handle.fileno(), 0)
+        self._buffer = memoryview(self._map)
+        self._image = None
+
+    @classmethod
+    def grab(cls, rect, file_path=None, tile_size=1024, directory=None):
+        """
+        Grab the given area of the desktop tile by tile into a raw file.
+        :param QtCore.QRect rect: area in desktop coordinates
+        :param str file_path: raw file path, a temporary file which is deleted
+        on close is used when not given
+        :param int tile_size: width and height of a tile in pixels
+        :param str directory: directory for the temporary file
+        :return: TiledCapture
+        """
+        tiled_capture = cls._create(
+            rect.size(), rect.topLeft(), file_path, tile_size, directory)
+        tiled_capture._grab_tiles(rect)
+        return tiled_capture
+
+    @classmethod
+    def _create(cls, size, origin, file_path, tile_size, directory):
+        """
+        Create a black capture of the given size in a new raw file.
+        :param QtCore.QSize size: size of the capture in pixels
+        :param QtCore.QPoint origin: top left corner in desktop coordinates
+        :param str file_path: raw file path, a temporary file which is deleted
+        on close is used when not given
+        :param int tile_size: width and height of a tile in pixels
+        :param str directory: directory for the temporary file
+        :return: TiledCapture
+        """
+        delete = file_path is None
+        if delete:
+            handle, file_path = tempfile.mkstemp(
+                suffix='.qtgrab', dir=directory)
+            os.close(handle)
+
+        width = max(size.width(), 0)
+        height = max(size.height(), 0)
+        bytes_per_line = width * BYTES_PER_PIXEL
+        header = _HEADER.pack(
+            MAGIC, HEADER_SIZE, width, height, bytes_per_line,
+            int(TILE_FORMAT), tile_size)
+
+        with open(file_path, 'wb') as file_handle:
+            file_handle.write(header.ljust(HEADER_SIZE, b'\0'))
+            file_handle.truncate(HEADER_SIZE + bytes_per_line * height)
+
+        return cls(file_path, origin, delete)
+
+    def _release_rows(self, y, height):
+        """
+        Release the pages of the given rows from the memory map, the rows are
+        read back from the file when they're accessed again.
+        :param int y: first row
+        :param int height: number of rows
+        :return: None
+        """
+        # note: madvise is only available from Python 3.8 on unix
+        if not hasattr(self._map, 'madvise'):
+            return
+
+        start = self._header_size + y * self._bytes_per_line
+        end = min(start + height * self._bytes_per_line, len(self._map))
+        start -= start % mmap.PAGESIZE
+        if end > start:
+            self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def _grab_tiles(self, rect):
+        """
+        Grab the area tile by tile and copy the rows of every tile into the
+        map, only a single tile is held in memory at once.
+        :param QtCore.QRect rect: area in desktop coordinates
+        :return: None
+        """
+        tile_size = self._tile_size
+        bytes_per_line = self._bytes_per_line
+        raw_map = self._map
+        for tile_y in range(0, rect.height(), tile_size):
+            for tile_x in range(0, rect.width(), tile_size):
+                tile_rect = QtCore.QRect(
+                    rect.x() + tile_x, rect.y() + tile_y,
+                    min(tile_size, rect.width() - tile_x),
+                    min(tile_size, rect.height() - tile_y))
+
+                tile = grab_area(tile_rect)
+                if tile.isNull():
+                    continue
+                if tile.format() != TILE_FORMAT:
+                    tile = tile.convertToFormat(TILE_FORMAT)
+
+                bits = tile.constBits()
+                tile_bytes_per_line = tile.bytesPerLine()
+                row_bytes = BYTES_PER_PIXEL * min(
+                    tile.width(), tile_rect.width())
+                for row in range(min(tile.height(), tile_rect.height())):
+                    source = row * tile_bytes_per_line
+                    target = (HEADER_SIZE + (tile_y + row) * bytes_per_line +
+                              tile_x * BYTES_PER_PIXEL)
+                    raw_map[target:target + row_bytes] = \
+                        bits[source:source + row_bytes]
+
+                self._release_rows(tile_y, tile_rect.height())
+
+    @property
+    def file_path(self):
+        """
+        The path of the raw file.
+        :return: str
+        """
+        return self._file_path
+
+    @property
+    def origin(self):
+        """
+        The top left corner of the capture in desktop coordinates.
+        :return: QtCore.QPoint
+        """
+        return QtCore.QPoint(self._origin)
+
+    @property
+    def format(self):
+        """
+        The image format the pixels are held in.
+        :return: QtGui.QImage.Format
+        """
+        return QtGui.QImage.Format(self._format)
+
+    @property
+    def tile_size(self):
+        """
+        The width and height of the tiles the capture was grabbed in.
+        :return: int
+        """
+        return self._tile_size
+
+    @property
+    def pixel_nbytes(self):
+        """
+        The number of bytes the pixels take up in memory, the pixels live in
+        the memory map so this is always zero.
+        :return: int
+        """
+        return 0
+
+    @property
+    def mapped_nbytes(self):
+        """
+        The number of bytes of the memory map.
+        :return: int
+        """
+        return 0 if self._map is None else len(self._map)
+
+    @property
+    def preview_nbytes(self):
+        """
+        The number of bytes the cached preview takes up.
+        :return: int
+        """
+        return 0 if self._preview is None else pixmap_nbytes(self._preview)
+
+    @property
+    def nbytes(self):
+        """
+        The number of bytes held in memory, excluding the memory map.
+        :return: int
+        """
+        return self.pixel_nbytes + self.preview_nbytes
+
+    @property
+    def is_tiled(self):
+        """
+        Whether the pixels are held in tiles of a memory mapped file, which
+        is always the case for tiled captures.
+        :return: bool
+        """
+        return True
+
+    def is_null(self):
+        """
+        Check if the capture holds any pixels.
+        :return: bool
+        """
+        return not self._width or not self._height
+
+    def width(self):
+        """
+        The width of the capture in pixels.
+        :return: int
+        """
+        return self._width
+
+    def height(self):
+        """
+        The height of the capture in pixels.
+        :return: int
+        """
+        return self._height
+
+    def size(self):
+        """
+        The size of the capture in pixels.
+        :return: QtCore.QSize
+        """
+        return QtCore.QSize(self._width, self._height)
+
+    def rect(self):
+        """
+        The area of the capture relative to itself.
+        :return: QtCore.QRect
+        """
+        return QtCore.QRect(0, 0, self._width, self._height)
+
+    def band(self, y, height):
+        """
+        Get an image of the given rows, pointing into the memory map. The map
+        stays mapped for as long as the image is alive, even when the capture
+        is closed.
+        :param int y: first row
+        :param int height: number of rows
+        :return: QtGui.QImage
+        """
+        height = min(height, self._height - y)
+        if height <= 0 or not self._width:
+            return QtGui.QImage()
+
+        start = self._header_size + y * self._bytes_per_line
+        return _MappedImage(
+            self._buffer[start:start + height * self._bytes_per_line],
+            self._width, height, self._bytes_per_line, self.format)
+
+    def bands(self, rows=None):
+        """
+        Iterate over the capture in bands of rows. The pages of a band are
+        released from the map once the next band is requested.
+        :param int rows: rows per band, defaults to about 4MB worth of rows
+        :return: generator of (int, QtGui.QImage) tuples
+        """
+        rows = rows or max(1, BAND_BYTES // max(self._bytes_per_line, 1))
+        for y in range(0, self._height, rows):
+            yield y, self.band(y, rows)
+            self._release_rows(y, rows)
+
+    def processed(self, process, source_rect=None, rows=None,
+                  directory=None):
+        """
+        Process the capture band by band into a new capture, e.g. to redact or
+        annotate it without holding all of its pixels in memory. Every band is
+        processed from the rows it depends on, the processed rows of the band
+        are copied into the raw file of the new capture.
+        :param callable process: called with an image of the rows, the
+        position of the image in the capture and the area of the band, returns
+        the processed image, only the rows of the band have to be processed
+        :param callable source_rect: called with the area of a band, returns
+        the area of the capture the processed band depends on, e.g. the blur
+        radius around it
+        :param int rows: rows per band, defaults to about 4MB worth of rows
+        :param str directory: directory for the temporary file
+        :return: TiledCapture, with a temporary raw file deleted on close
+        """
+        result = TiledCapture._create(
+            self.size(), self._origin, None, self._tile_size, directory)
+        row_bytes = self._width * BYTES_PER_PIXEL
+        for y, band in self.bands(rows):
+            rect = QtCore.QRect(0, y, self._width, band.height())
+            source = rect if source_rect is None else \
+                source_rect(rect).united(rect).intersected(self.rect())
+
+            image = process(self.band(source.y(), source.height()),
+                            source.topLeft(), rect)
+            if image.format() != TILE_FORMAT:
+                image = image.convertToFormat(TILE_FORMAT)
+
+            bits = image.constBits()
+            for row in range(band.height()):
+                start = (y - source.y() + row) * image.bytesPerLine()
+                target = HEADER_SIZE + (y + row) * result._bytes_per_line
+                result._map[target:target + row_bytes] = \
+                    bits[start:start + row_bytes]
+
+            self._release_rows(source.y(), source.height())
+            result._release_rows(y, band.height())
+        return result
+
+    @property
+    def image(self):
+        """
+        The pixels of the whole capture as an image pointing into the memory
+        map. Only the pages which are read are loaded.
+        :return: QtGui.QImage
+        """
+        if self._image is None:
+            self._image = self.band(0, self._height)
+        return self._image
+
+    def view(self, rect):
+        """
+        Get a view on the given area of the capture.
+        :param QtCore.QRect rect: area relative to the capture
+        :return: CaptureView
+        """
+        return CaptureView(self, rect)
+
+    def analysis(self):
+        """
+        Get the colour analysis of the capture, the statistics it computes
+        are cached until the analysis is cleared. The capture is analysed
+        band by band, releasing the pages of every band from the map.
+        :return: TiledAnalysis
+        """
+        if self._analysis is None:
+            self._analysis = TiledAnalysis(self)
+        return self._analysis
+
+    def clear_analysis(self):
+        """
+        Drop the cached colour analysis, e.g. after painting on the capture.
+        :return: None
+        """
+        self._analysis = None
+
+    def preview(self, size):
+        """
+        Get a pixmap of the capture fitting the given size. The preview is
+        built by downscaling the capture band by band, the last preview is
+        cached.
+        :param QtCore.QSize size:
+        :return: QtGui.QPixmap
+        """
+        if self.is_null():
+            return QtGui.QPixmap()
+
+        target = self.size().scaled(size, QtCore.Qt.KeepAspectRatio)
+        if self._preview is not None and self._preview.size() == target:
+            return self._preview
+
+        self._preview = None
+        preview = QtGui.QImage(target, TILE_FORMAT)
+        preview.fill(QtGui.QColor(0, 0, 0))
+
+        scale = float(target.height()) / self._height
+        painter = QtGui.QPainter(preview)
+        for y, band in self.bands():
+            top = int(round(y * scale))
+            bottom = int(round((y + band.height()) * scale))
+            if bottom <= top:
+                continue
+            painter.drawImage(QtCore.QPoint(0, top), band.scaled(
+                target.width(), bottom - top, QtCore.Qt.IgnoreAspectRatio,
+                QtCore.Qt.SmoothTransformation))
+        painter.end()
+
+        self._preview = QtGui.QPixmap.fromImage(preview)
+        return self._preview
+
+    def clear_preview(self):
+        """
+        Drop the cached preview.
+        :return: None
+        """
+        self._preview = None
+
+    def write_png(self, file_path, compression=6):
+        """
+        Encode the capture as a PNG, streaming the rows from the memory map.
+        Only a single band of rows is converted in memory at once.
+        :param str file_path:
+        :param int compression: zlib compression level
+        :return: bool
+        """
+        compressor = zlib.compressobj(compression)
+        pending = []
+        pending_size = 0
+
+        with open(file_path, 'wb') as file_handle:
+            file_handle.write(_PNG_SIGNATURE)
+            # 8 bit truecolor without alpha
+            _write_png_chunk(file_handle, b'IHDR', struct.pack(
+                '>IIBBBBB', self._width, self._height, 8, 2, 0, 0, 0))
+
+            for _, band in self.bands():
+                rgb_band = band.convertToFormat(QtGui.QImage.Format_RGB888)
+                bits = rgb_band.constBits()
+                row_bytes = self._width * 3
+                for row in range(rgb_band.height()):
+                    start = row * rgb_band.bytesPerLine()
+                    # every row starts with its filter type, none
+                    data = compressor.compress(
+                        b'\0' + bytes(bits[start:start + row_bytes]))
+                    if data:
+                        pending.append(data)
+                        pending_size += len(data)
+
+                    if pending_size >= _PNG_CHUNK_SIZE:
+                        _write_png_chunk(
+                            file_handle, b'IDAT', b''.join(pending))
+                        pending = []
+                        pending_size = 0
+
+            pending.append(compressor.flush())
+            _write_png_chunk(file_handle, b'IDAT', b''.join(pending))
+            _write_png_chunk(file_handle, b'IEND', b'')
+        return True
+
+    def save(self, file_path, image_format=None, quality=-1):
+        """
+        Save the capture to the given file path. PNGs are streamed from the
+        memory map, other formats are encoded by Qt from the mapped image.
+        :param str file_path:
+        :param str image_format: defaults to the format of the file extension
+        :param int quality:
+        :return: bool
+        """
+        extension = os.path.splitext(file_path)[1][1:]
+        if (image_format or extension).upper() == 'PNG' and \
+                not self.is_null():
+            return self.write_png(file_path)
+        return self.image.save(file_path, image_format, quality)
+
+    def close(self):
+        """
+        Release the memory map, temporary raw files are deleted. Images and
+        views handed out keep their rows mapped, the map is only unmapped once
+        the last of them is garbage collected.
+        :return: None
+        """
+        if self._map is None:
+            return
+
+        self._image = None
+        self._preview = None
+        self._analysis = None
+        self._buffer.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # images pointing into the map are still alive and hold slices of
+            # it, the map is unmapped when the last slice is released
+            pass
+        self._map = None
+
+        if self._delete and os.path.exists(self._file_path):
+            try:
+                os.remove(self._file_path)
+            except OSError:
+                # still mapped on platforms which don't allow removing
+                # mapped files
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,429 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+from PySide2 import QtCore, QtGui
+
+
+class WindowGeometryProvider(object):
+    """
+    WindowGeometryProvider, base class for objects providing the geometries of
+    the top level windows that can be picked. Subclasses implement
+    window_geometries, which should return the geometries ordered from the
+    top most window to the bottom most window.
+    """
+
+    def window_geometries(self):
+        """
+        Get the geometries of the top level windows, top most window first.
+        :return: list of QtCore.QRect
+        """
+        raise NotImplementedError
+
+
+class StaticWindowProvider(WindowGeometryProvider):
+    """
+    StaticWindowProvider, provides a fixed list of window geometries. Mainly
+    used for testing and for tools which already know the window layout.
+    """
+
+    def __init__(self, geometries):
+        super(StaticWindowProvider, self).__init__()
+        self._geometries = [QtCore.QRect(rect) for rect in geometries]
+
+    def window_geometries(self):
+        """
+        Get the geometries given on construction.
+        :return: list of QtCore.QRect
+        """
+        return list(self._geometries)
+
+
+class ApplicationWindowProvider(WindowGeometryProvider):
+    """
+    ApplicationWindowProvider, provides the geometries of the visible top
+    level windows of the running Qt application. Qt doesn't expose the
+    windows of other processes, so for picking foreign windows a platform
+    specific provider has to be used.
+    """
+
+    def __init__(self, exclude=None):
+        super(ApplicationWindowProvider, self).__init__()
+        self._exclude = exclude or []
+
+    def window_geometries(self):
+        """
+        Get the frame geometries of the visible application windows.
+        :return: list of QtCore.QRect
+        """
+        excluded = [widget.windowHandle() for widget in self._exclude]
+        windows = [
+            window for window in QtGui.QGuiApplication.topLevelWindows()
+            if window.isVisible() and window not in excluded]
+
+        # the focused window is the best guess for the top most window
+        focus_window = QtGui.QGuiApplication.focusWindow()
+        if focus_window in windows:
+            windows.remove(focus_window)
+            windows.insert(0, focus_window)
+
+        return [window.frameGeometry() for window in windows]
+
+
+def _to_logical(x, y, width, height):
+    """
+    Convert a native window geometry in physical pixels into the device
+    independent pixels Qt grabs in.
+    :param int x:
+    :param int y:
+    :param int width:
+    :param int height:
+    :return: QtCore.QRect
+    """
+    screen = QtGui.QGuiApplication.primaryScreen()
+    ratio = 1.0 if screen is None else screen.devicePixelRatio()
+    if ratio == 1.0:
+        return QtCore.QRect(x, y, width, height)
+    return QtCore.QRect(
+        int(round(x / ratio)), int(round(y / ratio)),
+        int(round(width / ratio)), int(round(height / ratio)))
+
+
+class _RECT(ctypes.Structure):
+    _fields_ = [
+        ('left', ctypes.c_long), ('top', ctypes.c_long),
+        ('right', ctypes.c_long), ('bottom', ctypes.c_long)]
+
+
+class Win32WindowProvider(WindowGeometryProvider):
+    """
+    Win32WindowProvider, provides the geometries of the visible top level
+    windows of all processes on Windows. EnumWindows lists the windows in
+    z-order, top most first. Minimized and cloaked windows, e.g. apps on
+    other virtual desktops, are left out.
+    """
+    # DwmGetWindowAttribute attributes
+    _EXTENDED_FRAME_BOUNDS = 9
+    _CLOAKED = 14
+
+    def __init__(self, exclude=None):
+        super(Win32WindowProvider, self).__init__()
+        if not sys.platform.startswith('win'):
+            raise OSError('The Win32 window provider needs Windows')
+
+        self._user32 = ctypes.windll.user32
+        try:
+            self._dwmapi = ctypes.windll.dwmapi
+        except OSError:
+            self._dwmapi = None
+        self._exclude = exclude or []
+
+    def _dwm_attribute(self, hwnd, attribute, value):
+        """
+        Read a window attribute of the desktop window manager.
+        :param int hwnd: window handle
+        :param int attribute: attribute id
+        :param ctypes value: value to read the attribute into
+        :return: bool if the attribute could be read
+        """
+        if self._dwmapi is None:
+            return False
+        return self._dwmapi.DwmGetWindowAttribute(
+            ctypes.c_void_p(hwnd), attribute, ctypes.byref(value),
+            ctypes.sizeof(value)) == 0
+
+    def _window_rect(self, hwnd):
+        """
+        Get the bounds of a window, without the invisible resize borders
+        where the window manager reports them.
+        :param int hwnd: window handle
+        :return: QtCore.QRect
+        """
+        rect = _RECT()
+        if not self._dwm_attribute(hwnd, self._EXTENDED_FRAME_BOUNDS, rect):
+            self._user32.GetWindowRect(ctypes.c_void_p(hwnd),
+                                       ctypes.byref(rect))
+        return _to_logical(rect.left, rect.top, rect.right - rect.left,
+                           rect.bottom - rect.top)
+
+    def window_geometries(self):
+        """
+        Get the geometries of the visible top level windows, top most first.
+        :return: list of QtCore.QRect
+        """
+        excluded = set(int(widget.winId()) for widget in self._exclude)
+        handles = []
+
+        def collect(hwnd, _):
+            handles.append(hwnd)
+            return True
+
+        callback_type = ctypes.WINFUNCTYPE(
+            ctypes.c_bool, ctypes.c_void_p, ctypes.c_void_p)
+        self._user32.EnumWindows(callback_type(collect), None)
+
+        geometries = []
+        for hwnd in handles:
+            if not hwnd or hwnd in excluded:
+                continue
+            handle = ctypes.c_void_p(hwnd)
+            if not self._user32.IsWindowVisible(handle) or \
+                    self._user32.IsIconic(handle):
+                continue
+            cloaked = ctypes.c_int(0)
+            if self._dwm_attribute(hwnd, self._CLOAKED, cloaked) and \
+                    cloaked.value:
+                continue
+
+            rect = self._window_rect(hwnd)
+            if not rect.isEmpty():
+                geometries.append(rect)
+        return geometries
+
+
+class _XWindowAttributes(ctypes.Structure):
+    _fields_ = [
+        ('x', ctypes.c_int), ('y', ctypes.c_int),
+        ('width', ctypes.c_int), ('height', ctypes.c_int),
+        ('border_width', ctypes.c_int), ('depth', ctypes.c_int),
+        ('visual', ctypes.c_void_p), ('root', ctypes.c_ulong),
+        ('class', ctypes.c_int), ('bit_gravity', ctypes.c_int),
+        ('win_gravity', ctypes.c_int), ('backing_store', ctypes.c_int),
+        ('backing_planes', ctypes.c_ulong), ('backing_pixel', ctypes.c_ulong),
+        ('save_under', ctypes.c_int), ('colormap', ctypes.c_ulong),
+        ('map_installed', ctypes.c_int), ('map_state', ctypes.c_int),
+        ('all_event_masks', ctypes.c_long),
+        ('your_event_mask', ctypes.c_long),
+        ('do_not_propagate_mask', ctypes.c_long),
+        ('override_redirect', ctypes.c_int), ('screen', ctypes.c_void_p)]
+
+
+_X_ERROR_HANDLER = ctypes.CFUNCTYPE(
+    ctypes.c_int, ctypes.c_void_p, ctypes.c_void_p)
+
+
+class X11WindowProvider(WindowGeometryProvider):
+    """
+    X11WindowProvider, provides the geometries of the visible top level
+    windows of all processes on X11. The windows are read from the
+    _NET_CLIENT_LIST_STACKING property of the root window, which EWMH window
+    managers keep ordered from the bottom most to the top most window. The
+    decorations of the window manager, _NET_FRAME_EXTENTS, are included.
+    """
+    _IS_VIEWABLE = 2
+    _ANY_PROPERTY_TYPE = 0
+
+    def __init__(self, exclude=None, display=None):
+        super(X11WindowProvider, self).__init__()
+        library = ctypes.util.find_library('X11')
+        if library is None:
+            raise OSError('The X11 window provider needs libX11')
+
+        xlib = ctypes.cdll.LoadLibrary(library)
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XInternAtom.restype = ctypes.c_ulong
+        xlib.XInternAtom.argtypes = [
+            ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        xlib.XGetWindowProperty.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_long,
+            ctypes.c_long, ctypes.c_int, ctypes.c_ulong,
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_void_p)]
+        xlib.XFree.argtypes = [ctypes.c_void_p]
+        xlib.XSetErrorHandler.restype = ctypes.c_void_p
+        xlib.XSetErrorHandler.argtypes = [ctypes.c_void_p]
+        xlib.XGetWindowAttributes.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong,
+            ctypes.POINTER(_XWindowAttributes)]
+        xlib.XTranslateCoordinates.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_int,
+            ctypes.c_int, ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_ulong)]
+
+        if display is None:
+            display = os.environ.get('DISPLAY')
+        if not display:
+            raise OSError('The X11 window provider needs a display')
+        self._display_name = display.encode()
+        self._xlib = xlib
+        self._exclude = exclude or []
+
+    def _cardinals(self, display, window, atom):
+        """
+        Read a property of 32 bit values of the given window.
+        :param ctypes.c_void_p display:
+        :param int window:
+        :param int atom: property name
+        :return: list of int
+        """
+        actual_type = ctypes.c_ulong()
+        actual_format = ctypes.c_int()
+        count = ctypes.c_ulong()
+        remaining = ctypes.c_ulong()
+        data = ctypes.c_void_p()
+        status = self._xlib.XGetWindowProperty(
+            display, window, atom, 0, 1 << 16, False,
+            self._ANY_PROPERTY_TYPE, ctypes.byref(actual_type),
+            ctypes.byref(actual_format), ctypes.byref(count),
+            ctypes.byref(remaining), ctypes.byref(data))
+        if status != 0 or not data.value:
+            return []
+
+        try:
+            if actual_format.value != 32:
+                return []
+            # note: Xlib returns 32 bit properties as arrays of C longs
+            values = ctypes.cast(
+                data, ctypes.POINTER(ctypes.c_ulong * count.value))
+            return list(values.contents)
+        finally:
+            self._xlib.XFree(data)
+
+    def window_geometries(self):
+        """
+        Get the geometries of the visible top level windows, top most first.
+        :return: list of QtCore.QRect
+        """
+        xlib = self._xlib
+        display = xlib.XOpenDisplay(self._display_name)
+        if not display:
+            return []
+
+        # note: the default error handler exits the process, windows which
+        # are closed while they're queried would raise BadWindow errors
+        ignore_errors = _X_ERROR_HANDLER(lambda display, event: 0)
+        previous_handler = xlib.XSetErrorHandler(
+            ctypes.cast(ignore_errors, ctypes.c_void_p))
+        try:
+            root = xlib.XDefaultRootWindow(display)
+            stacking = xlib.XInternAtom(
+                display, b'_NET_CLIENT_LIST_STACKING', True)
+            extents_atom = xlib.XInternAtom(
+                display, b'_NET_FRAME_EXTENTS', True)
+            if not stacking:
+                return []
+
+            excluded = set(int(widget.winId()) for widget in self._exclude)
+            geometries = []
+            for window in reversed(self._cardinals(display, root, stacking)):
+                if window in excluded:
+                    continue
+                attributes = _XWindowAttributes()
+                if not xlib.XGetWindowAttributes(
+                        display, window, ctypes.byref(attributes)) or \
+                        attributes.map_state != self._IS_VIEWABLE:
+                    continue
+
+                x, y = ctypes.c_int(), ctypes.c_int()
+                child = ctypes.c_ulong()
+                xlib.XTranslateCoordinates(
+                    display, window, root, 0, 0, ctypes.byref(x),
+                    ctypes.byref(y), ctypes.byref(child))
+
+                left = right = top = bottom = 0
+                if extents_atom:
+                    extents = self._cardinals(display, window, extents_atom)
+                    if len(extents) == 4:
+                        left, right, top, bottom = extents
+
+                rect = _to_logical(
+                    x.value - left, y.value - top,
+                    attributes.width + left + right,
+                    attributes.height + top + bottom)
+                if not rect.isEmpty():
+                    geometries.append(rect)
+            return geometries
+        finally:
+            xlib.XCloseDisplay(display)
+            xlib.XSetErrorHandler(previous_handler)
+
+
+def default_window_provider(exclude=None):
+    """
+    Get the provider of the windows of all processes for the platform, the
+    windows of the running Qt application are provided when there is none.
+    :param list exclude: widgets whose windows are left out
+    :return: WindowGeometryProvider
+    """
+    platform = QtGui.QGuiApplication.platformName()
+    provider_types = []
+    if sys.platform.startswith('win'):
+        provider_types.append(Win32WindowProvider)
+    elif platform in ('xcb', ''):
+        provider_types.append(X11WindowProvider)
+
+    for provider_type in provider_types:
+        try:
+            return provider_type(exclude)
+        except OSError:
+            continue
+    return ApplicationWindowProvider(exclude)
+
+
+class WindowIndex(object):
+    """
+    WindowIndex, spatial index over window geometries for fast hit testing.
+    The geometries are kept as a z-ordered list and bucketed into a uniform
+    grid, so a lookup only has to test the few windows overlapping the grid
+    cell under the point instead of every window.
+    """
+
+    def __init__(self, geometries, cell_size=128):
+        self._geometries = [QtCore.QRect(rect) for rect in geometries]
+        self._cell_size = int(cell_size)
+        self._cells = {}
+
+        # every cell stores the indices of its windows in z-order, since the
+        # windows are inserted top most first
+        for index, rect in enumerate(self._geometries):
+            for cell in self._cells_for_rect(rect):
+                self._cells.setdefault(cell, []).append(index)
+
+    def __len__(self):
+        return len(self._geometries)
+
+    @classmethod
+    def from_provider(cls, provider, cell_size=128):
+        """
+        Create a window index from the geometries of the given provider.
+        :param WindowGeometryProvider provider:
+        :param int cell_size: size of a grid cell in pixels
+        :return: WindowIndex
+        """
+        return cls(provider.window_geometries(), cell_size)
+
+    def _cells_for_rect(self, rect):
+        """
+        Get the grid cells the given rect overlaps.
+        :param QtCore.QRect rect:
+        :return: generator of (int, int) tuples
+        """
+        if rect.isEmpty():
+            return
+
+        first_column = rect.left() // self._cell_size
+        last_column = rect.right() // self._cell_size
+        first_row = rect.top() // self._cell_size
+        last_row = rect.bottom() // self._cell_size
+
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                yield column, row
+
+    def window_at(self, point):
+        """
+        Get the geometry of the top most window under the given point.
+        :param QtCore.QPoint point:
+        :return: QtCore.QRect or None
+        """
+        cell = (point.x() // self._cell_size, point.y() // self._cell_size)
+        for index in self._cells.get(cell, ()):
+            rect = self._geometries[index]
+            if rect.contains(point):
+                return QtCore.QRect(rect)
+        return None
@@ -0,0 +1,173 @@
+import pytest
+from PySide2 import QtCore, QtGui
+from qtgrab import analysis as analysis_module
+from qtgrab.analysis import ImageAnalysis
+from qtgrab.capture import Capture
+
+
+def _create_image(image_format=QtGui.QImage.Format_RGB32):
+    """
+    Create an image with a red left half and a blue right half, with a white
+    pixel in the top left corner.
+    :param QtGui.QImage.Format image_format:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(10, 4, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(200, 0, 0))
+    painter = QtGui.QPainter(image)
+    painter.fillRect(QtCore.QRect(5, 0, 5, 4), QtGui.QColor(0, 0, 100))
+    painter.end()
+    image.setPixel(0, 0, QtGui.qRgb(255, 255, 255))
+    return image.convertToFormat(image_format)
+
+
+def test_histograms(qtbot):
+    """
+    Test if the histograms count the pixels per channel value.
+    :param QtBot qtbot:
+    :return: None
+    """
+    analysis = ImageAnalysis(_create_image())
+    histograms = analysis.histograms()
+
+    assert list(histograms.keys()) == ['red', 'green', 'blue']
+    assert histograms['red'][200] == 19
+    assert histograms['red'][255] == 1
+    assert histograms['red'][0] == 20
+    assert histograms['green'][0] == 39
+    assert histograms['blue'][100] == 20
+    assert all(sum(histogram) == 40 for histogram in histograms.values())
+
+    # sub areas are read without spanning full rows
+    histograms = analysis.histograms(QtCore.QRect(4, 1, 2, 3))
+    assert histograms['red'][200] == 3
+    assert histograms['blue'][100] == 3
+
+    # areas are clipped to the image
+    histograms = analysis.histograms(QtCore.QRect(8, 2, 10, 10))
+    assert sum(histograms['red']) == 4
+    assert sum(analysis.histograms(QtCore.QRect(20, 20, 5, 5))['red']) == 0
+
+
+def test_histogram_cache(qtbot):
+    """
+    Test if the histograms are cached per area.
+    :param QtBot qtbot:
+    :return: None
+    """
+    analysis = ImageAnalysis(_create_image())
+    rect = QtCore.QRect(0, 0, 5, 4)
+    assert analysis.histograms(rect)['red'][200] == 19
+
+    # the cached histogram is used even though the pixels changed
+    analysis.image.fill(QtGui.QColor(0, 0, 0))
+    histograms = analysis.histograms(rect)
+    assert histograms['red'][200] == 19
+
+    # returned histograms are copies of the cached ones
+    histograms['red'][200] = 0
+    assert analysis.histograms(rect)['red'][200] == 19
+
+    analysis.clear()
+    assert analysis.histograms(rect)['red'][0] == 20
+
+
+def test_channel_stats(qtbot):
+    """
+    Test the minimum, maximum and mean per channel.
+    :param QtBot qtbot:
+    :return: None
+    """
+    analysis = ImageAnalysis(_create_image())
+    stats = analysis.channel_stats(QtCore.QRect(0, 0, 5, 4))
+    assert (stats['red'].minimum, stats['red'].maximum) == (200, 255)
+    assert stats['red'].mean == pytest.approx((19 * 200 + 255) / 20.0)
+    assert stats['blue'].mean == pytest.approx(255 / 20.0)
+
+    with pytest.raises(ValueError):
+        analysis.channel_stats(QtCore.QRect(20, 20, 5, 5))
+
+
+def test_unique_colors(qtbot):
+    """
+    Test if the distinct colours of an area are counted.
+    :param QtBot qtbot:
+    :return: None
+    """
+    analysis = ImageAnalysis(_create_image())
+    assert analysis.unique_colors() == 3
+    assert analysis.unique_colors(QtCore.QRect(1, 1, 4, 3)) == 1
+    assert analysis.unique_colors(QtCore.QRect(4, 0, 2, 4)) == 2
+
+
+def test_pixel_at(qtbot):
+    """
+    Test the colour picking of a single pixel.
+    :param QtBot qtbot:
+    :return: None
+    """
+    analysis = ImageAnalysis(_create_image())
+    assert analysis.pixel_at(QtCore.QPoint(0, 0)) == QtGui.QColor(
+        255, 255, 255)
+    assert analysis.pixel_at(QtCore.QPoint(9, 3)) == QtGui.QColor(0, 0, 100)
+
+    with pytest.raises(ValueError):
+        analysis.pixel_at(QtCore.QPoint(10, 0))
+
+
+def test_converted_formats(qtbot):
+    """
+    Test if other formats are analysed the same way, including alpha.
+    :param QtBot qtbot:
+    :return: None
+    """
+    analysis = ImageAnalysis(_create_image(QtGui.QImage.Format_RGB888))
+    assert analysis.histograms()['red'][200] == 19
+
+    analysis = ImageAnalysis(
+        _create_image(QtGui.QImage.Format_ARGB32_Premultiplied))
+    assert analysis.channels() == ['red', 'green', 'blue', 'alpha']
+    assert analysis.histograms()['alpha'][255] == 40
+
+
+def test_premultiplied(qtbot, monkeypatch):
+    """
+    Test if premultiplied images are analysed unpremultiplied, converting
+    only chunks of the analysed area.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    image = _create_image(QtGui.QImage.Format_ARGB32)
+    image.setPixel(9, 3, QtGui.qRgba(0, 0, 100, 128))
+    expected = ImageAnalysis(image)
+
+    # chunks of two rows
+    monkeypatch.setattr(analysis_module, 'CHUNK_BYTES', 10 * 4 * 2)
+    premultiplied = image.convertToFormat(
+        QtGui.QImage.Format_ARGB32_Premultiplied)
+    analysis = ImageAnalysis(premultiplied)
+    assert analysis.image is premultiplied
+    assert analysis.histograms() == expected.histograms()
+    assert analysis.unique_colors() == expected.unique_colors() == 4
+
+    area = QtCore.QRect(4, 1, 6, 3)
+    assert analysis.histograms(area) == expected.histograms(area)
+    assert analysis.histograms(area)['alpha'][128] == 1
+    assert analysis.pixel_at(QtCore.QPoint(9, 3)) == \
+        QtGui.QColor(0, 0, 100, 128)
+
+
+def test_capture_analysis(qtbot):
+    """
+    Test if the analysis is cached on the capture.
+    :param QtBot qtbot:
+    :return: None
+    """
+    capture = Capture(_create_image())
+    analysis = capture.analysis()
+    assert capture.analysis() is analysis
+    assert analysis.unique_colors() == 3
+
+    capture.clear_analysis()
+    assert capture.analysis() is not analysis
@@ -0,0 +1,142 @@
+from PySide2 import QtCore, QtGui
+from qtgrab.annotations import AnnotationLayer, Arrow, Box, Text
+
+
+def _create_base(width=200, height=100):
+    """
+    Create a grey base preview.
+    :param int width:
+    :param int height:
+    :return: QtGui.QPixmap
+    """
+    pixmap = QtGui.QPixmap(width, height)
+    pixmap.fill(QtGui.QColor(128, 128, 128))
+    return pixmap
+
+
+def test_bounding_rects(qtbot):
+    """
+    Test if the bounding rects cover the pens of the annotations.
+    :param QtBot qtbot:
+    :return: None
+    """
+    box = Box(QtCore.QRect(10, 10, 50, 20), width=4)
+    assert box.bounding_rect().contains(QtCore.QRectF(8, 8, 54, 24))
+
+    arrow = Arrow(QtCore.QPoint(10, 50), QtCore.QPoint(100, 50), width=2)
+    rect = arrow.bounding_rect()
+    assert rect.contains(QtCore.QPointF(10, 50))
+    assert rect.contains(QtCore.QPointF(100, 50))
+    # the head opens up around the end point
+    assert rect.top() < 50 - 4 and rect.bottom() > 50 + 4
+
+    text = Text(QtCore.QPoint(20, 20), 'annotation', pixel_size=16)
+    rect = text.bounding_rect()
+    assert rect.left() <= 20 and rect.top() <= 20
+    assert rect.width() > 16 and rect.height() >= 16
+
+
+def test_preview_compositing(qtbot):
+    """
+    Test if only the bounding rects of edited annotations are repainted.
+    :param QtBot qtbot:
+    :return: None
+    """
+    layer = AnnotationLayer()
+    base = _create_base()
+    source_size = QtCore.QSize(400, 200)
+
+    # without annotations the base preview is used as it is
+    assert layer.preview(base, source_size) is base
+
+    box = layer.add(Box(
+        QtCore.QRect(20, 20, 40, 40), QtGui.QColor(255, 0, 0), width=4))
+    preview = layer.preview(base, source_size).toImage()
+    assert layer.last_repaint.boundingRect() == QtCore.QRect(0, 0, 200, 100)
+    assert preview.pixel(10, 20) == QtGui.qRgb(255, 0, 0)
+    assert preview.pixel(20, 20) == QtGui.qRgb(128, 128, 128)
+
+    # nothing changed, nothing is repainted
+    layer.preview(base, source_size)
+    assert layer.last_repaint.isEmpty()
+
+    # moving the box only repaints its old and new bounds
+    box.rect.translate(200, 0)
+    layer.update(box)
+    preview = layer.preview(base, source_size).toImage()
+    repainted = layer.last_repaint.boundingRect()
+    assert repainted.width() < 150 and repainted.height() < 40
+    assert preview.pixel(10, 20) == QtGui.qRgb(128, 128, 128)
+    assert preview.pixel(110, 20) == QtGui.qRgb(255, 0, 0)
+
+    layer.remove(box)
+    assert layer.preview(base, source_size) is base
+
+
+def test_overlapping_annotations(qtbot):
+    """
+    Test if repainting an area keeps the stacking order of the annotations.
+    :param QtBot qtbot:
+    :return: None
+    """
+    layer = AnnotationLayer()
+    base = _create_base()
+    source_size = base.size()
+
+    layer.add(Box(QtCore.QRect(10, 10, 80, 80), QtGui.QColor(0, 0, 255),
+                  width=10))
+    green = layer.add(Box(QtCore.QRect(10, 10, 80, 80),
+                          QtGui.QColor(0, 255, 0), width=4))
+    assert layer.preview(base, source_size).toImage().pixel(
+        10, 50) == QtGui.qRgb(0, 255, 0)
+
+    # the blue box shows where the green one was
+    green.rect.translate(100, 0)
+    layer.update(green)
+    preview = layer.preview(base, source_size).toImage()
+    assert preview.pixel(10, 50) == QtGui.qRgb(0, 0, 255)
+    assert preview.pixel(110, 50) == QtGui.qRgb(0, 255, 0)
+
+
+def test_new_base(qtbot):
+    """
+    Test if a new base preview is composited completely.
+    :param QtBot qtbot:
+    :return: None
+    """
+    layer = AnnotationLayer()
+    layer.add(Box(QtCore.QRect(20, 20, 40, 40), width=2))
+    layer.preview(_create_base(), QtCore.QSize(200, 100))
+
+    base = _create_base(100, 50)
+    preview = layer.preview(base, QtCore.QSize(200, 100))
+    assert preview.size() == QtCore.QSize(100, 50)
+    assert layer.last_repaint.boundingRect() == QtCore.QRect(0, 0, 100, 50)
+
+
+def test_render(qtbot):
+    """
+    Test if annotations are painted at full resolution on a copy.
+    :param QtBot qtbot:
+    :return: None
+    """
+    layer = AnnotationLayer()
+    image = QtGui.QImage(400, 200, QtGui.QImage.Format_RGB888)
+    image.fill(QtGui.QColor(255, 255, 255))
+    assert layer.render(image) is image
+
+    layer.add(Box(QtCore.QRect(20, 20, 40, 40), QtGui.QColor(255, 0, 0),
+                  width=2))
+    layer.add(Arrow(QtCore.QPoint(100, 100), QtCore.QPoint(300, 100),
+                    QtGui.QColor(0, 0, 255), width=4))
+    layer.add(Text(QtCore.QPoint(10, 150), 'note'))
+
+    rendered = layer.render(image)
+    assert rendered.size() == image.size()
+    assert rendered.pixel(20, 40) == QtGui.qRgb(255, 0, 0)
+    assert rendered.pixel(200, 100) == QtGui.qRgb(0, 0, 255)
+    assert image.pixel(20, 40) == QtGui.qRgb(255, 255, 255)
+
+    layer.clear()
+    assert len(layer) == 0
+    assert layer.render(image) is image
@@ -0,0 +1,135 @@
+from PySide2 import QtCore, QtGui
+from qtgrab import capture as capture_module
+from qtgrab.capture import Capture
+
+
+def _create_image(
+        width=100, height=80, image_format=QtGui.QImage.Format_RGB32):
+    """
+    Create an image with a different color per pixel.
+    :param int width:
+    :param int height:
+    :param QtGui.QImage.Format image_format:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(width, height, image_format)
+    for x in range(width):
+        for y in range(height):
+            image.setPixel(x, y, QtGui.qRgb(x, y, (x + y) % 256))
+    return image
+
+
+def test_single_format(qtbot):
+    """
+    Test if the pixels are held in the chosen format.
+    :param QtBot qtbot:
+    :return: None
+    """
+    image = _create_image(image_format=QtGui.QImage.Format_RGB888)
+    capture = Capture(image)
+
+    assert capture.format == QtGui.QImage.Format_RGB32
+    assert capture.size() == QtCore.QSize(100, 80)
+    assert capture.pixel_nbytes == 100 * 80 * 4
+
+    capture = Capture(
+        image, image_format=QtGui.QImage.Format_ARGB32_Premultiplied)
+    assert capture.format == QtGui.QImage.Format_ARGB32_Premultiplied
+
+
+def test_view(qtbot):
+    """
+    Test if views share the pixels of the capture.
+    :param QtBot qtbot:
+    :return: None
+    """
+    capture = Capture(_create_image(), QtCore.QPoint(10, 20))
+    view = capture.view(QtCore.QRect(30, 40, 20, 10))
+
+    assert view.capture is capture
+    assert view.image.size() == QtCore.QSize(20, 10)
+    assert view.image.pixel(0, 0) == capture.image.pixel(30, 40)
+    assert view.image.pixel(19, 9) == capture.image.pixel(49, 49)
+
+    # writing into the capture's pixels shows up in the view
+    bits = capture.image.bits()
+    bits[40 * capture.image.bytesPerLine() + 30 * 4] = 255
+    assert QtGui.qBlue(view.image.pixel(0, 0)) == 255
+
+    copy = view.copy()
+    assert copy.origin == QtCore.QPoint(40, 60)
+    assert copy.image == view.image
+
+    # painting on the view paints on the capture, painting on a copy doesn't
+    copy.image.fill(QtGui.QColor(0, 255, 0))
+    assert capture.image.pixel(35, 45) != QtGui.qRgb(0, 255, 0)
+    painter = QtGui.QPainter(view.image)
+    painter.fillRect(QtCore.QRect(5, 5, 1, 1), QtGui.QColor(255, 0, 0))
+    painter.end()
+    assert capture.image.pixel(35, 45) == QtGui.qRgb(255, 0, 0)
+
+
+def test_view_clipping(qtbot):
+    """
+    Test if views are clipped to the capture.
+    :param QtBot qtbot:
+    :return: None
+    """
+    capture = Capture(_create_image())
+
+    view = capture.view(QtCore.QRect(90, 70, 50, 50))
+    assert view.rect == QtCore.QRect(90, 70, 10, 10)
+    assert view.image.size() == QtCore.QSize(10, 10)
+
+    view = capture.view(QtCore.QRect(200, 200, 10, 10))
+    assert view.image.isNull()
+
+
+def test_preview(qtbot):
+    """
+    Test if the preview fits the given size and is cached.
+    :param QtBot qtbot:
+    :return: None
+    """
+    capture = Capture(_create_image())
+    assert capture.preview_nbytes == 0
+
+    preview = capture.preview(QtCore.QSize(50, 50))
+    assert preview.size() == QtCore.QSize(50, 40)
+    assert capture.preview(QtCore.QSize(50, 40)) is preview
+    assert capture.nbytes == capture.pixel_nbytes + capture.preview_nbytes
+
+    capture.clear_preview()
+    assert capture.preview_nbytes == 0
+
+
+def test_grab(qtbot, monkeypatch):
+    """
+    Test if grabbing keeps the area's position as the origin.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    monkeypatch.setattr(
+        capture_module, 'grab_area', lambda rect: _create_image(
+            rect.width(), rect.height(), QtGui.QImage.Format_RGB888))
+
+    capture = Capture.grab(QtCore.QRect(5, 6, 20, 30))
+
+    assert capture.origin == QtCore.QPoint(5, 6)
+    assert capture.size() == QtCore.QSize(20, 30)
+    assert capture.format == QtGui.QImage.Format_RGB32
+    assert not capture.is_null()
+    assert not capture.is_tiled
+
+
+def test_save(qtbot, tmpdir):
+    """
+    Test saving a capture.
+    :param QtBot qtbot:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    file_path = str(tmpdir.join('capture.png'))
+    assert Capture(_create_image()).save(file_path)
+    assert QtGui.QImage(file_path).size() == QtCore.QSize(100, 80)
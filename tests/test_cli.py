@@ -0,0 +1,65 @@
+import os
+import pytest
+from PySide2 import QtCore, QtGui
+from qtgrab import capture as capture_module
+from qtgrab import cli
+
+
+def _fake_grab_area(rect):
+    """
+    Replacement for grab_area returning a white image of the area's size.
+    :param QtCore.QRect rect:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(rect.size(), QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    return image
+
+
+def test_grab(qtbot, monkeypatch, tmpdir):
+    """
+    Test if the grab command saves the grabbed area.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :param tmpdir:
+    :return: None
+    """
+    monkeypatch.setattr(capture_module, 'grab_area', _fake_grab_area)
+    file_path = os.path.join(str(tmpdir), 'grab.png')
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(['grab', '10', '20', '30', '40', '-o', file_path])
+    assert exc_info.value.code == 0
+    assert QtGui.QImage(file_path).size() == QtCore.QSize(30, 40)
+
+
+def test_grab_failing(qtbot, monkeypatch, tmpdir):
+    """
+    Test if the grab command fails when the capture can't be saved.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :param tmpdir:
+    :return: None
+    """
+    monkeypatch.setattr(capture_module, 'grab_area', _fake_grab_area)
+    file_path = os.path.join(str(tmpdir), 'missing', 'grab.png')
+
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(['grab', '0', '0', '30', '40', '-o', file_path])
+    assert exc_info.value.code == 1
+
+
+def test_ui(qtbot, monkeypatch):
+    """
+    Test if the sample UI is the default command.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :return: None
+    """
+    from qtgrab import sample
+
+    calls = []
+    monkeypatch.setattr(sample, 'main', lambda: calls.append(True))
+    cli.main([])
+    cli.main(['ui'])
+    assert calls == [True, True]
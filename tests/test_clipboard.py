@@ -0,0 +1,100 @@
+import pytest
+from PySide2 import QtCore, QtGui
+from qtgrab.clipboard import (
+    LazyImageMimeData, ClipboardMetrics, IMAGE_MIME_TYPE, copy_image)
+
+
+def _create_image():
+    """
+    Create a small red image.
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(40, 30, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 0, 0))
+    return image
+
+
+def test_lazy_encoding(qtbot):
+    """
+    Test if formats are only encoded when requested and encoded only once.
+    :param QtBot qtbot:
+    :return: None
+    """
+    mime_data = LazyImageMimeData(_create_image())
+    metrics = mime_data.metrics
+
+    assert mime_data.formats() == [IMAGE_MIME_TYPE, 'image/png', 'image/bmp']
+    assert mime_data.hasFormat('image/png')
+    assert not mime_data.hasFormat('text/plain')
+    assert not metrics.encoded
+
+    png = mime_data.data('image/png')
+    assert bytes(png).startswith(b'\x89PNG')
+    mime_data.data('image/png')
+
+    assert metrics.requested['image/png'] == 2
+    assert metrics.encoded['image/png'] == 1
+    assert metrics.encoded['image/bmp'] == 0
+
+    assert QtGui.QImage.fromData(png).size() == QtCore.QSize(40, 30)
+
+
+def test_raw_image(qtbot):
+    """
+    Test if the raw image is handed out without encoding.
+    :param QtBot qtbot:
+    :return: None
+    """
+    mime_data = LazyImageMimeData(_create_image())
+
+    assert mime_data.hasImage()
+    image = mime_data.imageData()
+    assert image.size() == QtCore.QSize(40, 30)
+    assert not mime_data.metrics.encoded
+
+
+def test_unsupported_formats(qtbot):
+    """
+    Test if only supported formats can be advertised.
+    :param QtBot qtbot:
+    :return: None
+    """
+    with pytest.raises(ValueError):
+        LazyImageMimeData(_create_image(), ['image/tiff'])
+
+    mime_data = LazyImageMimeData(_create_image(), ['image/jpeg'])
+    assert bytes(mime_data.data('image/png')) == b''
+    assert bytes(mime_data.data('image/jpeg')).startswith(b'\xff\xd8')
+
+
+def test_seeded_cache(qtbot):
+    """
+    Test if already encoded data isn't encoded again.
+    :param QtBot qtbot:
+    :return: None
+    """
+    mime_data = LazyImageMimeData(_create_image())
+    mime_data.set_encoded('image/png', b'encoded')
+
+    assert bytes(mime_data.data('image/png')) == b'encoded'
+    assert not mime_data.metrics.encoded
+
+
+def test_copy_image(qtbot):
+    """
+    Test if copied images can be pasted from the clipboard.
+    :param QtBot qtbot:
+    :return: None
+    """
+    metrics = ClipboardMetrics()
+    copy_image(_create_image(), metrics=metrics)
+    copy_image(_create_image(), metrics=metrics)
+
+    clipboard = QtGui.QGuiApplication.clipboard()
+    assert clipboard.image().size() == QtCore.QSize(40, 30)
+    assert metrics.exports == 2
+    assert metrics.requested[IMAGE_MIME_TYPE] >= 1
+
+    metrics.reset()
+    assert metrics.exports == 0
+    assert not metrics.requested
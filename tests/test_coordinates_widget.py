@@ -1,6 +1,8 @@
 from qtgrab.coordinates_widget import CoordinateWidget
+from qtgrab.window_index import StaticWindowProvider
+from qtgrab.future import CaptureFuture
 from pytestqt.qtbot import QtBot
-from PySide2 import QtCore, QtGui
+from PySide2 import QtCore, QtGui, QtWidgets
 import pytest
 
 
@@ -185,3 +187,165 @@ def test_mouse_movement_registering(qtbot):
         co_widget, QtCore.Qt.LeftButton, pos=QtCore.QPoint(p.x(), p.y()))
 
     co_widget.mouseMoveEvent(move_event)
+
+
+def test_window_picking(qtbot):
+    """
+    Test if a single click in window pick mode marks the window under the
+    cursor.
+    :param QtBot qtbot:
+    :return: None
+    """
+    provider = StaticWindowProvider([
+        QtCore.QRect(150, 150, 100, 50), QtCore.QRect(100, 100, 300, 200)])
+
+    co_widget = CoordinateWidget()
+    qtbot.addWidget(co_widget)
+    co_widget.enable_window_pick(provider)
+
+    # the top most window should win where the windows overlap
+    qtbot.mouseClick(
+        co_widget, QtCore.Qt.LeftButton, pos=QtCore.QPoint(160, 160))
+    assert co_widget.top_corner == QtCore.QPoint(150, 150)
+    assert co_widget.bottom_corner == QtCore.QPoint(250, 200)
+
+    qtbot.mouseClick(
+        co_widget, QtCore.Qt.LeftButton, pos=QtCore.QPoint(350, 250))
+    assert co_widget.top_corner == QtCore.QPoint(100, 100)
+    assert co_widget.bottom_corner == QtCore.QPoint(400, 300)
+
+
+def test_window_pick_cancelling(qtbot):
+    """
+    Test if clicking outside of any window cancels the window pick.
+    :param QtBot qtbot:
+    :return: None
+    """
+    co_widget = CoordinateWidget()
+    qtbot.addWidget(co_widget)
+    co_widget.enable_window_pick(
+        StaticWindowProvider([QtCore.QRect(100, 100, 300, 200)]))
+    future = CaptureFuture()
+    co_widget.set_future(future)
+    co_widget.show()
+
+    qtbot.mouseClick(
+        co_widget, QtCore.Qt.LeftButton, pos=QtCore.QPoint(10, 10))
+    assert co_widget.top_corner is None
+    assert co_widget.bottom_corner is None
+    assert not co_widget.isVisible()
+    assert future.is_cancelled()
+
+
+def test_select_without_windows(qtbot):
+    """
+    Test if no widget is shown when there are no windows to pick.
+    :param QtBot qtbot:
+    :return: None
+    """
+    future = CoordinateWidget.select_window(StaticWindowProvider([]))
+    assert future.is_cancelled()
+    assert not any(isinstance(widget, CoordinateWidget)
+                   for widget in QtWidgets.QApplication.topLevelWidgets()
+                   if widget.isVisible())
+
+
+def test_select_window_queries_once(qtbot):
+    """
+    Test if the windows are only queried once per window pick.
+    :param QtBot qtbot:
+    :return: None
+    """
+    queries = []
+
+    class CountingProvider(StaticWindowProvider):
+        def window_geometries(self):
+            queries.append(1)
+            return super(CountingProvider, self).window_geometries()
+
+    future = CoordinateWidget.select_window(
+        CountingProvider([QtCore.QRect(100, 100, 300, 200)]))
+    co_widget = next(
+        widget for widget in QtWidgets.QApplication.topLevelWidgets()
+        if isinstance(widget, CoordinateWidget) and widget.isVisible())
+    qtbot.mouseMove(co_widget, QtCore.QPoint(150, 150))
+    assert co_widget._window_at(QtCore.QPoint(150, 150)) == \
+        QtCore.QRect(100, 100, 300, 200)
+    assert len(queries) == 1
+
+    co_widget.close()
+    assert future.is_cancelled()
+
+
+def test_window_hovering(qtbot):
+    """
+    Test if the window under the cursor is tracked on mouse moves.
+    :param QtBot qtbot:
+    :return: None
+    """
+    window = QtCore.QRect(100, 100, 300, 200)
+    co_widget = CoordinateWidget()
+    qtbot.addWidget(co_widget)
+    co_widget.enable_window_pick(StaticWindowProvider([window]))
+
+    move_event = QtGui.QMouseEvent(
+        QtCore.QEvent.Type.MouseMove,
+        QtCore.QPointF(200, 200),
+        QtCore.Qt.MouseButton.NoButton,
+        QtCore.Qt.MouseButtons(),
+        QtCore.Qt.KeyboardModifiers()
+    )
+    co_widget.mouseMoveEvent(move_event)
+    assert co_widget._hovered_window == window
+
+    co_widget.disable_window_pick()
+    assert co_widget._hovered_window is None
+
+
+def test_future_resolving(qtbot):
+    """
+    Test if the future resolves to the marked corners.
+    :param QtBot qtbot:
+    :return: None
+    """
+    co_widget = CoordinateWidget()
+    qtbot.addWidget(co_widget)
+    future = CaptureFuture()
+    co_widget.set_future(future)
+
+    p1 = QtCore.QPoint(100, 100)
+    p2 = QtCore.QPoint(200, 200)
+    with qtbot.waitSignal(future.finished):
+        qtbot.mouseClick(co_widget, QtCore.Qt.LeftButton, pos=p1)
+        qtbot.mouseClick(co_widget, QtCore.Qt.LeftButton, pos=p2)
+
+    assert future.result() == (co_widget.top_corner, co_widget.bottom_corner)
+
+
+def test_future_cancelling(qtbot):
+    """
+    Test if closing the widget without marking an area cancels the future,
+    and cancelling the future closes the widget.
+    :param QtBot qtbot:
+    :return: None
+    """
+    co_widget = CoordinateWidget()
+    qtbot.addWidget(co_widget)
+    future = CaptureFuture()
+    co_widget.set_future(future)
+
+    co_widget.show()
+    qtbot.waitExposed(co_widget)
+    with qtbot.waitSignal(future.aborted):
+        qtbot.keyClick(co_widget, QtCore.Qt.Key_Escape)
+    assert not co_widget.isVisible()
+
+    co_widget = CoordinateWidget()
+    qtbot.addWidget(co_widget)
+    future = CaptureFuture()
+    co_widget.set_future(future)
+
+    co_widget.show()
+    qtbot.waitExposed(co_widget)
+    future.cancel()
+    assert not co_widget.isVisible()
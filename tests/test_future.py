@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from PySide2 import QtCore
+from qtgrab.future import CaptureFuture, CaptureCancelled
+
+
+def test_result(qtbot):
+    """
+    Test if the result and callbacks are delivered once the future is done.
+    :param QtBot qtbot:
+    :return: None
+    """
+    future = CaptureFuture()
+    done = []
+    future.add_done_callback(done.append)
+
+    assert not future.done()
+    with pytest.raises(RuntimeError):
+        future.result()
+
+    with qtbot.waitSignal(future.finished) as blocker:
+        future.set_result(42)
+
+    assert blocker.args == [42]
+    assert future.done()
+    assert future.result() == 42
+    assert done == [future]
+
+    # callbacks added when done are called right away
+    future.add_done_callback(done.append)
+    assert done == [future, future]
+
+    with pytest.raises(RuntimeError):
+        future.set_result(43)
+    assert not future.cancel()
+
+
+def test_cancel(qtbot):
+    """
+    Test cancelling a future.
+    :param QtBot qtbot:
+    :return: None
+    """
+    future = CaptureFuture()
+    with qtbot.waitSignal(future.aborted):
+        assert future.cancel()
+
+    assert future.done()
+    assert future.is_cancelled()
+    with pytest.raises(CaptureCancelled):
+        future.result()
+    assert future.wait() is None
+
+
+def test_wait(qtbot):
+    """
+    Test if waiting keeps the event loop running until the future is done.
+    :param QtBot qtbot:
+    :return: None
+    """
+    future = CaptureFuture()
+    QtCore.QTimer.singleShot(10, lambda: future.set_result('done'))
+
+    assert future.wait() == 'done'
+    assert CaptureFuture.from_result(1).wait() == 1
+
+
+def test_await(qtbot):
+    """
+    Test if a future can be awaited from asyncio.
+    :param QtBot qtbot:
+    :return: None
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        future = CaptureFuture()
+        loop.call_soon(future.set_result, 'captured')
+        assert loop.run_until_complete(future) == 'captured'
+
+        future = CaptureFuture()
+        loop.call_soon(future.cancel)
+        with pytest.raises(asyncio.CancelledError):
+            loop.run_until_complete(future)
+
+        # cancelling the awaiting task cancels the capture
+        future = CaptureFuture()
+
+        async def wait_for_capture():
+            return await future
+
+        task = loop.create_task(wait_for_capture())
+        loop.call_soon(task.cancel)
+        with pytest.raises(asyncio.CancelledError):
+            loop.run_until_complete(task)
+        assert future.is_cancelled()
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+import pytest
+import qtgrab
+
+
+def _loaded_modules(statement, modules):
+    """
+    Get which of the given modules are loaded after running the statement in
+    a fresh interpreter.
+    :param str statement:
+    :param list modules: names of modules
+    :return: list of str
+    """
+    script = '{0}\nimport sys\nprint(" ".join(m for m in {1!r} if m in ' \
+        'sys.modules))'.format(statement, modules)
+    return subprocess.check_output(
+        [sys.executable, '-c', script], universal_newlines=True).split()
+
+
+def test_lazy_attributes():
+    """
+    Test if the public classes are importable from the package.
+    :return: None
+    """
+    from qtgrab.capture import Capture
+    from qtgrab.shot_widget import ShotWidget
+
+    assert qtgrab.Capture is Capture
+    assert qtgrab.ShotWidget is ShotWidget
+    assert 'Pipeline' in dir(qtgrab)
+
+    with pytest.raises(AttributeError):
+        qtgrab.Missing
+
+
+@pytest.mark.parametrize('statement', [
+    'import qtgrab',
+    'from qtgrab import Capture, Pipeline, FramePublisher',
+    'import qtgrab.cli',
+])
+def test_headless_imports(statement):
+    """
+    Test if the headless APIs don't import the widgets.
+    :param str statement:
+    :return: None
+    """
+    assert _loaded_modules(statement, ['PySide2.QtWidgets']) == []
+
+
+def test_shot_widget_import():
+    """
+    Test if the shot widget defers creating the worker pool of pipelines.
+    :return: None
+    """
+    modules = ['multiprocessing.pool']
+    assert _loaded_modules('import qtgrab.shot_widget', modules) == []
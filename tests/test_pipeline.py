@@ -0,0 +1,313 @@
+import os
+import threading
+import time
+import pytest
+from PySide2 import QtCore, QtGui
+from qtgrab import pipeline
+from qtgrab.pipeline import (
+    Frame, Pipeline, Stage, CropStage, ScaleStage, RedactStage, EncodeStage,
+    FileSink, MemorySink, ClipboardSink, ScreenStream, screen_frames)
+from qtgrab.redaction import Redactor, FILL
+from qtgrab.clipboard import ClipboardMetrics
+
+
+def _create_frame(index=0, width=200, height=100):
+    """
+    Create a frame with a white image.
+    :param int index:
+    :param int width:
+    :param int height:
+    :return: Frame
+    """
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    return Frame(image, index=index)
+
+
+class IndexStage(Stage):
+    """
+    IndexStage, records the thread independent frame order.
+    """
+    parallel = True
+
+    def process(self, frame):
+        frame.metadata.setdefault('seen', []).append(frame.index)
+        return frame
+
+
+def test_untouched_frames(qtbot):
+    """
+    Test if stages leave the images of frames they don't change untouched.
+    :param QtBot qtbot:
+    :return: None
+    """
+    frame = _create_frame()
+    image = frame.image
+
+    result = Pipeline([
+        CropStage(QtCore.QRect(0, 0, 500, 500)),
+        ScaleStage(QtCore.QSize(200, 100))]).process(frame)
+
+    assert result is frame
+    assert result.image is image
+
+
+def test_crop_and_scale(qtbot):
+    """
+    Test if cropping and scaling change the image and origin.
+    :param QtBot qtbot:
+    :return: None
+    """
+    frame = _create_frame()
+
+    result = Pipeline([
+        CropStage(QtCore.QRect(50, 10, 100, 80)),
+        ScaleStage(QtCore.QSize(50, 50))]).process(frame)
+
+    assert result.origin == QtCore.QPoint(50, 10)
+    assert result.image.size() == QtCore.QSize(50, 40)
+
+
+def test_crop_outside(qtbot):
+    """
+    Test if cropping to a rect outside of the frame empties the frame.
+    :param QtBot qtbot:
+    :return: None
+    """
+    result = Pipeline([CropStage(QtCore.QRect(500, 500, 10, 10))]).process(
+        _create_frame())
+
+    assert result.image.isNull()
+    assert result.origin == QtCore.QPoint(500, 500)
+
+
+def test_redact_stage(qtbot):
+    """
+    Test if redacting leaves the source image untouched.
+    :param QtBot qtbot:
+    :return: None
+    """
+    frame = _create_frame()
+    image = frame.image
+    redactor = Redactor(FILL)
+    redactor.add_area(QtCore.QRect(0, 0, 10, 10))
+
+    result = Pipeline([RedactStage(redactor)]).process(frame)
+
+    assert result.image.pixel(0, 0) == QtGui.qRgb(0, 0, 0)
+    assert image.pixel(0, 0) == QtGui.qRgb(255, 255, 255)
+
+
+def test_encode_to_file(qtbot, tmpdir):
+    """
+    Test if encoded frames are written to disk as is.
+    :param QtBot qtbot:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    file_path = os.path.join(str(tmpdir), 'frame_{index}.png')
+    frames = [_create_frame(index) for index in range(3)]
+
+    results = Pipeline([EncodeStage('PNG'), FileSink(file_path)]).run(frames)
+
+    for index, frame in enumerate(results):
+        assert frame.encoding == 'PNG'
+        assert frame.data.startswith(b'\x89PNG')
+        assert frame.metadata['saved']
+        assert QtGui.QImage(file_path.format(index=index)).size() == \
+            QtCore.QSize(200, 100)
+
+
+def test_encode_failing(qtbot):
+    """
+    Test if encoding into an unknown format raises an error.
+    :param QtBot qtbot:
+    :return: None
+    """
+    with pytest.raises(IOError):
+        Pipeline([EncodeStage('NOPE')]).process(_create_frame())
+
+
+@pytest.mark.parametrize('workers', [0, 1, 4])
+def test_stream_order(qtbot, workers):
+    """
+    Test if streams keep their frame order, also with a worker pool.
+    :param QtBot qtbot:
+    :param int workers:
+    :return: None
+    """
+    sink = MemorySink()
+    frames = (_create_frame(index, 20, 20) for index in range(20))
+
+    stream = Pipeline(
+        [IndexStage(), EncodeStage(), IndexStage(), sink], workers)
+    results = list(stream.stream(frames))
+
+    assert [frame.index for frame in results] == list(range(20))
+    assert [frame.index for frame in sink.frames] == list(range(20))
+    assert all(frame.metadata['seen'] == [frame.index] * 2
+               for frame in results)
+
+
+def test_stats(qtbot):
+    """
+    Test if the timing statistics are kept per stage.
+    :param QtBot qtbot:
+    :return: None
+    """
+    stream = Pipeline([IndexStage(), IndexStage(), MemorySink()])
+    stream.run(_create_frame(index, 20, 20) for index in range(5))
+
+    stats = stream.stats
+    assert [stage.name for stage in stats] == [
+        'IndexStage', 'IndexStage', 'MemorySink']
+    assert all(stage.count == 5 for stage in stats)
+    assert all(stage.mean >= 0 for stage in stats)
+
+
+def test_memory_sink_limit(qtbot):
+    """
+    Test if the memory sink only keeps the latest frames.
+    :param QtBot qtbot:
+    :return: None
+    """
+    sink = MemorySink(max_frames=2)
+    Pipeline([sink]).run(_create_frame(index) for index in range(5))
+
+    assert [frame.index for frame in sink.frames] == [3, 4]
+
+
+def test_clipboard_sink(qtbot):
+    """
+    Test if the clipboard sink puts the image on the clipboard.
+    :param QtBot qtbot:
+    :return: None
+    """
+    Pipeline([ClipboardSink()]).process(_create_frame())
+    image = QtGui.QGuiApplication.clipboard().image()
+    assert image.size() == QtCore.QSize(200, 100)
+
+
+def test_screen_frames(qtbot, monkeypatch):
+    """
+    Test if screen frames are grabbed from the given area.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    monkeypatch.setattr(
+        pipeline, 'grab_area', lambda rect: _create_frame(
+            0, rect.width(), rect.height()).image)
+
+    area = QtCore.QRect(10, 20, 30, 40)
+    frames = list(screen_frames(area, count=3))
+
+    assert [frame.index for frame in frames] == [0, 1, 2]
+    assert all(frame.origin == QtCore.QPoint(10, 20) for frame in frames)
+    assert all(frame.image.size() == QtCore.QSize(30, 40)
+               for frame in frames)
+
+
+def test_screen_stream(qtbot, monkeypatch):
+    """
+    Test if a screen stream grabs its frames from the event loop.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    monkeypatch.setattr(
+        pipeline, 'grab_area', lambda rect: _create_frame(
+            0, rect.width(), rect.height()).image)
+
+    sink = MemorySink()
+    stream = ScreenStream(
+        QtCore.QRect(10, 20, 30, 40), Pipeline([sink]), count=3)
+    processed = []
+    stream.frame_processed.connect(processed.append)
+
+    stream.start()
+    assert stream.is_active()
+    assert len(sink.frames) == 0
+    with qtbot.waitSignal(stream.finished):
+        pass
+
+    assert not stream.is_active()
+    assert [frame.index for frame in processed] == [0, 1, 2]
+    assert len(sink.frames) == 3
+
+    # an endless stream runs until it's stopped
+    stream = ScreenStream(QtCore.QRect(0, 0, 10, 10), Pipeline([]))
+    stream.start()
+    qtbot.waitUntil(lambda: stream.index >= 2)
+    with qtbot.waitSignal(stream.finished):
+        stream.stop()
+    assert not stream.is_active()
+
+
+class ThreadStage(Stage):
+    """
+    ThreadStage, records the thread and order frames are processed in. Early
+    frames are made slower, so parallel runs finish out of order.
+    """
+
+    def __init__(self, parallel, delays=None):
+        self.parallel = parallel
+        self.delays = delays or {}
+        self.threads = []
+        self.order = []
+
+    def process(self, frame):
+        time.sleep(self.delays.get(frame.index, 0.0))
+        self.threads.append(threading.current_thread())
+        self.order.append(frame.index)
+        return frame
+
+
+def test_screen_stream_workers(qtbot, monkeypatch):
+    """
+    Test if a screen stream runs the parallel stages on the worker pool,
+    while the serial stages and the processed frames keep their order.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    monkeypatch.setattr(
+        pipeline, 'grab_area', lambda rect: _create_frame(
+            0, rect.width(), rect.height()).image)
+
+    parallel = ThreadStage(True, {0: 0.2, 1: 0.1})
+    serial = ThreadStage(False)
+    stream = ScreenStream(
+        QtCore.QRect(0, 0, 30, 40),
+        Pipeline([parallel, serial, IndexStage()], workers=3), count=5)
+    processed = []
+    stream.frame_processed.connect(processed.append)
+
+    with qtbot.waitSignal(stream.finished, timeout=5000):
+        stream.start()
+
+    assert [frame.index for frame in processed] == [0, 1, 2, 3, 4]
+    # the slow first frames finish last on the pool
+    assert parallel.order[-1] == 0
+    assert serial.order == [0, 1, 2, 3, 4]
+    assert stream.pending == 0
+    assert all(thread is threading.main_thread()
+               for thread in serial.threads)
+    assert not any(thread is threading.main_thread()
+                   for thread in parallel.threads)
+    assert stream.pipeline.stats[0].count == 5
+
+
+def test_clipboard_sink_encoded(qtbot):
+    """
+    Test if the clipboard sink reuses data encoded in the pipeline.
+    :param QtBot qtbot:
+    :return: None
+    """
+    metrics = ClipboardMetrics()
+    Pipeline([EncodeStage('PNG'), ClipboardSink(metrics=metrics)]).process(
+        _create_frame())
+
+    png = QtGui.QGuiApplication.clipboard().mimeData().data('image/png')
+    assert bytes(png).startswith(b'\x89PNG')
+    assert not metrics.encoded
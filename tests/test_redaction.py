@@ -0,0 +1,126 @@
+import pytest
+from PySide2 import QtCore, QtGui
+from qtgrab.redaction import Redactor, PIXELATE, FILL, BLUR
+
+
+def _create_gradient(width=64, height=48):
+    """
+    Create an image with a horizontal gradient.
+    :param int width:
+    :param int height:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    for x in range(width):
+        for y in range(height):
+            image.setPixel(x, y, QtGui.qRgb(x * 4 % 256, y * 5 % 256, 0))
+    return image
+
+
+def test_fill(qtbot):
+    """
+    Test if filling replaces the area with the fill color.
+    :param QtBot qtbot:
+    :return: None
+    """
+    image = _create_gradient()
+    redactor = Redactor(FILL, color=QtGui.QColor(255, 0, 255))
+    redactor.add_area(QtCore.QRect(10, 10, 20, 20))
+
+    result = redactor.apply(image)
+
+    assert result.pixel(10, 10) == QtGui.qRgb(255, 0, 255)
+    assert result.pixel(29, 29) == QtGui.qRgb(255, 0, 255)
+    assert result.pixel(30, 30) == image.pixel(30, 30)
+
+
+def test_pixelate(qtbot):
+    """
+    Test if pixelating turns the area into uniform blocks.
+    :param QtBot qtbot:
+    :return: None
+    """
+    image = _create_gradient()
+    redactor = Redactor(PIXELATE, block_size=8)
+    redactor.add_area(QtCore.QRect(8, 8, 20, 20))
+
+    result = redactor.apply(image)
+
+    block = set(result.pixel(x, y)
+                for x in range(8, 16) for y in range(8, 16))
+    assert len(block) == 1
+    # partial blocks at the edge of the area are cut off
+    assert result.pixel(28, 28) == image.pixel(28, 28)
+
+
+def test_blur(qtbot):
+    """
+    Test if blurring averages the pixels within the blur radius.
+    :param QtBot qtbot:
+    :return: None
+    """
+    image = QtGui.QImage(40, 40, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(0, 0, 0))
+    image.setPixel(20, 20, QtGui.qRgb(255, 255, 255))
+
+    redactor = Redactor(BLUR, radius=2)
+    redactor.add_area(QtCore.QRect(10, 10, 20, 20))
+    result = redactor.apply(image)
+
+    center = QtGui.qRed(result.pixel(20, 20))
+    assert 0 < center < 255
+    assert QtGui.qRed(result.pixel(22, 22)) > 0
+    assert QtGui.qRed(result.pixel(23, 20)) == 0
+
+
+def test_original_untouched(qtbot):
+    """
+    Test if the original image is only changed when asked for.
+    :param QtBot qtbot:
+    :return: None
+    """
+    image = _create_gradient()
+    original = image.copy()
+    redactor = Redactor(FILL)
+    redactor.add_area(QtCore.QRect(0, 0, 10, 10))
+
+    redactor.apply(image)
+    assert image == original
+
+    result = redactor.apply(image, in_place=True)
+    assert result.pixel(0, 0) == image.pixel(0, 0) == QtGui.qRgb(0, 0, 0)
+
+
+def test_area_management(qtbot):
+    """
+    Test adding and clearing the areas to redact.
+    :param QtBot qtbot:
+    :return: None
+    """
+    redactor = Redactor()
+    with pytest.raises(ValueError):
+        redactor.add_area(QtCore.QRect(0, 0, 10, 10), 'smudge')
+
+    redactor.add_area(QtCore.QRect(0, 0, 10, 10))
+    redactor.add_area(QtCore.QRect(20, 20, 10, 10), BLUR)
+    assert redactor.areas == [
+        (QtCore.QRect(0, 0, 10, 10), PIXELATE),
+        (QtCore.QRect(20, 20, 10, 10), BLUR)]
+
+    redactor.clear_areas()
+    image = _create_gradient()
+    assert redactor.apply(image) is image
+
+
+def test_area_outside_image(qtbot):
+    """
+    Test if areas outside of the image are ignored.
+    :param QtBot qtbot:
+    :return: None
+    """
+    image = _create_gradient()
+    redactor = Redactor()
+    redactor.add_area(QtCore.QRect(100, 100, 10, 10), PIXELATE)
+    redactor.add_area(QtCore.QRect(100, 100, 10, 10), BLUR)
+
+    assert redactor.apply(image) == image
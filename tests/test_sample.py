@@ -1,5 +1,6 @@
 from qtgrab.sample import SampleUi
 from qtgrab.coordinates_widget import CoordinateWidget
+from qtgrab.future import CaptureFuture
 from pytestqt.qtbot import QtBot
 from PySide2 import QtCore, QtWidgets
 import pytest
@@ -17,8 +18,8 @@ def test_sample_widget(qtbot, monkeypatch, tmpdir, p1, p2):
     """
     # monkeypatch coordinate getting
     monkeypatch.setattr(
-        CoordinateWidget, 'get_coordinates',
-        lambda *args: (p1, p2))
+        CoordinateWidget, 'select_area',
+        lambda *args: CaptureFuture.from_result((p1, p2)))
     # monkeypatch file dialog to return None
     monkeypatch.setattr(
         QtWidgets.QFileDialog, 'getSaveFileName',
@@ -46,3 +47,5 @@ def test_sample_widget(qtbot, monkeypatch, tmpdir, p1, p2):
     sample_widget.toggle_ratio(False)
     # set the image ratio
     sample_widget.set_ratio_value(1)
+    # copy the capture
+    qtbot.mouseClick(sample_widget.btn_copy, QtCore.Qt.LeftButton)
@@ -0,0 +1,196 @@
+from PySide2 import QtCore, QtGui
+from qtgrab import scheduler
+from qtgrab.scheduler import CaptureScheduler, coalesce_rects
+
+
+def _fake_grab_area(grabs):
+    """
+    Create a replacement for grab_area which records the grabbed areas and
+    encodes the desktop coordinates of every pixel in its color.
+    :param list grabs: list the grabbed areas are appended to
+    :return: callable
+    """
+    def grab_area(rect):
+        grabs.append(QtCore.QRect(rect))
+        image = QtGui.QImage(rect.size(), QtGui.QImage.Format_RGB32)
+        for x in range(rect.width()):
+            for y in range(rect.height()):
+                image.setPixel(x, y, QtGui.qRgb(
+                    rect.x() + x, rect.y() + y, 0))
+        return image
+    return grab_area
+
+
+def test_coalesce_rects():
+    """
+    Test if overlapping and nearby rects are merged within the threshold.
+    :return: None
+    """
+    # overlapping rects with little waste are merged
+    rects = [QtCore.QRect(0, 0, 100, 100), QtCore.QRect(50, 0, 100, 100)]
+    assert coalesce_rects(rects, 0.0) == [
+        (QtCore.QRect(0, 0, 150, 100), [0, 1])]
+
+    # rects far apart are grabbed separately
+    rects = [QtCore.QRect(0, 0, 10, 10), QtCore.QRect(500, 500, 10, 10)]
+    assert len(coalesce_rects(rects, 0.25)) == 2
+
+    # nearby rects are merged depending on the threshold
+    rects = [QtCore.QRect(0, 0, 40, 10), QtCore.QRect(50, 0, 40, 10)]
+    assert len(coalesce_rects(rects, 0.0)) == 2
+    assert coalesce_rects(rects, 0.2) == [
+        (QtCore.QRect(0, 0, 90, 10), [0, 1])]
+
+    # contained rects never waste any pixels
+    rects = [QtCore.QRect(10, 10, 5, 5), QtCore.QRect(0, 0, 100, 100),
+             QtCore.QRect(300, 300, 5, 5)]
+    assert coalesce_rects(rects, 0.0) == [
+        (QtCore.QRect(0, 0, 100, 100), [0, 1]),
+        (QtCore.QRect(300, 300, 5, 5), [2])]
+
+
+def test_coalesce_complexity(monkeypatch):
+    """
+    Test if coalescing only computes the waste of the pairs with a merged
+    group again, instead of all the pairs after every merge.
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    candidates = []
+    merge_candidate = scheduler._merge_candidate
+
+    def count_candidate(first, second):
+        candidates.append(1)
+        return merge_candidate(first, second)
+    monkeypatch.setattr(scheduler, '_merge_candidate', count_candidate)
+
+    # a row of touching rects, merged one by one into a single rect
+    rects = [QtCore.QRect(index * 10, 0, 10, 10) for index in range(100)]
+    assert coalesce_rects(rects, 0.0) == [
+        (QtCore.QRect(0, 0, 1000, 10), list(range(100)))]
+    # every merge computes the pairs with the groups left
+    assert len(candidates) <= 100 * 99
+
+    # a grid of separate rects only computes every pair once
+    del candidates[:]
+    rects = [QtCore.QRect((index % 10) * 200, (index // 10) * 150, 120, 90)
+             for index in range(100)]
+    assert len(coalesce_rects(rects, 0.1)) == 100
+    assert len(candidates) == 100 * 99 // 2
+
+
+def test_tick(qtbot, monkeypatch):
+    """
+    Test if the regions due in a tick share their grabs.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :return: None
+    """
+    grabs = []
+    monkeypatch.setattr(scheduler, 'grab_area', _fake_grab_area(grabs))
+
+    captured = []
+
+    def callback(view):
+        captured.append((view.capture.origin + view.rect.topLeft(),
+                         view.rect.size(), view.image.pixel(0, 0)))
+
+    capture_scheduler = CaptureScheduler(waste_threshold=0.0)
+    capture_scheduler.add_region(
+        QtCore.QRect(0, 0, 20, 20), 1.0, callback, now=0.0)
+    capture_scheduler.add_region(
+        QtCore.QRect(10, 0, 20, 20), 5.0, callback, now=0.0)
+    capture_scheduler.add_region(
+        QtCore.QRect(100, 100, 10, 10), 1.0, callback, now=0.0)
+
+    stats = capture_scheduler.tick(0.0)
+    assert (stats.grabs, stats.regions) == (2, 3)
+    assert stats.bytes_read == (30 * 20 + 10 * 10) * 4
+    assert grabs == [
+        QtCore.QRect(0, 0, 30, 20), QtCore.QRect(100, 100, 10, 10)]
+    assert captured == [
+        (QtCore.QPoint(0, 0), QtCore.QSize(20, 20), QtGui.qRgb(0, 0, 0)),
+        (QtCore.QPoint(10, 0), QtCore.QSize(20, 20), QtGui.qRgb(10, 0, 0)),
+        (QtCore.QPoint(100, 100), QtCore.QSize(10, 10),
+         QtGui.qRgb(100, 100, 0)),
+    ]
+
+    # nothing is due yet
+    assert capture_scheduler.tick(0.5) is None
+
+    # only the regions with the short period are due
+    del grabs[:]
+    stats = capture_scheduler.tick(1.0)
+    assert (stats.grabs, stats.regions) == (2, 2)
+    assert grabs == [
+        QtCore.QRect(0, 0, 20, 20), QtCore.QRect(100, 100, 10, 10)]
+
+    # falling behind skips the missed captures
+    stats = capture_scheduler.tick(5.5)
+    assert stats.regions == 3
+    assert capture_scheduler.tick(6.0) is None
+    assert capture_scheduler.tick(6.5).regions == 2
+
+    assert len(capture_scheduler.history) == 4
+
+
+def test_remove_region(qtbot, monkeypatch):
+    """
+    Test if removed regions aren't captured anymore.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :return: None
+    """
+    grabs = []
+    monkeypatch.setattr(scheduler, 'grab_area', _fake_grab_area(grabs))
+
+    capture_scheduler = CaptureScheduler()
+    region_id = capture_scheduler.add_region(
+        QtCore.QRect(0, 0, 10, 10), 1.0, lambda view: None, now=0.0)
+    capture_scheduler.remove_region(region_id)
+
+    assert capture_scheduler.tick(0.0) is None
+    assert grabs == []
+
+
+def test_overlapping_regions(qtbot, monkeypatch):
+    """
+    Test if overlapping regions share the pixels of their grab, so a callback
+    painting on a copy of its view leaves the other regions untouched.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :return: None
+    """
+    grabs = []
+    monkeypatch.setattr(scheduler, 'grab_area', _fake_grab_area(grabs))
+    seen = []
+
+    def stamp(view):
+        image = view.copy().image
+        image.fill(QtGui.QColor(255, 255, 255))
+        seen.append(image.pixel(5, 5))
+
+    def record(view):
+        seen.append(view.image.pixel(0, 0))
+
+    capture_scheduler = CaptureScheduler(waste_threshold=0.5)
+    capture_scheduler.add_region(
+        QtCore.QRect(0, 0, 20, 20), 1.0, stamp, now=0.0)
+    capture_scheduler.add_region(
+        QtCore.QRect(5, 5, 20, 20), 1.0, record, now=0.0)
+
+    assert capture_scheduler.tick(0.0).grabs == 1
+    assert seen == [QtGui.qRgb(255, 255, 255), QtGui.qRgb(5, 5, 0)]
+
+    # painting on a view paints on the shared grab
+    def paint(view):
+        view.image.fill(QtGui.QColor(255, 0, 0))
+
+    del seen[:]
+    capture_scheduler = CaptureScheduler(waste_threshold=0.5)
+    capture_scheduler.add_region(
+        QtCore.QRect(0, 0, 20, 20), 1.0, paint, now=0.0)
+    capture_scheduler.add_region(
+        QtCore.QRect(5, 5, 20, 20), 1.0, record, now=0.0)
+    capture_scheduler.tick(0.0)
+    assert seen == [QtGui.qRgb(255, 0, 0)]
@@ -0,0 +1,171 @@
+import subprocess
+import sys
+import pytest
+from PySide2 import QtGui
+from qtgrab.shared_frames import FramePublisher, FrameSubscriber
+
+
+def _create_image(value, width=32, height=16):
+    """
+    Create an image filled with a single color.
+    :param int value: blue channel of the color
+    :param int width:
+    :param int height:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(0, 0, value))
+    return image
+
+
+@pytest.fixture
+def publisher():
+    """
+    Create a small publisher which is removed after the test.
+    :return: FramePublisher
+    """
+    with FramePublisher(slot_count=3, slot_size=32 * 16 * 4) as pub:
+        yield pub
+
+
+def test_publish_and_read(qtbot, publisher):
+    """
+    Test if the subscriber reads the published pixels without a copy.
+    :param QtBot qtbot:
+    :param FramePublisher publisher:
+    :return: None
+    """
+    with FrameSubscriber(publisher.name) as subscriber:
+        assert subscriber.read() is None
+
+        assert publisher.publish(_create_image(10), timestamp=1.5) == 1
+        frame = subscriber.read()
+        assert frame.sequence == 1
+        assert frame.timestamp == 1.5
+        assert frame.image.size() == _create_image(10).size()
+        assert frame.image.format() == QtGui.QImage.Format_RGB32
+        assert QtGui.qBlue(frame.image.pixel(5, 5)) == 10
+        assert frame.is_valid()
+
+        # a frame is only read once
+        assert subscriber.read() is None
+
+        # the image points into the ring buffer
+        copy = frame.copy()
+        for value in (20, 30, 40):
+            publisher.publish(_create_image(value))
+        assert not frame.is_valid()
+        assert QtGui.qBlue(frame.image.pixel(5, 5)) == 40
+        assert QtGui.qBlue(copy.pixel(5, 5)) == 10
+        with pytest.raises(ValueError):
+            frame.copy()
+
+
+def test_paint_on_frame(qtbot, publisher):
+    """
+    Test if painting on a frame writes into the ring buffer, and painting on
+    a copy of it doesn't.
+    :param QtBot qtbot:
+    :param FramePublisher publisher:
+    :return: None
+    """
+    with FrameSubscriber(publisher.name) as first, \
+            FrameSubscriber(publisher.name) as second:
+        publisher.publish(_create_image(10))
+        frame = first.read()
+
+        copy = frame.copy()
+        copy.fill(QtGui.QColor(0, 0, 20))
+        assert QtGui.qBlue(second.read().image.pixel(5, 5)) == 10
+
+        # the image is shared with every subscriber of the publisher
+        publisher.publish(_create_image(30))
+        frame = first.read()
+        painter = QtGui.QPainter(frame.image)
+        painter.fillRect(frame.image.rect(), QtGui.QColor(0, 0, 40))
+        painter.end()
+        assert QtGui.qBlue(second.read().image.pixel(5, 5)) == 40
+
+
+def test_read_after_close(qtbot, publisher):
+    """
+    Test if frames still alive keep their pixels when the subscriber closes,
+    unless their slot has been overwritten before.
+    :param QtBot qtbot:
+    :param FramePublisher publisher:
+    :return: None
+    """
+    subscriber = FrameSubscriber(publisher.name)
+    publisher.publish(_create_image(10))
+    overwritten = subscriber.read()
+    for value in (20, 30, 40):
+        publisher.publish(_create_image(value))
+    frame = subscriber.read()
+    subscriber.close()
+
+    assert frame.is_valid()
+    assert QtGui.qBlue(frame.image.pixel(5, 5)) == 40
+    assert QtGui.qBlue(frame.copy().pixel(5, 5)) == 40
+
+    # the pixels don't change with the ring buffer anymore
+    publisher.publish(_create_image(50))
+    assert QtGui.qBlue(frame.image.pixel(5, 5)) == 40
+
+    assert not overwritten.is_valid()
+    assert overwritten.image.isNull()
+    with pytest.raises(ValueError):
+        overwritten.copy()
+
+
+def test_slow_subscriber(qtbot, publisher):
+    """
+    Test if slow subscribers skip to the latest frame.
+    :param QtBot qtbot:
+    :param FramePublisher publisher:
+    :return: None
+    """
+    with FrameSubscriber(publisher.name) as subscriber:
+        for value in range(10):
+            publisher.publish(_create_image(value))
+
+        frame = subscriber.read()
+        assert frame.sequence == 10
+        assert QtGui.qBlue(frame.image.pixel(0, 0)) == 9
+        assert subscriber.skipped == 9
+
+
+def test_slot_size(qtbot, publisher):
+    """
+    Test if images larger than a slot are refused.
+    :param QtBot qtbot:
+    :param FramePublisher publisher:
+    :return: None
+    """
+    with pytest.raises(ValueError):
+        publisher.publish(_create_image(0, width=64))
+    assert publisher.sequence == 0
+
+
+def test_other_process(qtbot, publisher):
+    """
+    Test if frames can be read from another process.
+    :param QtBot qtbot:
+    :param FramePublisher publisher:
+    :return: None
+    """
+    publisher.publish(_create_image(77))
+    script = (
+        'import sys\n'
+        'from PySide2 import QtGui\n'
+        'from qtgrab.shared_frames import FrameSubscriber\n'
+        'with FrameSubscriber(sys.argv[1]) as subscriber:\n'
+        '    frame = subscriber.read()\n'
+        '    print(frame.sequence, QtGui.qBlue(frame.image.pixel(1, 1)))\n')
+    output = subprocess.check_output(
+        [sys.executable, '-c', script, publisher.name])
+    assert output.split() == [b'1', b'77']
+
+    # the segment outlives the subscriber's process
+    publisher.publish(_create_image(78))
+    with FrameSubscriber(publisher.name) as subscriber:
+        assert subscriber.read().sequence == 2
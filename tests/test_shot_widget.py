@@ -1,9 +1,22 @@
+import gc
 import os
 import pytest
 from pytestqt.qtbot import QtBot
 from PySide2 import QtCore, QtWidgets, QtGui
 from qtgrab.shot_widget import ShotWidget
+from qtgrab.capture import Capture
 from qtgrab.coordinates_widget import CoordinateWidget
+from qtgrab.future import CaptureFuture
+from qtgrab.window_index import StaticWindowProvider
+from qtgrab.redaction import Redactor, FILL
+from qtgrab import pipeline
+from qtgrab import capture as capture_module
+from qtgrab import tiled
+from qtgrab import scheduler
+from qtgrab.tiled import TiledCapture
+from qtgrab.pipeline import MemorySink
+from qtgrab.shared_frames import FramePublisher, FrameSubscriber
+from qtgrab.annotations import Box
 
 
 @pytest.mark.parametrize(
@@ -24,8 +37,8 @@ def test_assumed_integration(
     shot_widget = ShotWidget()
     # mock the coordinate grabbing dialog
     monkeypatch.setattr(
-        shot_widget, 'get_coordinates',
-        lambda : (p1, p2))
+        shot_widget, 'select_area',
+        lambda: CaptureFuture.from_result((p1, p2)))
 
     qtbot.addWidget(shot_widget)
 
@@ -34,15 +47,15 @@ def test_assumed_integration(
     qtbot.addWidget(btn_trigger)
 
     # test if no screenshot has been made
-    assert shot_widget._pmp_screen_grab is None
+    assert shot_widget.capture is None
     qtbot.mouseClick(btn_trigger, QtCore.Qt.LeftButton)
 
     # test if a screenshot was made
-    assert isinstance(shot_widget._pmp_screen_grab, QtGui.QPixmap)
+    assert isinstance(shot_widget.capture, Capture)
 
     # test if the screenshot has the expected size
-    img_height = shot_widget._pmp_screen_grab.height()
-    img_width = shot_widget._pmp_screen_grab.width()
+    img_height = shot_widget.capture.height()
+    img_width = shot_widget.capture.width()
 
     assert img_height == pytest.approx(expected_height, 1)
     assert img_width == pytest.approx(expected_width, 1)
@@ -64,8 +77,8 @@ def test_coordinate_canceling(qtbot, monkeypatch, p1, p2):
     shot_widget = ShotWidget()
     # mock the coordinate grabbing dialog
     monkeypatch.setattr(
-        shot_widget, 'get_coordinates',
-        lambda : (p1, p2))
+        shot_widget, 'select_area',
+        lambda: CaptureFuture.from_result((p1, p2)))
 
     qtbot.addWidget(shot_widget)
 
@@ -75,7 +88,7 @@ def test_coordinate_canceling(qtbot, monkeypatch, p1, p2):
 
     # test if no screenshot has been made
     qtbot.mouseClick(btn_trigger, QtCore.Qt.LeftButton)
-    assert shot_widget._pmp_screen_grab is None
+    assert shot_widget.capture is None
 
 
 def test_default_coordinate_grabbing(qtbot, monkeypatch):
@@ -166,10 +179,455 @@ def test_image_save(qtbot, tmpdir, monkeypatch):
     test_path = os.path.join(str(tmpdir), '.png')
 
     monkeypatch.setattr(
-        shot_widget, 'get_coordinates',
-        lambda : (QtCore.QPoint(100, 100), QtCore.QPoint(300, 200)))
+        shot_widget, 'select_area',
+        lambda: CaptureFuture.from_result(
+            (QtCore.QPoint(100, 100), QtCore.QPoint(300, 200))))
 
     shot_widget.capture_screen()
     shot_widget.save_capture(test_path)
 
     assert os.path.isfile(test_path)
+
+
+def test_window_capture(qtbot, monkeypatch):
+    """
+    Test if a window capture grabs the picked window geometry.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    provider = StaticWindowProvider([QtCore.QRect(100, 100, 200, 100)])
+
+    def mocked_window_selecting(window_provider):
+        assert window_provider is provider
+        return CaptureFuture.from_result(
+            (QtCore.QPoint(100, 100), QtCore.QPoint(300, 200)))
+
+    monkeypatch.setattr(
+        CoordinateWidget, 'select_window', mocked_window_selecting)
+
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+    shot_widget.set_window_provider(provider)
+
+    shot_widget.capture_window()
+
+    assert isinstance(shot_widget.capture, Capture)
+
+
+def test_redacted_save(qtbot, tmpdir):
+    """
+    Test if saving redacts the saved image but not the capture itself.
+    :param QtBot qtbot:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+    test_path = os.path.join(str(tmpdir), 'redacted.png')
+
+    image = QtGui.QImage(100, 100, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    shot_widget._capture = Capture(image)
+
+    redactor = Redactor(FILL, color=QtGui.QColor(0, 0, 0))
+    redactor.add_area(QtCore.QRect(0, 0, 50, 50))
+    shot_widget.set_redactor(redactor)
+
+    assert shot_widget.save_capture(test_path)
+    saved = QtGui.QImage(test_path)
+    assert saved.pixel(10, 10) == QtGui.qRgb(0, 0, 0)
+    assert saved.pixel(60, 60) == QtGui.qRgb(255, 255, 255)
+
+    image = shot_widget.capture.image
+    assert image.pixel(10, 10) == QtGui.qRgb(255, 255, 255)
+
+    # apply the redaction to the capture itself
+    shot_widget.apply_redaction()
+    image = shot_widget.capture.image
+    assert image.pixel(10, 10) == QtGui.qRgb(0, 0, 0)
+
+
+def test_redaction_without_capture(qtbot):
+    """
+    Test if redacting fails if no grab has been made.
+    :param QtBot qtbot:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    with pytest.raises(ValueError):
+        shot_widget.apply_redaction()
+
+
+def test_capture_export(qtbot, monkeypatch):
+    """
+    Test if captures can be run through a pipeline, once or as a stream.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    grabbed = []
+
+    def mocked_grabbing(rect):
+        grabbed.append(rect)
+        return QtGui.QImage(rect.size(), QtGui.QImage.Format_RGB32)
+
+    monkeypatch.setattr(capture_module, 'grab_area', mocked_grabbing)
+    monkeypatch.setattr(pipeline, 'grab_area', mocked_grabbing)
+
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    with pytest.raises(ValueError):
+        shot_widget.export_capture([MemorySink()])
+    with pytest.raises(ValueError):
+        shot_widget.stream_capture([MemorySink()])
+
+    monkeypatch.setattr(
+        shot_widget, 'select_area',
+        lambda: CaptureFuture.from_result(
+            (QtCore.QPoint(100, 100), QtCore.QPoint(300, 200))))
+    shot_widget.capture_screen()
+
+    frame = shot_widget.export_capture([MemorySink()])
+    assert frame.origin == QtCore.QPoint(100, 100)
+    # the frame shares the pixels of the capture
+    assert frame.image.cacheKey() == shot_widget.capture.image.cacheKey()
+
+    sink = MemorySink()
+    stream = shot_widget.stream_capture([sink], count=2, workers=2)
+    # the frames are grabbed from the event loop
+    assert len(sink.frames) == 0
+    with qtbot.waitSignal(stream.finished):
+        pass
+    assert len(sink.frames) == 2
+    assert grabbed == [QtCore.QRect(100, 100, 200, 100)] * 3
+
+
+def test_capture_copy(qtbot):
+    """
+    Test if captures are copied to the clipboard.
+    :param QtBot qtbot:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    image = QtGui.QImage(100, 50, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    shot_widget._capture = Capture(image)
+
+    redactor = Redactor(FILL, color=QtGui.QColor(0, 0, 0))
+    redactor.add_area(QtCore.QRect(0, 0, 50, 50))
+    shot_widget.set_redactor(redactor)
+    shot_widget.copy_capture()
+
+    clipboard = QtWidgets.QApplication.clipboard()
+    png = clipboard.mimeData().data('image/png')
+    image = QtGui.QImage.fromData(png)
+    assert image.size() == QtCore.QSize(100, 50)
+    assert image.pixel(10, 10) == QtGui.qRgb(0, 0, 0)
+
+    metrics = shot_widget.clipboard_metrics
+    assert metrics.exports == 1
+    assert metrics.encoded['image/png'] == 1
+
+
+def test_non_blocking_capture(qtbot, monkeypatch):
+    """
+    Test if a capture only grabs once the area has been selected and if it
+    can be cancelled while selecting.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    selections = []
+
+    def mocked_area_selecting():
+        selections.append(CaptureFuture())
+        return selections[-1]
+
+    monkeypatch.setattr(
+        CoordinateWidget, 'select_area',
+        lambda *args: mocked_area_selecting())
+
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    capture = shot_widget.capture_screen()
+    assert not capture.done()
+    assert shot_widget.capture is None
+
+    # starting a new capture cancels the pending one
+    next_capture = shot_widget.capture_screen()
+    assert capture.is_cancelled()
+    assert selections[0].is_cancelled()
+
+    with qtbot.waitSignal(next_capture.finished):
+        selections[1].set_result(
+            (QtCore.QPoint(100, 100), QtCore.QPoint(200, 200)))
+    assert next_capture.result() is shot_widget.capture
+
+    # cancelling the capture cancels the selection
+    capture = shot_widget.capture_screen()
+    capture.cancel()
+    assert selections[2].is_cancelled()
+
+
+def test_memory_usage(qtbot):
+    """
+    Test if the bytes held by the widget are reported.
+    :param QtBot qtbot:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    usage = shot_widget.memory_usage()
+    assert usage['capture'] == usage['preview'] == 0
+    assert usage['total'] == usage['background'] > 0
+
+    image = QtGui.QImage(400, 200, QtGui.QImage.Format_RGB888)
+    image.fill(QtGui.QColor(255, 255, 255))
+    shot_widget._capture = Capture(image)
+    shot_widget.resize(200, 200)
+    shot_widget._update_pixmap_size()
+
+    usage = shot_widget.memory_usage()
+    assert usage['capture'] == 400 * 200 * 4
+    assert 0 < usage['preview'] < usage['capture']
+    assert usage['annotations'] == 0
+    assert usage['total'] == \
+        usage['capture'] + usage['preview'] + usage['background']
+    assert shot_widget.pixmap().size() == QtCore.QSize(200, 100)
+
+    # the overlay and the composite of the annotations are counted as well
+    shot_widget.annotations.add(
+        Box(QtCore.QRect(10, 10, 50, 50), QtGui.QColor(255, 0, 0)))
+    usage = shot_widget.memory_usage()
+    assert usage['annotations'] == 2 * 200 * 100 * 4
+    assert usage['total'] == usage['capture'] + usage['preview'] + \
+        usage['annotations'] + usage['background']
+
+    shot_widget.annotations.clear()
+    assert shot_widget.memory_usage()['annotations'] == 0
+
+
+def test_tiled_capture(qtbot, monkeypatch, tmpdir):
+    """
+    Test if large areas are captured tiled and saved from the memory map.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    monkeypatch.setattr(tiled, 'grab_area', lambda rect: QtGui.QImage(
+        rect.size(), QtGui.QImage.Format_RGB32))
+
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+    shot_widget.enable_tiled_capture(
+        threshold=100 * 100, tile_size=64, directory=str(tmpdir))
+
+    monkeypatch.setattr(
+        shot_widget, 'select_area',
+        lambda: CaptureFuture.from_result(
+            (QtCore.QPoint(0, 0), QtCore.QPoint(200, 100))))
+    shot_widget.capture_screen()
+
+    assert isinstance(shot_widget.capture, TiledCapture)
+    usage = shot_widget.memory_usage()
+    assert usage['capture'] == 0
+    assert usage['mapped'] > 200 * 100 * 4
+
+    file_path = os.path.join(str(tmpdir), 'tiled.png')
+    assert shot_widget.save_capture(file_path)
+    assert QtGui.QImage(file_path).size() == QtCore.QSize(200, 100)
+
+    # a new capture releases the memory map
+    tiled_capture = shot_widget.capture
+    shot_widget.disable_tiled_capture()
+    shot_widget.capture_screen()
+    assert tiled_capture.mapped_nbytes == 0
+    assert isinstance(shot_widget.capture, Capture)
+
+
+def test_tiled_export(qtbot, monkeypatch, tmpdir):
+    """
+    Test if tiled captures are redacted and annotated band by band when they
+    get exported, leaving the capture untouched.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    def grab_white(rect):
+        image = QtGui.QImage(rect.size(), QtGui.QImage.Format_RGB32)
+        image.fill(QtGui.QColor(255, 255, 255))
+        return image
+    monkeypatch.setattr(tiled, 'grab_area', grab_white)
+
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+    shot_widget.enable_tiled_capture(
+        threshold=100 * 100, tile_size=64, directory=str(tmpdir))
+    monkeypatch.setattr(
+        shot_widget, 'select_area',
+        lambda: CaptureFuture.from_result(
+            (QtCore.QPoint(0, 0), QtCore.QPoint(200, 100))))
+    shot_widget.capture_screen()
+
+    redactor = Redactor(mode=FILL, color=QtGui.QColor(0, 0, 0))
+    redactor.add_area(QtCore.QRect(0, 0, 10, 10))
+    shot_widget.set_redactor(redactor)
+    shot_widget.annotations.add(
+        Box(QtCore.QRect(100, 50, 20, 20), QtGui.QColor(255, 0, 0), width=2))
+
+    file_path = os.path.join(str(tmpdir), 'tiled.png')
+    assert shot_widget.save_capture(file_path)
+    saved = QtGui.QImage(file_path)
+    assert saved.pixel(5, 5) == QtGui.qRgb(0, 0, 0)
+    assert saved.pixel(100, 60) == QtGui.qRgb(255, 0, 0)
+    assert saved.pixel(50, 50) == QtGui.qRgb(255, 255, 255)
+    assert shot_widget.capture.image.pixel(5, 5) == \
+        QtGui.qRgb(255, 255, 255)
+    # only the raw file of the capture itself is left
+    assert len(tmpdir.listdir(lambda path: path.ext == '.qtgrab')) == 1
+
+    with FramePublisher(slot_count=2, slot_size=200 * 100 * 4) as publisher:
+        with FrameSubscriber(publisher.name) as subscriber:
+            assert shot_widget.publish_capture(publisher) == 1
+            frame = subscriber.read()
+            assert frame.image.pixel(5, 5) == QtGui.qRgb(0, 0, 0)
+            assert frame.image.pixel(100, 60) == QtGui.qRgb(255, 0, 0)
+
+
+def test_scheduler(qtbot, monkeypatch):
+    """
+    Test if the scheduler captures in the format of the widget.
+    :param QtBot qtbot:
+    :param monkeypatch:
+    :return: None
+    """
+    monkeypatch.setattr(scheduler, 'grab_area', lambda rect: QtGui.QImage(
+        rect.size(), QtGui.QImage.Format_RGB32))
+
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+    shot_widget.set_capture_format(QtGui.QImage.Format_RGB888)
+
+    views = []
+    capture_scheduler = shot_widget.create_scheduler()
+    capture_scheduler.add_region(
+        QtCore.QRect(0, 0, 10, 10), 1.0, views.append, now=0.0)
+
+    with qtbot.waitSignal(capture_scheduler.tick_finished):
+        capture_scheduler.tick(0.0)
+    assert views[0].capture.format == QtGui.QImage.Format_RGB888
+
+
+def test_capture_publish(qtbot):
+    """
+    Test if the redacted capture is published into shared memory.
+    :param QtBot qtbot:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    with pytest.raises(ValueError):
+        shot_widget.publish_capture(None)
+
+    image = QtGui.QImage(40, 30, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    shot_widget._capture = Capture(image)
+
+    redactor = Redactor(mode=FILL, color=QtGui.QColor(0, 0, 0))
+    redactor.add_area(QtCore.QRect(0, 0, 10, 10))
+    shot_widget.set_redactor(redactor)
+
+    with FramePublisher(slot_count=2, slot_size=40 * 30 * 4) as publisher:
+        with FrameSubscriber(publisher.name) as subscriber:
+            assert shot_widget.publish_capture(publisher) == 1
+            frame = subscriber.read()
+            assert frame.image.pixel(0, 0) == QtGui.qRgb(0, 0, 0)
+            assert frame.image.pixel(20, 20) == QtGui.qRgb(255, 255, 255)
+
+
+def test_capture_analysis(qtbot):
+    """
+    Test if redacting the capture invalidates its analysis.
+    :param QtBot qtbot:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    with pytest.raises(ValueError):
+        shot_widget.analyze_capture()
+
+    image = QtGui.QImage(40, 30, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    shot_widget._capture = Capture(image)
+    assert shot_widget.analyze_capture().unique_colors() == 1
+
+    redactor = Redactor(mode=FILL, color=QtGui.QColor(0, 0, 0))
+    redactor.add_area(QtCore.QRect(0, 0, 10, 10))
+    shot_widget.set_redactor(redactor)
+    shot_widget.apply_redaction()
+    assert shot_widget.analyze_capture().unique_colors() == 2
+
+
+def test_annotations(qtbot, tmpdir):
+    """
+    Test if annotations are shown over the preview and saved at full size.
+    :param QtBot qtbot:
+    :param tmpdir:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+    shot_widget.resize(200, 100)
+
+    image = QtGui.QImage(400, 200, QtGui.QImage.Format_RGB32)
+    image.fill(QtGui.QColor(255, 255, 255))
+    shot_widget._capture = Capture(image)
+
+    shot_widget.annotations.add(Box(
+        QtCore.QRect(100, 50, 200, 100), QtGui.QColor(255, 0, 0), width=4))
+    preview = shot_widget.pixmap().toImage()
+    assert preview.size() == QtCore.QSize(200, 100)
+    assert preview.pixel(50, 50) == QtGui.qRgb(255, 0, 0)
+
+    file_path = os.path.join(str(tmpdir), 'annotated.png')
+    assert shot_widget.save_capture(file_path)
+    saved = QtGui.QImage(file_path)
+    assert saved.size() == QtCore.QSize(400, 200)
+    assert saved.pixel(100, 100) == QtGui.qRgb(255, 0, 0)
+    assert shot_widget.capture.image.pixel(100, 100) == QtGui.qRgb(
+        255, 255, 255)
+
+
+def test_pending_capture_collection(qtbot):
+    """
+    Test if a pending capture survives a garbage collection.
+    :param QtBot qtbot:
+    :return: None
+    """
+    shot_widget = ShotWidget()
+    qtbot.addWidget(shot_widget)
+
+    future = shot_widget.capture_screen()
+    gc.collect()
+
+    overlays = [widget for widget in QtWidgets.QApplication.topLevelWidgets()
+                if isinstance(widget, CoordinateWidget) and
+                widget.isVisible()]
+    assert len(overlays) == 1
+    assert not future.done()
+
+    with qtbot.waitSignal(future.aborted):
+        overlays[0].close()
+    assert future.is_cancelled()
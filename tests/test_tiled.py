@@ -0,0 +1,312 @@
+import gc
+import os
+import pytest
+from PySide2 import QtCore, QtGui
+from qtgrab import redaction, tiled
+from qtgrab.analysis import ImageAnalysis
+from qtgrab.annotations import AnnotationLayer, Box
+from qtgrab.redaction import Redactor
+from qtgrab.tiled import TiledCapture
+
+
+def _pixel(x, y):
+    """
+    The color of the fake desktop at the given position.
+    :param int x:
+    :param int y:
+    :return: int
+    """
+    return QtGui.qRgb(x % 256, y % 256, (x * y) % 256)
+
+
+def _fake_grab(rect):
+    """
+    Grab the given area of the fake desktop.
+    :param QtCore.QRect rect:
+    :return: QtGui.QImage
+    """
+    image = QtGui.QImage(rect.size(), QtGui.QImage.Format_RGB888)
+    for x in range(rect.width()):
+        for y in range(rect.height()):
+            image.setPixel(x, y, _pixel(rect.x() + x, rect.y() + y))
+    return image
+
+
+@pytest.fixture
+def tiled_capture(qtbot, monkeypatch, tmpdir):
+    """
+    Tiled capture of the fake desktop, with tiles not fitting the area.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :param LocalPath tmpdir:
+    :return: TiledCapture
+    """
+    monkeypatch.setattr(tiled, 'grab_area', _fake_grab)
+    capture = TiledCapture.grab(
+        QtCore.QRect(10, 20, 50, 37), tile_size=16, directory=str(tmpdir))
+    yield capture
+    capture.close()
+
+
+def test_tile_stitching(tiled_capture):
+    """
+    Test if the tiles are stitched together into the full area.
+    :param TiledCapture tiled_capture:
+    :return: None
+    """
+    assert tiled_capture.size() == QtCore.QSize(50, 37)
+    assert tiled_capture.origin == QtCore.QPoint(10, 20)
+    assert tiled_capture.tile_size == 16
+    assert tiled_capture.mapped_nbytes == tiled.HEADER_SIZE + 50 * 37 * 4
+    assert tiled_capture.pixel_nbytes == 0
+    assert tiled_capture.is_tiled
+
+    image = tiled_capture.image
+    for x in range(50):
+        for y in range(37):
+            assert image.pixel(x, y) == _pixel(x + 10, y + 20)
+
+
+def test_bands_and_views(tiled_capture):
+    """
+    Test if bands and views point at the right rows of the map.
+    :param TiledCapture tiled_capture:
+    :return: None
+    """
+    bands = list(tiled_capture.bands(16))
+    assert [y for y, band in bands] == [0, 16, 32]
+    assert [band.height() for y, band in bands] == [16, 16, 5]
+    assert bands[1][1].pixel(3, 0) == _pixel(13, 36)
+
+    view = tiled_capture.view(QtCore.QRect(20, 30, 5, 5))
+    assert view.image.pixel(0, 0) == _pixel(30, 50)
+
+
+def test_processed(tiled_capture):
+    """
+    Test if redacting and annotating band by band matches processing the
+    whole capture at once.
+    :param TiledCapture tiled_capture:
+    :return: None
+    """
+    redactor = Redactor(block_size=4, radius=2)
+    redactor.add_area(QtCore.QRect(3, 5, 20, 14))
+    redactor.add_area(QtCore.QRect(12, 16, 30, 12), redaction.BLUR)
+    redactor.add_area(QtCore.QRect(0, 30, 8, 4), redaction.FILL)
+    layer = AnnotationLayer()
+    layer.add(Box(QtCore.QRect(20, 2, 20, 30), QtGui.QColor(255, 0, 0)))
+
+    def process(image, offset, band):
+        return layer.render(
+            redactor.apply(image, offset=offset, clip=band), offset)
+
+    expected = layer.render(redactor.apply(tiled_capture.image))
+    processed = tiled_capture.processed(
+        process, redactor.source_rect, rows=7)
+    assert processed.size() == tiled_capture.size()
+    assert processed.origin == tiled_capture.origin
+    assert processed.image == expected.convertToFormat(tiled.TILE_FORMAT)
+    assert tiled_capture.image.pixel(5, 5) == _pixel(15, 25)
+    processed.close()
+
+
+def test_processed_tall_areas(qtbot, monkeypatch, tmpdir):
+    """
+    Test if tall areas only widen the bands by the blur radius and the block
+    size, and if they are redacted band by band as a whole.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    monkeypatch.setattr(tiled, 'grab_area', _fake_grab)
+    capture = TiledCapture.grab(
+        QtCore.QRect(0, 0, 40, 200), tile_size=16, directory=str(tmpdir))
+    redactor = Redactor(block_size=4, radius=2)
+    redactor.add_area(QtCore.QRect(0, 0, 10, 200), redaction.FILL)
+    redactor.add_area(QtCore.QRect(10, 1, 10, 199), redaction.PIXELATE)
+    redactor.add_area(QtCore.QRect(18, 0, 12, 200), redaction.BLUR)
+    redactor.add_area(QtCore.QRect(28, 0, 12, 200), redaction.BLUR)
+
+    heights = []
+
+    def process(image, offset, band):
+        heights.append((band.height(), image.height()))
+        return redactor.apply(image, offset=offset, clip=band)
+
+    expected = redactor.apply(capture.image)
+    processed = capture.processed(process, redactor.source_rect, rows=10)
+    assert processed.image == expected.convertToFormat(tiled.TILE_FORMAT)
+    assert len(heights) == 20
+    # two blur radii and a block above and below the band at most
+    assert all(height <= rows + 2 * (2 * 2 + 4) for rows, height in heights)
+    processed.close()
+    capture.close()
+
+
+def test_analysis(tiled_capture, monkeypatch):
+    """
+    Test if the capture is analysed band by band, releasing every band.
+    :param TiledCapture tiled_capture:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    released = []
+    release_rows = tiled_capture._release_rows
+
+    def record_release(y, height):
+        released.append((y, height))
+        release_rows(y, height)
+    monkeypatch.setattr(tiled_capture, '_release_rows', record_release)
+    monkeypatch.setattr(tiled, 'BAND_BYTES', 50 * 4 * 16)
+
+    analysis = tiled_capture.analysis()
+    assert isinstance(analysis, tiled.TiledAnalysis)
+    assert tiled_capture.analysis() is analysis
+    expected = ImageAnalysis(tiled_capture.image.copy())
+
+    assert analysis.histograms() == expected.histograms()
+    assert released == [(0, 16), (16, 16), (32, 5)]
+
+    del released[:]
+    area = QtCore.QRect(5, 10, 20, 20)
+    assert analysis.unique_colors(area) == expected.unique_colors(area)
+    assert released == [(10, 16), (26, 4)]
+
+
+def test_preview(tiled_capture):
+    """
+    Test if the preview is downscaled band by band.
+    :param TiledCapture tiled_capture:
+    :return: None
+    """
+    preview = tiled_capture.preview(QtCore.QSize(25, 25))
+    assert preview.size() == QtCore.QSize(25, 18)
+    assert tiled_capture.preview(QtCore.QSize(25, 25)) is preview
+    assert tiled_capture.nbytes == tiled_capture.preview_nbytes > 0
+
+    # the bands should be combined without gaps
+    image = preview.toImage()
+    assert all(QtGui.qGreen(image.pixel(12, y)) > 0 for y in range(18))
+
+
+def test_streamed_png(tiled_capture, tmpdir):
+    """
+    Test if the streamed PNG matches the captured pixels.
+    :param TiledCapture tiled_capture:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    file_path = str(tmpdir.join('capture.png'))
+    assert tiled_capture.save(file_path)
+
+    image = QtGui.QImage(file_path)
+    assert image.size() == QtCore.QSize(50, 37)
+    assert image.convertToFormat(QtGui.QImage.Format_RGB32) == \
+        tiled_capture.image
+
+    file_path = str(tmpdir.join('capture.bmp'))
+    assert tiled_capture.save(file_path)
+    assert QtGui.QImage(file_path).size() == QtCore.QSize(50, 37)
+
+
+def test_painting_changes_file(tiled_capture):
+    """
+    Test if painting on the capture changes the raw file.
+    :param TiledCapture tiled_capture:
+    :return: None
+    """
+    image = tiled_capture.image
+    image.setPixel(0, 0, QtGui.qRgb(1, 2, 3))
+    assert tiled_capture.image.pixel(0, 0) == QtGui.qRgb(1, 2, 3)
+
+    # released pages are read back from the file
+    list(tiled_capture.bands())
+    reopened = TiledCapture(tiled_capture.file_path)
+    assert reopened.image.pixel(0, 0) == QtGui.qRgb(1, 2, 3)
+    assert tiled_capture.image.pixel(0, 0) == QtGui.qRgb(1, 2, 3)
+    reopened.close()
+
+
+def test_close(qtbot, monkeypatch, tmpdir):
+    """
+    Test if closing removes temporary files but keeps given files.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    monkeypatch.setattr(tiled, 'grab_area', _fake_grab)
+
+    with TiledCapture.grab(
+            QtCore.QRect(0, 0, 8, 8), directory=str(tmpdir)) as capture:
+        file_path = capture.file_path
+        assert os.path.isfile(file_path)
+    assert not os.path.exists(file_path)
+    assert capture.mapped_nbytes == 0
+
+    file_path = str(tmpdir.join('kept.qtgrab'))
+    capture = TiledCapture.grab(QtCore.QRect(0, 0, 8, 8), file_path)
+    capture.close()
+    capture.close()
+    assert os.path.isfile(file_path)
+
+
+def test_close_while_referenced(tiled_capture):
+    """
+    Test if images and views handed out stay valid after closing.
+    :param TiledCapture tiled_capture:
+    :return: None
+    """
+    image = tiled_capture.image
+    band = tiled_capture.band(16, 8)
+    view = tiled_capture.view(QtCore.QRect(5, 6, 10, 10))
+    view_image = view.image
+    analysis = tiled_capture.analysis()
+    tiled_capture.close()
+    assert tiled_capture.mapped_nbytes == 0
+
+    assert image.pixel(10, 10) == _pixel(20, 30)
+    assert band.pixel(3, 1) == _pixel(13, 37)
+    assert view_image.pixel(0, 0) == _pixel(15, 26)
+    assert analysis.pixel_at(QtCore.QPoint(1, 2)) == \
+        QtGui.QColor.fromRgba(_pixel(11, 22))
+
+    del image, band, view, view_image, analysis
+    gc.collect()
+
+
+def test_failed_grabs(qtbot, monkeypatch, tmpdir):
+    """
+    Test if failed tile grabs leave the tiles black.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    monkeypatch.setattr(tiled, 'grab_area', lambda rect: QtGui.QImage())
+    capture = TiledCapture.grab(
+        QtCore.QRect(0, 0, 8, 8), directory=str(tmpdir))
+
+    assert capture.image.pixel(4, 4) == QtGui.qRgb(0, 0, 0)
+    capture.close()
+
+    capture = TiledCapture.grab(
+        QtCore.QRect(0, 0, 0, 0), directory=str(tmpdir))
+    assert capture.is_null()
+    assert capture.image.isNull()
+    assert capture.preview(QtCore.QSize(10, 10)).isNull()
+    capture.close()
+
+
+def test_invalid_file(tmpdir):
+    """
+    Test if opening a file which isn't a tiled capture fails.
+    :param LocalPath tmpdir:
+    :return: None
+    """
+    file_path = tmpdir.join('invalid.qtgrab')
+    file_path.write(b'not a capture', mode='wb')
+
+    with pytest.raises(ValueError):
+        TiledCapture(str(file_path))
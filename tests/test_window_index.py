@@ -0,0 +1,115 @@
+import pytest
+from PySide2 import QtCore
+from qtgrab import window_index
+from qtgrab.window_index import (
+    WindowIndex, StaticWindowProvider, ApplicationWindowProvider,
+    Win32WindowProvider, X11WindowProvider, default_window_provider)
+
+
+def test_z_order():
+    """
+    Test if the top most window is returned where windows overlap.
+    :return: None
+    """
+    top = QtCore.QRect(50, 50, 100, 100)
+    bottom = QtCore.QRect(0, 0, 500, 500)
+    index = WindowIndex([top, bottom])
+
+    assert index.window_at(QtCore.QPoint(60, 60)) == top
+    assert index.window_at(QtCore.QPoint(10, 10)) == bottom
+    assert index.window_at(QtCore.QPoint(600, 600)) is None
+
+
+@pytest.mark.parametrize('cell_size', [1, 7, 128, 4096])
+def test_cell_sizes(cell_size):
+    """
+    Test if the lookups are independent of the grid cell size.
+    :param int cell_size:
+    :return: None
+    """
+    windows = [QtCore.QRect(x * 40, x * 30, 100, 80) for x in range(20)]
+    index = WindowIndex(windows, cell_size)
+
+    for x in range(0, 900, 13):
+        for y in range(0, 700, 17):
+            point = QtCore.QPoint(x, y)
+            expected = next(
+                (rect for rect in windows if rect.contains(point)), None)
+            assert index.window_at(point) == expected
+
+
+def test_negative_coordinates():
+    """
+    Test windows on screens left or above the primary screen.
+    :return: None
+    """
+    window = QtCore.QRect(-1920, -200, 1920, 1080)
+    index = WindowIndex([window])
+
+    assert index.window_at(QtCore.QPoint(-1, -1)) == window
+    assert index.window_at(QtCore.QPoint(0, 0)) is None
+
+
+def test_empty_windows():
+    """
+    Test if empty window geometries are never hit.
+    :return: None
+    """
+    index = WindowIndex([QtCore.QRect(10, 10, 0, 0)])
+
+    assert len(index) == 1
+    assert index.window_at(QtCore.QPoint(10, 10)) is None
+
+
+def test_static_provider():
+    """
+    Test if the static provider is used as is for building an index.
+    :return: None
+    """
+    provider = StaticWindowProvider([QtCore.QRect(0, 0, 10, 10)])
+    index = WindowIndex.from_provider(provider)
+
+    assert len(index) == 1
+    assert provider.window_geometries() == [QtCore.QRect(0, 0, 10, 10)]
+
+
+def test_application_provider(qtbot):
+    """
+    Test if the application provider only returns visible windows.
+    :param QtBot qtbot:
+    :return: None
+    """
+    provider = ApplicationWindowProvider()
+    assert isinstance(provider.window_geometries(), list)
+
+
+def test_platform_providers(qtbot, monkeypatch):
+    """
+    Test if platform providers which aren't available fail to construct and
+    the default provider falls back to the application's windows.
+    :param QtBot qtbot:
+    :param MonkeyPatch monkeypatch:
+    :return: None
+    """
+    monkeypatch.setattr(window_index.sys, 'platform', 'linux')
+    with pytest.raises(OSError):
+        Win32WindowProvider()
+
+    monkeypatch.delenv('DISPLAY', raising=False)
+    with pytest.raises(OSError):
+        X11WindowProvider()
+
+    # on X11 the windows of all processes are provided
+    monkeypatch.setattr(
+        window_index.QtGui.QGuiApplication, 'platformName',
+        staticmethod(lambda: 'xcb'))
+    monkeypatch.setenv('DISPLAY', ':99')
+    if window_index.ctypes.util.find_library('X11') is not None:
+        provider = default_window_provider()
+        assert isinstance(provider, X11WindowProvider)
+        # no windows when the display can't be opened
+        assert provider.window_geometries() == []
+
+    # without a display only the application's windows can be listed
+    monkeypatch.delenv('DISPLAY')
+    assert isinstance(default_window_provider(), ApplicationWindowProvider)